@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.0/ref/settings/
 """
 
+import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -48,13 +50,104 @@ INSTALLED_APPS = [
 # THIS IS NEW
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'levelupapi.authentication.GamerTokenAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
 }
 
+# In-process token -> user -> gamer cache used by GamerTokenAuthentication.
+# Each hit is checked against the user's generation in the ALIAS cache,
+# which every worker shares, so revoked tokens stop working everywhere
+LEVELUP_AUTH_CACHE = {
+    'MAX_SIZE': 1024,
+    # Seconds an entry may be served before the token is looked up again
+    'TTL': 300,
+    'ALIAS': 'shared',
+}
+
+# Version markers behind the ETags and the response cache keys, see
+# levelupapi.versions. ALIAS has to be a cache every worker process shares
+LEVELUP_VERSIONS = {
+    'ALIAS': 'shared',
+}
+
+# Responses of the read endpoints, see levelupapi.caching. Their keys hold
+# the shared version markers, so a per-process ALIAS is safe; swap it to
+# `shared` to also share the bodies between worker processes
+LEVELUP_RESPONSE_CACHE = {
+    'ENABLED': True,
+    'ALIAS': 'default',
+    'TIMEOUT': 300,
+}
+
+# Build the default /games and /events list JSON from values() rows instead
+# of model instances, see levelupapi.views.fast
+LEVELUP_FAST_SERIALIZERS = True
+
+# Threads the async views (levelupapi.views.async_api) use for password
+# hashing, which is CPU bound and would otherwise block the event loop
+LEVELUP_HASHING_WORKERS = 4
+
+# Send the reads of GET requests (list/retrieve actions and the reports) to
+# the `replica` database, see levelupapi.replicas. Clients that wrote are
+# read from `default` for STICKY_SECONDS afterwards, whichever worker
+# serves them, so the pins live in the shared PIN_ALIAS cache. Replica
+# reads get no ETags and skip the response cache
+LEVELUP_REPLICA = {
+    'ENABLED': 'LEVELUP_REPLICA_DB' in os.environ,
+    'ALIAS': 'replica',
+    'STICKY_SECONDS': 5,
+    'PIN_ALIAS': 'shared',
+}
+
+# Query counts and timings per request as a Server-Timing header and as
+# per-route percentiles under /stats/requests, see levelupapi.instrumentation.
+# When disabled the middleware drops out at startup and costs nothing
+LEVELUP_INSTRUMENTATION = {
+    'ENABLED': DEBUG,
+    'SAMPLES': 1000,
+}
+
+# Server-sent events of event and attendance changes under
+# /async/events/stream, see levelupapi.live. A subscriber more than
+# QUEUE_SIZE messages behind is told to resync instead
+LEVELUP_LIVE = {
+    'QUEUE_SIZE': 100,
+    'KEEPALIVE': 15,
+}
+
+# Concurrency limits per route class, see levelupapi.admission. Requests
+# beyond CONCURRENCY wait up to TIMEOUT seconds in a QUEUE of that many
+# places; past that they get a 503, and a client holding PER_CLIENT slots
+# and places of a class gets a 429, both with Retry-After
+LEVELUP_ADMISSION = {
+    'ENABLED': True,
+    'CLASSES': {
+        'expensive': {'CONCURRENCY': 4, 'QUEUE': 8, 'TIMEOUT': 2, 'PER_CLIENT': 2, 'RETRY_AFTER': 5},
+        'reads': {'CONCURRENCY': 16, 'QUEUE': 32, 'TIMEOUT': 1, 'PER_CLIENT': 8, 'RETRY_AFTER': 1},
+        'writes': {'CONCURRENCY': 8, 'QUEUE': 16, 'TIMEOUT': 2, 'PER_CLIENT': 4, 'RETRY_AFTER': 2},
+        'auth': {'CONCURRENCY': 4, 'QUEUE': 16, 'TIMEOUT': 2, 'PER_CLIENT': 2, 'RETRY_AFTER': 2},
+    },
+}
+
+# Reports submitted with POST are computed by `manage.py run_report_jobs`,
+# see levelupreports.jobs. Identical submissions within FRESH_SECONDS of a
+# finished job get its result, finished jobs are kept for KEEP_SECONDS
+LEVELUP_REPORT_JOBS = {
+    'FRESH_SECONDS': 300,
+    'KEEP_SECONDS': 24 * 60 * 60,
+    'STALE_SECONDS': 600,
+}
+
+# `manage.py archive_events` moves events dated more than DAYS ago into the
+# archive tables, BATCH_SIZE per transaction, see levelupapi.archive
+LEVELUP_ARCHIVE = {
+    'DAYS': 365,
+    'BATCH_SIZE': 500,
+}
+
 # THIS IS NEW security thing, this api only accepts this list of urls.
 CORS_ORIGIN_WHITELIST = (
     'http://localhost:3000',
@@ -62,6 +155,8 @@ CORS_ORIGIN_WHITELIST = (
 )
 
 MIDDLEWARE = [
+    'levelupapi.instrumentation.RequestMetricsMiddleware',
+    'levelupapi.admission.AdmissionControlMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -70,6 +165,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'levelupapi.replicas.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'levelup.urls'
@@ -100,10 +196,52 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    },
+    # Read replica, only used when LEVELUP_REPLICA['ENABLED']. For local
+    # testing it is a second SQLite file refreshed from db.sqlite3 with
+    # `python manage.py sync_replica`
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('LEVELUP_REPLICA_DB', BASE_DIR / 'db.replica.sqlite3'),
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    },
+}
+
+DATABASE_ROUTERS = ['levelupapi.replicas.ReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'levelup',
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        },
+    },
+    # State every worker process has to agree on, like the version markers.
+    # Files are shared by the workers of one host; point it at Redis or
+    # Memcached when the workers run on several hosts
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get(
+            'LEVELUP_SHARED_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'levelup-shared-cache')
+        ),
+        'OPTIONS': {
+            'MAX_ENTRIES': 20000,
+        },
+    },
 }
 
 
+# Gives each test run its own `shared` cache directory
+TEST_RUNNER = 'levelup.test_runner.LevelupTestRunner'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
 
@@ -0,0 +1,30 @@
+"""Test runner that keeps the test run off the caches of running servers"""
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class LevelupTestRunner(DiscoverRunner):
+    """DiscoverRunner with a `shared` cache directory of its own for each run
+
+    The shared FileBasedCache holds version markers and replica pins. Tests
+    that write or clear it must not touch those of a dev server on the
+    same host, whose markers belong to another database.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.shared_cache_dir = tempfile.mkdtemp(prefix='levelup-test-cache-')
+        self.shared_cache = override_settings(CACHES={
+            **settings.CACHES,
+            'shared': {**settings.CACHES['shared'], 'LOCATION': self.shared_cache_dir},
+        })
+        self.shared_cache.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.shared_cache.disable()
+        shutil.rmtree(self.shared_cache_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
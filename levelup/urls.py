@@ -16,10 +16,10 @@ Including another URLconf
 from django.contrib import admin
 from django.conf.urls import include
 from django.urls import path
-from levelupapi.views import register_user, login_user, GameTypeView, GameView, EventView
-from rest_framework import routers
+from levelupapi.views import register_user, login_user, GameTypeView, GameView, EventView, cache_stats, request_stats, admission_stats, gamer_events_feed
+from levelupapi.routers import BulkRouter
 
-router = routers.DefaultRouter(trailing_slash=False)
+router = BulkRouter(trailing_slash=False)
 router.register(r'gametypes', GameTypeView, 'gametype')
 router.register(r'events', EventView, 'event')
 router.register(r'games', GameView, 'game')
@@ -27,7 +27,13 @@ router.register(r'games', GameView, 'game')
 urlpatterns = [
     path('', include(router.urls)),
     path('', include('levelupreports.urls')),
+    path('gamers/<int:pk>/events.ics', gamer_events_feed),
     path('register', register_user),
     path('login', login_user),
+    path('stats/cache', cache_stats),
+    path('stats/requests', request_stats),
+    path('stats/admission', admission_stats),
+    # Async versions of the auth, game and event endpoints for levelup/asgi.py
+    path('async/', include('levelupapi.async_urls')),
     path('admin/', admin.site.urls),
 ]
@@ -0,0 +1,296 @@
+"""Admission control: per route class concurrency limits and load shedding
+
+Every request is put in a class before it reaches a view:
+
+    auth       login and register (sync and async)
+    writes     any other POST, PUT, PATCH or DELETE
+    expensive  the reports
+    reads      every other GET, including the unpaginated /events and /games
+
+Each class has its own limiter: CONCURRENCY requests run at once, up to
+QUEUE more wait at most TIMEOUT seconds for a slot, and anything beyond
+that is answered at once with a 503. One client may only hold PER_CLIENT
+of the class's slots and queue places, more get a 429. Both carry a
+Retry-After header. Cheap requests like /login and /gametypes keep their
+own slots however many reports are running.
+
+Limits are per process; with several workers each one gets the full
+limits. The event stream is never limited, it stays open indefinitely.
+"""
+import asyncio
+import threading
+from collections import Counter, deque
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import JsonResponse
+from django.urls import Resolver404, resolve
+from rest_framework import status
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+AUTH_VIEWS = ('login_user', 'register_user')
+UNLIMITED_VIEWS = ('event_stream',)
+# The report views themselves, not the job status and result endpoints
+REPORT_VIEWS = 'levelupreports.views.users.'
+
+ADMITTED, QUEUED, SHED, LIMITED = 'admitted', 'queued', 'shed', 'limited'
+
+
+def get_settings():
+    config = getattr(settings, 'LEVELUP_ADMISSION', {})
+    return {
+        'ENABLED': config.get('ENABLED', False),
+        'CLASSES': config.get('CLASSES', {}),
+    }
+
+
+def classify(request):
+    """The route class of a request, None for requests that are not limited"""
+    try:
+        match = resolve(request.path_info)
+    except Resolver404:
+        return None
+    view = getattr(match.func, 'cls', None) or getattr(match.func, 'view_class', None) or match.func
+    name = match.url_name or view.__name__
+    if name in UNLIMITED_VIEWS:
+        return None
+    if name in AUTH_VIEWS:
+        return 'auth'
+    if request.method not in SAFE_METHODS:
+        return 'writes'
+    if view.__module__.startswith(REPORT_VIEWS):
+        return 'expensive'
+    return 'reads'
+
+
+def client_key(request):
+    return request.headers.get('Authorization') or request.META.get('REMOTE_ADDR', '')
+
+
+class ThreadWaiter:
+    def __init__(self):
+        self.granted = False
+        self.event = threading.Event()
+
+    def wake(self):
+        self.event.set()
+
+
+class LoopWaiter:
+    def __init__(self):
+        self.granted = False
+        self.loop = asyncio.get_running_loop()
+        self.future = self.loop.create_future()
+
+    def wake(self):
+        self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(True)
+
+
+class Limiter:
+    """Slots and a bounded wait queue of one route class
+
+    A released slot is handed straight to the longest waiting request, so
+    queued requests can not be overtaken by new arrivals.
+    """
+
+    def __init__(self, concurrency, queue, per_client):
+        self.concurrency = concurrency
+        self.queue = queue
+        self.per_client = per_client
+        self.active = 0
+        self.clients = Counter()
+        self.waiters = deque()
+        self.counts = Counter()
+        self._lock = threading.Lock()
+
+    def acquire(self, client, waiter_class):
+        """Take a slot or a queue place
+
+        Returns:
+            tuple -- (outcome, waiter), the waiter is only set for QUEUED
+        """
+        with self._lock:
+            if self.per_client and self.clients[client] >= self.per_client:
+                self.counts[LIMITED] += 1
+                return LIMITED, None
+            if self.active < self.concurrency:
+                self.active += 1
+                self.clients[client] += 1
+                self.counts[ADMITTED] += 1
+                return ADMITTED, None
+            if len(self.waiters) >= self.queue:
+                self.counts[SHED] += 1
+                return SHED, None
+            waiter = waiter_class()
+            self.waiters.append(waiter)
+            self.clients[client] += 1
+            self.counts[QUEUED] += 1
+            return QUEUED, waiter
+
+    def settle(self, waiter, client):
+        """Whether a waiter that stopped waiting got its slot, its place is given up if not"""
+        with self._lock:
+            if waiter.granted:
+                self.counts[ADMITTED] += 1
+                return True
+            self.waiters.remove(waiter)
+            self._forget(client)
+            self.counts[SHED] += 1
+            return False
+
+    def release(self, client):
+        with self._lock:
+            self._forget(client)
+            if self.waiters:
+                waiter = self.waiters.popleft()
+                waiter.granted = True
+                waiter.wake()
+            else:
+                self.active -= 1
+
+    def _forget(self, client):
+        self.clients[client] -= 1
+        if self.clients[client] <= 0:
+            del self.clients[client]
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'concurrency': self.concurrency,
+                'queue': self.queue,
+                'active': self.active,
+                'waiting': len(self.waiters),
+                **{outcome: self.counts[outcome] for outcome in (ADMITTED, QUEUED, SHED, LIMITED)},
+            }
+
+
+class Limiters:
+    """The limiter of every configured route class, kept in this process"""
+
+    def __init__(self):
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def get(self, route_class):
+        config = get_settings()['CLASSES'].get(route_class)
+        if config is None:
+            return None, None
+        with self._lock:
+            current, limiter = self._limiters.get(route_class, (None, None))
+            if current != config:
+                # New limits start from scratch, requests holding slots of
+                # the old limiter give them back to it
+                limiter = Limiter(config['CONCURRENCY'], config.get('QUEUE', 0), config.get('PER_CLIENT'))
+                self._limiters[route_class] = (dict(config), limiter)
+        return limiter, config
+
+    def snapshot(self):
+        with self._lock:
+            limiters = {route_class: limiter for route_class, (_, limiter) in self._limiters.items()}
+        return {route_class: limiters[route_class].snapshot() for route_class in sorted(limiters)}
+
+    def reset(self):
+        with self._lock:
+            self._limiters.clear()
+
+
+limiters = Limiters()
+
+
+def rejection(outcome, config):
+    if outcome == LIMITED:
+        response = JsonResponse(
+            {'detail': 'Too many concurrent requests from this client.'}, status=status.HTTP_429_TOO_MANY_REQUESTS
+        )
+    else:
+        response = JsonResponse(
+            {'detail': 'The server is busy, try again shortly.'}, status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+    response['Retry-After'] = str(config.get('RETRY_AFTER', 1))
+    return response
+
+
+class AdmissionControlMiddleware:
+    """Admit, queue or reject each request by its route class
+
+    Put it right after RequestMetricsMiddleware, so rejected requests cost
+    as little as possible while still showing up in the timings.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not get_settings()['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        limiter, config = limiters.get(classify(request))
+        if limiter is None:
+            return self.get_response(request)
+        client = client_key(request)
+        outcome, waiter = limiter.acquire(client, ThreadWaiter)
+        if outcome == QUEUED:
+            waiter.event.wait(config.get('TIMEOUT', 0))
+            if not limiter.settle(waiter, client):
+                outcome = SHED
+        if outcome not in (ADMITTED, QUEUED):
+            return rejection(outcome, config)
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            limiter.release(client)
+            raise
+        return self.hold_slot(response, limiter, client)
+
+    async def __acall__(self, request):
+        limiter, config = limiters.get(classify(request))
+        if limiter is None:
+            return await self.get_response(request)
+        client = client_key(request)
+        outcome, waiter = limiter.acquire(client, LoopWaiter)
+        if outcome == QUEUED:
+            try:
+                await asyncio.wait((waiter.future,), timeout=config.get('TIMEOUT', 0))
+            except BaseException:
+                # Cancelled, e.g. the client went away while queued
+                if limiter.settle(waiter, client):
+                    limiter.release(client)
+                raise
+            if not limiter.settle(waiter, client):
+                outcome = SHED
+        if outcome not in (ADMITTED, QUEUED):
+            return rejection(outcome, config)
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            limiter.release(client)
+            raise
+        return self.hold_slot(response, limiter, client)
+
+    def hold_slot(self, response, limiter, client):
+        """Release the slot now, or once a streamed body has been sent"""
+        if not response.streaming:
+            limiter.release(client)
+            return response
+        # The work of a streamed report happens while it is sent; the
+        # server closes every response once it is done with it
+        released = []
+
+        def release():
+            if not released:
+                released.append(True)
+                limiter.release(client)
+        response._resource_closers.append(release)
+        return response
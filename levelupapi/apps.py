@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.core import checks
 
 
 class LevelupapiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'levelupapi'
+
+    def ready(self):
+        # Importing the module connects the receivers
+        from levelupapi import signals  # pylint: disable=import-outside-toplevel,unused-import
+        from levelupapi.caching import check_shared_markers  # pylint: disable=import-outside-toplevel
+        checks.register(check_shared_markers)
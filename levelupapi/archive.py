@@ -0,0 +1,83 @@
+"""Moves past events and their attendee rows into the archive tables
+
+levelupapi_event and levelupapi_event_attendees only hold the hot set, so
+the event list, the calendar feeds and the report tables stay the size of
+recent history. Archived events keep their ids; EventHistory reads both
+sets for ?include_archived=true and the reports read the archive tables
+directly.
+"""
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+
+from levelupapi.models import ArchivedEvent, ArchivedEventAttendee, Event, EventWaitlist
+from levelupapi.signals import events_archived
+
+EVENT_COLUMNS = ('id', 'game_id', 'description', 'date', 'time', 'organizer_id', 'attendee_count', 'capacity')
+
+
+def get_settings():
+    return {
+        # Events dated more than this many days ago are archived
+        'DAYS': 365,
+        # Events moved per transaction
+        'BATCH_SIZE': 500,
+        **getattr(settings, 'LEVELUP_ARCHIVE', {}),
+    }
+
+
+def archivable(days):
+    """Events dated before `days` days ago, oldest first"""
+    cutoff = datetime.date.today() - datetime.timedelta(days=days)
+    return Event.objects.filter(date__lt=cutoff).order_by('date', 'id')
+
+
+def archive_batch(event_ids):
+    """Copy the events and their attendee rows to the archive tables and delete the originals
+
+    Runs in one transaction. The rows are deleted set based, without the
+    per-row delete signals: an archived event was moved, not deleted, so
+    the live stream must not announce it as gone. events_archived is sent
+    instead, once per batch, and its receivers bump the version markers,
+    publish `archived` and drop the report rows.
+
+    Returns:
+        int -- the number of events archived
+    """
+    through = Event.attendees.through
+    with transaction.atomic():
+        rows = list(Event.objects.filter(pk__in=event_ids).values(*EVENT_COLUMNS))
+        event_ids = [row['id'] for row in rows]
+        attendees = list(through.objects.filter(event_id__in=event_ids).values_list('event_id', 'gamer_id'))
+        ArchivedEvent.objects.bulk_create([ArchivedEvent(**row) for row in rows])
+        ArchivedEventAttendee.objects.bulk_create([
+            ArchivedEventAttendee(event_id=event_id, gamer_id=gamer_id) for event_id, gamer_id in attendees
+        ])
+
+        # The rows pointing at the events go first, the report rows are
+        # dropped by the events_archived receiver in the same transaction
+        for model in (through, EventWaitlist, Event):
+            queryset = model.objects.filter(**{'pk__in' if model is Event else 'event_id__in': event_ids})
+            queryset._raw_delete(queryset.db)  # pylint: disable=protected-access
+
+        gamer_ids = {row['organizer_id'] for row in rows} | {gamer_id for _, gamer_id in attendees}
+        events_archived.send(sender=Event, event_ids=event_ids, gamer_ids=gamer_ids)
+    return len(rows)
+
+
+def archive_events(days, batch_size, max_batches=None):
+    """Archive every event older than `days` days, `batch_size` events per transaction
+
+    Returns:
+        int -- the number of events archived
+    """
+    total = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        event_ids = list(archivable(days).values_list('id', flat=True)[:batch_size])
+        if not event_ids:
+            break
+        total += archive_batch(event_ids)
+        batches += 1
+    return total
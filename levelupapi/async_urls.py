@@ -0,0 +1,15 @@
+from django.urls import path
+from .views import async_api
+
+urlpatterns = [
+    path('login', async_api.login_user),
+    path('register', async_api.register_user),
+    path('games', async_api.game_list),
+    path('games/<int:pk>', async_api.game_detail),
+    path('events', async_api.event_list),
+    path('events/stream', async_api.event_stream),
+    path('events/attendance', async_api.event_attendance),
+    path('events/<int:pk>', async_api.event_detail),
+    path('events/<int:pk>/signup', async_api.event_signup),
+    path('events/<int:pk>/leave', async_api.event_leave),
+]
@@ -0,0 +1,166 @@
+"""Token authentication that also resolves the gamer, backed by an in-process cache"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+GENERATION_KEY_PREFIX = 'levelupapi:auth-generation:'
+
+
+class TokenCache:
+    """Bounded LRU cache of token key -> (user, token) with a time to live
+
+    Entries are dropped when they expire, when the cache is full (least
+    recently used first) or when `invalidate_user` / `invalidate_key` is
+    called by the model signals in levelupapi.signals.
+
+    The entries live in each process. With an `alias`, invalidate_user
+    also gives the user a new generation in that shared cache once the
+    change commits, and every hit is checked against it, so a token
+    revoked through one worker stops working on all of them. What is left
+    is a lookup racing the revocation: it can cache the old token under
+    the new generation, which the TTL bounds.
+    """
+
+    def __init__(self, max_size=1024, ttl=300, alias=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.alias = alias
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+        self._lock = threading.Lock()
+
+    def generation(self, user_id):
+        """The user's generation in the shared cache, None without one"""
+        if self.alias is None:
+            return None
+        return caches[self.alias].get(f'{GENERATION_KEY_PREFIX}{user_id}')
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value, generation = entry
+            if expires < time.monotonic():
+                self._discard(key)
+                return None
+            self._entries.move_to_end(key)
+        # Read outside the lock, the shared cache may be on disk
+        user, _ = value
+        if self.generation(user.pk) != generation:
+            self.invalidate_key(key)
+            return None
+        return value
+
+    def set(self, key, value):
+        user, _ = value
+        generation = self.generation(user.pk)
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, generation)
+            self._keys_by_user.setdefault(user.pk, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._discard(next(iter(self._entries)))
+
+    def invalidate_key(self, key):
+        with self._lock:
+            self._discard(key)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._discard(key)
+        if self.alias is not None:
+            shared = caches[self.alias]
+            transaction.on_commit(
+                lambda: shared.set(f'{GENERATION_KEY_PREFIX}{user_id}', uuid.uuid4().hex, timeout=None)
+            )
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        _, (user, _), _ = entry
+        keys = self._keys_by_user.get(user.pk)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[user.pk]
+
+
+_cache_settings = getattr(settings, 'LEVELUP_AUTH_CACHE', {})
+token_cache = TokenCache(
+    max_size=_cache_settings.get('MAX_SIZE', 1024),
+    ttl=_cache_settings.get('TTL', 300),
+    alias=_cache_settings.get('ALIAS', 'shared'),
+)
+
+
+class GamerTokenAuthentication(TokenAuthentication):
+    """Resolve token -> user -> gamer in one query and expose `request.gamer`
+
+    Users without a gamer profile (e.g. staff accounts) still authenticate,
+    `request.gamer` is None for them.
+    """
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is not None:
+            user, _ = result
+            request.gamer = getattr(user, 'gamer', None)
+        return result
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is not None:
+            return cached
+
+        try:
+            token = Token.objects.select_related('user__gamer').get(key=key)
+        except Token.DoesNotExist as ex:
+            raise exceptions.AuthenticationFailed('Invalid token.') from ex
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+
+        token_cache.set(key, (token.user, token))
+        return (token.user, token)
+
+
+async def aauthenticate_token(key):
+    """Async counterpart of GamerTokenAuthentication.authenticate_credentials for the async views
+
+    Returns:
+        tuple -- (user, token), the same value the token cache holds
+
+    Raises:
+        AuthenticationFailed -- unknown token or inactive user
+    """
+    cached = token_cache.get(key)
+    if cached is not None:
+        return cached
+
+    try:
+        token = await Token.objects.select_related('user__gamer').aget(key=key)
+    except Token.DoesNotExist as ex:
+        raise exceptions.AuthenticationFailed('Invalid token.') from ex
+
+    if not token.user.is_active:
+        raise exceptions.AuthenticationFailed('User inactive or deleted.')
+
+    token_cache.set(key, (token.user, token))
+    return (token.user, token)
@@ -0,0 +1,141 @@
+"""Response cache for the read endpoints of the levelupapi viewsets
+
+Cached bodies are keyed on the version markers from levelupapi.versions, so
+the post_save/post_delete/m2m_changed receivers that bump a collection
+invalidate exactly the responses built from it. Stale entries are never
+read again and age out through the cache TIMEOUT.
+
+The bodies may stay in a per-process cache, as the markers in their keys
+are shared. Bodies shared between processes keyed on per-process markers
+would be served stale, which check_shared_markers refuses at startup.
+"""
+import hashlib
+import threading
+from collections import Counter
+from functools import wraps
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+
+from levelupapi import replicas, versions
+
+KEY_PREFIX = 'levelupapi:response:'
+
+# Backends whose entries are only seen by the process that wrote them
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def get_settings():
+    return {
+        'ENABLED': True,
+        'ALIAS': 'default',
+        'TIMEOUT': 300,
+        **getattr(settings, 'LEVELUP_RESPONSE_CACHE', {}),
+    }
+
+
+def is_process_local(alias):
+    return settings.CACHES.get(alias, {}).get('BACKEND') in PROCESS_LOCAL_BACKENDS
+
+
+def check_shared_markers(app_configs, **kwargs):
+    """A response cache shared by the workers needs version markers they share too"""
+    config = get_settings()
+    marker_alias = versions.get_settings()['ALIAS']
+    if config['ENABLED'] and not is_process_local(config['ALIAS']) and is_process_local(marker_alias):
+        return [checks.Error(
+            f"LEVELUP_RESPONSE_CACHE['ALIAS'] ({config['ALIAS']!r}) is shared between processes, "
+            f"but the version markers in LEVELUP_VERSIONS['ALIAS'] ({marker_alias!r}) are not.",
+            hint='Point LEVELUP_VERSIONS at a cache every worker process shares.',
+            id='levelupapi.E001',
+        )]
+    return []
+
+
+class CacheStats:
+    """Hit and miss counters per cached view, kept in this process"""
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, name, hit):
+        with self._lock:
+            self._counts[(name, 'hits' if hit else 'misses')] += 1
+
+    def snapshot(self):
+        with self._lock:
+            counts = dict(self._counts)
+        names = sorted({name for name, _ in counts})
+        result = {}
+        for name in names:
+            hits = counts.get((name, 'hits'), 0)
+            misses = counts.get((name, 'misses'), 0)
+            result[name] = {
+                'hits': hits,
+                'misses': misses,
+                'hit_ratio': round(hits / (hits + misses), 3) if hits + misses else None,
+            }
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+stats = CacheStats()
+
+
+def response_key(request, resources, per_gamer):
+    """Cache key built from the resource versions, the URL and sorted query params"""
+    parts = [marker for marker, _ in versions.get_versions(resources)]
+    # The host matters because pagination links are absolute URLs
+    parts.append(request.get_host())
+    parts.append(request.path)
+    parts.extend(f'{name}={value}' for name, values in sorted(request.query_params.lists()) for value in values)
+    if per_gamer:
+        gamer = getattr(request, 'gamer', None)
+        parts.append(f'gamer={gamer.pk if gamer is not None else ""}')
+    return KEY_PREFIX + hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+
+def cached(*resources, per_gamer=False):
+    """Method decorator that serves successful GET responses from the cache
+
+    Args:
+        resources (str): the collections the response is built from
+        per_gamer (bool): whether the body depends on the requesting gamer
+    """
+    def decorator(view):
+        name = view.__qualname__
+
+        @wraps(view)
+        def wrapper(self, request, *args, **kwargs):
+            config = get_settings()
+            # Replica rows may be older than the markers in the key
+            if not config['ENABLED'] or request.method != 'GET' or replicas.replica_alias() is not None:
+                return view(self, request, *args, **kwargs)
+
+            cache = caches[config['ALIAS']]
+            key = response_key(request, resources, per_gamer)
+            data = cache.get(key)
+            if data is not None:
+                stats.record(name, hit=True)
+                response = Response(data)
+                response['X-Cache'] = 'HIT'
+                return response
+
+            stats.record(name, hit=False)
+            response = view(self, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                cache.set(key, response.data, config['TIMEOUT'])
+            response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,219 @@
+"""Per-request SQL and timing instrumentation
+
+RequestMetricsMiddleware times every request and splits it into:
+
+    db         time spent executing SQL, with the number of queries
+    serialize  time spent in the view outside of SQL, i.e. building the
+               response data (serializers, the values() fast path)
+    render     time spent turning a DRF Response into bytes
+    total      wall time through the middleware
+
+The numbers go out as a Server-Timing header and into per-route samples
+that `/stats/requests` turns into percentiles. When LEVELUP_INSTRUMENTATION
+is disabled the middleware removes itself at startup and no query wrapper
+is installed, so there is no per-request cost at all.
+"""
+import contextvars
+import threading
+import time
+from collections import deque
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+# Metrics of the request being handled, read by the query wrapper. A context
+# variable so the sync_to_async threads of async views count their queries
+_current = contextvars.ContextVar('levelup_request_metrics', default=None)
+
+
+def get_settings():
+    return {
+        'ENABLED': False,
+        # Most recent requests kept per route for the percentiles
+        'SAMPLES': 1000,
+        **getattr(settings, 'LEVELUP_INSTRUMENTATION', {}),
+    }
+
+
+class RequestMetrics:
+    """Counters of one request"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.view_start = None
+        self.view_db_time = 0.0
+        self.view_time = None
+        self.render_start = None
+
+    def view_started(self):
+        self.view_start = time.perf_counter()
+        self.view_db_time = self.db_time
+
+    def view_finished(self):
+        now = time.perf_counter()
+        if self.view_start is not None:
+            self.view_time = now - self.view_start - (self.db_time - self.view_db_time)
+        self.render_start = now
+
+    def timings(self):
+        """Milliseconds per phase, phases that did not happen are left out"""
+        now = time.perf_counter()
+        result = {'db': self.db_time * 1000}
+        if self.view_time is not None:
+            result['serialize'] = self.view_time * 1000
+        if self.render_start is not None:
+            result['render'] = (now - self.render_start) * 1000
+        result['total'] = (now - self.start) * 1000
+        return result
+
+
+def record_query(execute, sql, params, many, context):
+    """Connection execute wrapper counting the queries of the current request"""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_time += time.perf_counter() - start
+
+
+def install_query_wrapper(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    index = max(0, min(len(ordered) - 1, round(fraction * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+class RouteStats:
+    """The latest samples of every route, kept in this process"""
+
+    def __init__(self):
+        self._samples = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def record(self, route, queries, timings, size):
+        with self._lock:
+            samples = self._samples.get(route)
+            if samples is None or samples.maxlen != size:
+                samples = self._samples[route] = deque(samples or (), maxlen=size)
+            samples.append((queries, timings))
+            self._counts[route] = self._counts.get(route, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            samples = {route: list(values) for route, values in self._samples.items()}
+            counts = dict(self._counts)
+
+        result = {}
+        for route in sorted(samples):
+            rows = samples[route]
+            queries = sorted(queries for queries, _ in rows)
+            summary = {
+                'requests': counts[route],
+                'samples': len(rows),
+                'queries': {
+                    'mean': round(sum(queries) / len(queries), 2),
+                    'max': queries[-1],
+                },
+            }
+            for phase in ('db', 'serialize', 'render', 'total'):
+                values = sorted(timings[phase] for _, timings in rows if phase in timings)
+                if values:
+                    summary[f'{phase}_ms'] = {
+                        'mean': round(sum(values) / len(values), 3),
+                        'p50': round(percentile(values, 0.50), 3),
+                        'p95': round(percentile(values, 0.95), 3),
+                        'p99': round(percentile(values, 0.99), 3),
+                        'max': round(values[-1], 3),
+                    }
+            result[route] = summary
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+
+stats = RouteStats()
+
+
+def route_name(request):
+    """`METHOD view-name`, e.g. `GET event-list`, or the URL pattern for unnamed views"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return f'{request.method} <unresolved>'
+    return f'{request.method} {match.view_name or match.route}'
+
+
+class RequestMetricsMiddleware:
+    """Time each request, add Server-Timing and record the per-route samples
+
+    Put it first in MIDDLEWARE so `total` covers the other middleware too.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not get_settings()['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        connection_created.connect(install_query_wrapper, dispatch_uid='levelupapi.instrumentation')
+        # Connections that were opened before the middleware was loaded
+        for connection in connections.all():
+            install_query_wrapper(connection)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        metrics = request._metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = request._metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._metrics.view_started()
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after this hook, so what comes
+        # after it is rendering and what came before is the view
+        request._metrics.view_finished()
+        return response
+
+    def finish(self, request, response, metrics):
+        timings = metrics.timings()
+        response['Server-Timing'] = ', '.join(
+            f'{phase};dur={value:.2f}' + (f';desc="{metrics.queries} queries"' if phase == 'db' else '')
+            for phase, value in timings.items()
+        )
+        stats.record(route_name(request), metrics.queries, timings, get_settings()['SAMPLES'])
+        return response
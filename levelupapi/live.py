@@ -0,0 +1,150 @@
+"""In-process pub/sub behind the /events/stream server-sent events endpoint
+
+The receivers in levelupapi.signals publish small deltas once the writing
+transaction commits:
+
+    created / updated   {"id", "description", "date", "time", "game", "organizer", "attendee_count", "capacity"}
+    deleted             {"id"}
+    archived            {"id"}, moved out of the hot set, still under ?include_archived=true
+    joined / left       {"event", "gamers", "attendee_count"}
+
+Every subscriber (one open stream) owns a bounded asyncio queue on the event
+loop that serves it. Publishing never blocks the writer: a subscriber
+that falls behind has its backlog replaced by a single `resync` message,
+which tells the client to reload /events and carry on from there.
+
+Subscribers only see writes made in the same process, so run the ASGI
+server with one worker, or put a shared broker in front of this.
+"""
+import asyncio
+import itertools
+import threading
+
+from django.conf import settings
+from django.db import transaction
+
+RESYNC = 'resync'
+
+
+def get_settings():
+    return {
+        # Messages a slow subscriber may have waiting before it has to resync
+        'QUEUE_SIZE': 100,
+        # Seconds between comment lines that keep idle connections open
+        'KEEPALIVE': 15,
+        **getattr(settings, 'LEVELUP_LIVE', {}),
+    }
+
+
+class Subscription:
+    """One stream's queue, only touched from the event loop that serves it"""
+
+    def __init__(self, loop, size):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=size)
+        self.behind = False
+
+    def offer(self, message):
+        if self.behind:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # The client reloads on resync, so the backlog is worth nothing
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait((None, RESYNC, {}))
+            self.behind = True
+
+    async def get(self):
+        """The next (id, kind, data) message"""
+        message = await self.queue.get()
+        if message[1] == RESYNC:
+            self.behind = False
+        return message
+
+
+class Broker:
+    """Fan-out of published messages to every subscription"""
+
+    def __init__(self):
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def subscribe(self):
+        subscription = Subscription(asyncio.get_running_loop(), get_settings()['QUEUE_SIZE'])
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def has_subscribers(self):
+        return bool(self._subscriptions)
+
+    def publish(self, kind, data):
+        """Queue a message for every subscriber, callable from any thread"""
+        with self._lock:
+            message = (next(self._ids), kind, data)
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, message)
+            except RuntimeError:
+                # The loop is closed, the stream is gone
+                self.unsubscribe(subscription)
+
+
+broker = Broker()
+
+
+def event_saved(event, created):
+    if not broker.has_subscribers():
+        return
+    data = {
+        'id': event.pk,
+        'description': event.description,
+        'date': event.date.isoformat() if hasattr(event.date, 'isoformat') else event.date,
+        'time': event.time.isoformat() if hasattr(event.time, 'isoformat') else event.time,
+        'game': event.game_id,
+        'organizer': event.organizer_id,
+        'attendee_count': event.attendee_count,
+        'capacity': event.capacity,
+    }
+    transaction.on_commit(lambda: broker.publish('created' if created else 'updated', data))
+
+
+def event_deleted(event):
+    if not broker.has_subscribers():
+        return
+    data = {'id': event.pk}
+    transaction.on_commit(lambda: broker.publish('deleted', data))
+
+
+def events_archived(event_ids):
+    if not broker.has_subscribers():
+        return
+    event_ids = list(event_ids)
+
+    def publish():
+        for event_id in event_ids:
+            broker.publish('archived', {'id': event_id})
+    transaction.on_commit(publish)
+
+
+def attendance_changed(event_ids, gamer_ids, action):
+    if not broker.has_subscribers() or action is None:
+        return
+    event_ids, gamer_ids = list(event_ids), list(gamer_ids)
+
+    def publish():
+        # Read after the commit so concurrent changes are counted in
+        from levelupapi.models import Event
+        counts = dict(Event.objects.filter(pk__in=event_ids).values_list('id', 'attendee_count'))
+        for event_id in event_ids:
+            if event_id in counts:
+                broker.publish(action, {'event': event_id, 'gamers': gamer_ids, 'attendee_count': counts[event_id]})
+    transaction.on_commit(publish)
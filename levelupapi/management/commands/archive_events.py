@@ -0,0 +1,32 @@
+"""Management command that moves past events into the archive tables"""
+from django.core.management.base import BaseCommand, CommandError
+
+from levelupapi import archive
+
+
+class Command(BaseCommand):
+    help = (
+        'Move events older than --days and their attendees into the archive tables, in batches. '
+        'Safe to run on a schedule, each run picks up where the last one stopped'
+    )
+
+    def add_arguments(self, parser):
+        config = archive.get_settings()
+        parser.add_argument('--days', type=int, default=config['DAYS'], help='Archive events dated before this many days ago')
+        parser.add_argument('--batch-size', type=int, default=config['BATCH_SIZE'], help='Events moved per transaction')
+        parser.add_argument('--max-batches', type=int, default=None, help='Stop after this many batches')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the events that would be archived')
+
+    def handle(self, *args, **options):
+        if options['days'] < 0:
+            raise CommandError('--days can not be negative')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        if options['dry_run']:
+            count = archive.archivable(options['days']).count()
+            self.stdout.write(f'{count} event(s) would be archived')
+            return
+
+        archived = archive.archive_events(options['days'], options['batch_size'], options['max_batches'])
+        self.stdout.write(self.style.SUCCESS(f'Archived {archived} event(s)'))
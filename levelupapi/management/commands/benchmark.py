@@ -0,0 +1,217 @@
+"""Management command that load tests the main endpoints and compares against a baseline"""
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from rest_framework.authtoken.models import Token
+
+from levelupapi.instrumentation import percentile
+from levelupapi.models import Event
+
+SCENARIOS = ('games', 'events', 'attendance', 'login', 'usergames', 'userevents')
+
+
+class Response:
+    """Status code of a request, the only part the benchmark looks at"""
+
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class TestClientTransport:
+    """Requests through django.test.Client, in this process"""
+
+    def __init__(self, host):
+        self.host = host
+        self.local = threading.local()
+
+    def request(self, method, path, token=None, data=None):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = Client(HTTP_HOST=self.host)
+        headers = {'HTTP_AUTHORIZATION': f'Token {token}'} if token else {}
+        if data is not None:
+            response = getattr(client, method.lower())(path, json.dumps(data), content_type='application/json', **headers)
+        else:
+            response = getattr(client, method.lower())(path, **headers)
+        if response.streaming:
+            # The reports do their work while the body is sent, and the
+            # response is only closed once it has all been read
+            for _ in response.streaming_content:
+                pass
+        return response
+
+
+class HttpTransport:
+    """Requests to a running server, e.g. `runserver` or an ASGI server"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method, path, token=None, data=None):
+        headers = {'Authorization': f'Token {token}'} if token else {}
+        body = None
+        if data is not None:
+            body = json.dumps(data).encode()
+            headers['Content-Type'] = 'application/json'
+        request = urllib.request.Request(self.base_url + path, data=body, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                return Response(response.status)
+        except urllib.error.HTTPError as ex:
+            return Response(ex.code)
+
+
+def summarize(latencies, errors, elapsed):
+    """Latency percentiles in milliseconds and throughput in requests per second"""
+    ordered = sorted(latencies)
+    return {
+        'requests': len(ordered),
+        'errors': errors,
+        'p50': round(percentile(ordered, 0.50) * 1000, 2),
+        'p95': round(percentile(ordered, 0.95) * 1000, 2),
+        'p99': round(percentile(ordered, 0.99) * 1000, 2),
+        'throughput': round(len(ordered) / elapsed, 1) if elapsed else None,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the game, event, attendance, login and report endpoints'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per scenario')
+        parser.add_argument('--concurrency', type=int, default=1, help='Requests in flight at once')
+        parser.add_argument('--scenario', action='append', choices=SCENARIOS, help='Run only these scenarios')
+        parser.add_argument('--url', help='Base URL of a running server, the test client is used without it')
+        parser.add_argument('--host', default='localhost', help='Host header for the test client')
+        parser.add_argument('--page-size', type=int, default=50, help='page_size for the list endpoints')
+        parser.add_argument('--username', help='User to log in as, defaults to the first generated one')
+        parser.add_argument('--password', default='levelup')
+        parser.add_argument('--save-baseline', metavar='PATH', help='Write the results as a JSON baseline')
+        parser.add_argument('--baseline', metavar='PATH', help='Compare against a saved baseline')
+        parser.add_argument(
+            '--max-regression', type=float, default=None, metavar='PERCENT',
+            help='Fail when a p95 is this much slower than the baseline'
+        )
+
+    def handle(self, *args, **options):
+        transport = HttpTransport(options['url']) if options['url'] else TestClientTransport(options['host'])
+        if options['requests'] < 1:
+            raise CommandError('--requests must be at least 1')
+        token = self.get_token(options['username'])
+        # Events with a free seat the gamer is not attending, so every signup is undone by its leave
+        event_ids = list(
+            Event.objects.with_free_seat().exclude(attendees__user=token.user).order_by('-id').values_list(
+                'id', flat=True
+            )[:1000]
+        )
+        if not event_ids:
+            raise CommandError('There are no events with free seats to sign up for, run generate_dataset first')
+        username = token.user.username
+        page_size = options['page_size']
+        rng = random.Random(0)
+        lock = threading.Lock()
+
+        def attendance(i):
+            # Odd requests undo the even ones, so the data ends up unchanged
+            with lock:
+                event_id = rng.choice(event_ids) if i % 2 == 0 else attendance.last
+                attendance.last = event_id
+            if i % 2 == 0:
+                return ('POST', f'/events/{event_id}/signup', token.key, None)
+            return ('DELETE', f'/events/{event_id}/leave', token.key, None)
+        attendance.last = None
+
+        requests = {
+            'games': lambda i: ('GET', f'/games?page_size={page_size}', token.key, None),
+            'events': lambda i: ('GET', f'/events?page_size={page_size}', token.key, None),
+            'attendance': attendance,
+            'login': lambda i: ('POST', '/login', None, {'username': username, 'password': options['password']}),
+            'usergames': lambda i: ('GET', '/reports/usergames?format=ndjson', None, None),
+            'userevents': lambda i: ('GET', '/reports/userevents?format=ndjson', None, None),
+        }
+
+        results = {}
+        for name in options['scenario'] or SCENARIOS:
+            if name == 'attendance':
+                # Signups and leaves have to stay paired
+                results[name] = self.run(transport, requests[name], options['requests'], 1)
+            else:
+                results[name] = self.run(transport, requests[name], options['requests'], options['concurrency'])
+        self.report(results)
+
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w', encoding='utf-8') as baseline:
+                json.dump(results, baseline, indent=2)
+            self.stdout.write(f'Saved baseline to {options["save_baseline"]}')
+        if options['baseline']:
+            self.compare(results, options['baseline'], options['max_regression'])
+
+    def get_token(self, username):
+        tokens = Token.objects.select_related('user').filter(user__gamer__isnull=False).order_by('user_id')
+        if username:
+            token = tokens.filter(user__username=username).first()
+        else:
+            token = tokens.filter(user__username__startswith='bench-').first() or tokens.first()
+        if token is None:
+            raise CommandError('No gamer with a token to benchmark as')
+        return token
+
+    def run(self, transport, make_request, count, concurrency):
+        def send(i):
+            method, path, token, data = make_request(i)
+            start = time.perf_counter()
+            response = transport.request(method, path, token, data)
+            return time.perf_counter() - start, response.status_code >= 400
+
+        start = time.perf_counter()
+        if concurrency > 1:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                outcomes = list(pool.map(send, range(count)))
+        else:
+            outcomes = [send(i) for i in range(count)]
+        elapsed = time.perf_counter() - start
+
+        return summarize(
+            [latency for latency, _ in outcomes], sum(failed for _, failed in outcomes), elapsed
+        )
+
+    def report(self, results):
+        self.stdout.write(f'{"scenario":<12}{"requests":>10}{"errors":>8}{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}{"req/s":>10}')
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<12}{result["requests"]:>10}{result["errors"]:>8}'
+                f'{result["p50"]:>10}{result["p95"]:>10}{result["p99"]:>10}{result["throughput"]:>10}'
+            )
+
+    def compare(self, results, path, max_regression):
+        try:
+            with open(path, encoding='utf-8') as baseline:
+                baseline = json.load(baseline)
+        except (OSError, ValueError) as ex:
+            raise CommandError(f'Could not read baseline {path}: {ex}') from ex
+
+        regressions = []
+        self.stdout.write(f'Compared with {path} (positive is slower, throughput: positive is faster)')
+        for name, result in results.items():
+            before = baseline.get(name)
+            if before is None:
+                self.stdout.write(f'{name:<12}not in the baseline')
+                continue
+            changes = {
+                key: (result[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+                for key in ('p50', 'p95', 'p99', 'throughput')
+            }
+            self.stdout.write(f'{name:<12}' + ''.join(f'{key} {change:+.1f}%  ' for key, change in changes.items()))
+            if max_regression is not None and changes['p95'] > max_regression:
+                regressions.append(f'{name} p95 {changes["p95"]:+.1f}%')
+
+        if regressions:
+            raise CommandError(f'Slower than the baseline: {", ".join(regressions)}')
@@ -0,0 +1,159 @@
+"""Management command that fills the database with a large synthetic dataset"""
+import datetime
+import random
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.authtoken.models import Token
+
+from levelupapi import versions
+from levelupapi.models import Event, Game, Gamer, GameType
+from levelupreports import materialize
+
+GAME_TYPES = ('Board game', 'Role-playing game', 'MMO game', 'Card game', 'Party game')
+MAKERS = ('Parker Brothers', 'Hasbro', 'Wizards of the Coast', 'Fantasy Flight', 'Z-Man Games', 'Ravensburger')
+SKILL_LEVELS = ('Novice', 'Intermediate', 'Advanced', 'Novice-Advanced')
+FIRST_NAMES = ('Carrie', 'Sam', 'Alex', 'Jordan', 'Taylor', 'Morgan', 'Casey', 'Riley', 'Jamie', 'Avery')
+LAST_NAMES = ('Belk', 'Smith', 'Nguyen', 'Garcia', 'Okafor', 'Kowalski', 'Tanaka', 'Silva', 'Haddad', 'Berg')
+
+
+def chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = 'Generate users, gamers, games, events and attendees with bulk_create for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000, help='Users, each with a gamer and a token')
+        parser.add_argument('--games', type=int, default=2000)
+        parser.add_argument('--events', type=int, default=100000)
+        parser.add_argument(
+            '--attendees', type=int, default=20,
+            help='Average attendees per event, 20 with 100000 events is about 2M attendee rows'
+        )
+        parser.add_argument('--prefix', default='bench', help='Username prefix of the generated users')
+        parser.add_argument('--password', default='levelup', help='Password of every generated user')
+        parser.add_argument('--seed', type=int, default=None, help='Seed for reproducible data')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows per INSERT')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        prefix = options['prefix']
+        if options['users'] < 1:
+            raise CommandError('--users must be at least 1')
+        if User.objects.filter(username__startswith=f'{prefix}-').exists():
+            raise CommandError(f'Users named "{prefix}-..." already exist, pass another --prefix')
+
+        with transaction.atomic():
+            gamer_ids = self.create_gamers(rng, prefix, options['users'], options['password'], batch_size)
+            players = self.create_games(rng, gamer_ids, options['games'], batch_size)
+            attendee_rows = self.create_events(
+                rng, prefix, gamer_ids, players, options['events'], options['attendees'], batch_size
+            )
+
+        # bulk_create sends no signals, so do what the receivers would have done
+        materialize.rebuild()
+        versions.bump(versions.GAME_TYPES, versions.GAMES, versions.EVENTS, versions.GAMERS)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(gamer_ids)} gamers, {len(players)} games, '
+            f'{options["events"]} events and {attendee_rows} attendee rows'
+        ))
+
+    def create_gamers(self, rng, prefix, count, password, batch_size):
+        # One hash for everybody, hashing 10000 passwords would take minutes
+        password = make_password(password)
+        users = User.objects.bulk_create([
+            User(
+                username=f'{prefix}-{i}',
+                password=password,
+                first_name=rng.choice(FIRST_NAMES),
+                last_name=rng.choice(LAST_NAMES),
+                email=f'{prefix}-{i}@example.com'
+            )
+            for i in range(count)
+        ], batch_size=batch_size)
+        if users[0].pk is None:
+            raise CommandError('The database does not return primary keys from bulk inserts')
+
+        gamers = Gamer.objects.bulk_create(
+            [Gamer(user=user, bio=f'Gamer number {i}') for i, user in enumerate(users)], batch_size=batch_size
+        )
+        Token.objects.bulk_create(
+            [Token(user=user, key=Token.generate_key()) for user in users], batch_size=batch_size
+        )
+        self.stdout.write(f'{count} users, gamers and tokens')
+        return [gamer.pk for gamer in gamers]
+
+    def create_games(self, rng, gamer_ids, count, batch_size):
+        game_type_ids = list(GameType.objects.values_list('id', flat=True))
+        if not game_type_ids:
+            game_type_ids = [
+                game_type.pk for game_type in GameType.objects.bulk_create([GameType(label=label) for label in GAME_TYPES])
+            ]
+        games = Game.objects.bulk_create([
+            Game(
+                game_type_id=rng.choice(game_type_ids),
+                gamer_id=rng.choice(gamer_ids),
+                title=f'Game {i}',
+                maker=rng.choice(MAKERS),
+                number_of_players=rng.randint(1, 12),
+                skill_level=rng.choice(SKILL_LEVELS)
+            )
+            for i in range(count)
+        ], batch_size=batch_size)
+        self.stdout.write(f'{count} games')
+        return {game.pk: game.number_of_players for game in games}
+
+    def create_events(self, rng, prefix, gamer_ids, players, count, attendees, batch_size):
+        """Create the events in batches, each followed by its attendee rows
+
+        attendee_count is set up front from the attendees picked for each
+        event, so no recount is needed afterwards. capacity is the game's
+        number_of_players, raised for events that were given more attendees.
+        """
+        game_ids = list(players)
+        if count and not game_ids:
+            raise CommandError('Events need games, pass --games')
+        first_day = datetime.date.today() - datetime.timedelta(days=180)
+        through = Event.attendees.through
+        total = 0
+        for numbers in chunks(range(count), batch_size):
+            picked = [
+                rng.sample(gamer_ids, min(len(gamer_ids), rng.randint(0, 2 * attendees)))
+                for _ in numbers
+            ]
+            picked_games = [rng.choice(game_ids) for _ in numbers]
+            events = Event.objects.bulk_create([
+                Event(
+                    game_id=game_id,
+                    organizer_id=rng.choice(gamer_ids),
+                    description=f'{prefix} event {i}',
+                    date=first_day + datetime.timedelta(days=rng.randrange(365)),
+                    time=datetime.time(rng.randrange(9, 23), rng.choice((0, 15, 30, 45))),
+                    attendee_count=len(gamers),
+                    capacity=max(players[game_id], len(gamers))
+                )
+                for i, gamers, game_id in zip(numbers, picked, picked_games)
+            ])
+            rows = (
+                through(event_id=event.pk, gamer_id=gamer_id)
+                for event, gamers in zip(events, picked)
+                for gamer_id in gamers
+            )
+            for chunk in chunks(rows, batch_size):
+                through.objects.bulk_create(chunk)
+                total += len(chunk)
+            self.stdout.write(f'{numbers[-1] + 1}/{count} events', ending='\r')
+        self.stdout.write('')
+        return total
@@ -0,0 +1,18 @@
+"""Management command that rebuilds the game full-text search index"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from levelupapi import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the levelupapi_game_fts index from the games table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        if connections[options['database']].vendor != 'sqlite':
+            raise CommandError('The game search index needs SQLite FTS5')
+        search.rebuild_index(options['database'])
+        self.stdout.write(self.style.SUCCESS('Rebuilt the game search index'))
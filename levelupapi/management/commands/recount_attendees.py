@@ -0,0 +1,19 @@
+"""Management command that repairs the denormalized event attendee counts"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from levelupapi import versions
+from levelupapi.models import Event
+
+
+class Command(BaseCommand):
+    help = 'Recount Event.attendee_count from the attendees through table'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            fixed = Event.objects.recount_attendees()
+            if fixed:
+                # The UPDATE fires no signals. The feeds do not show counts,
+                # so only the event collection gets a new marker
+                versions.bump(versions.EVENTS)
+        self.stdout.write(self.style.SUCCESS(f'Fixed the attendee count of {fixed} event(s)'))
@@ -0,0 +1,30 @@
+"""Management command that refreshes the SQLite read replica from the default database"""
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from levelupapi.replicas import get_settings
+
+
+class Command(BaseCommand):
+    help = 'Copy the default SQLite database over the replica file with the SQLite backup API'
+
+    def handle(self, *args, **options):
+        alias = get_settings()['ALIAS']
+        source = connections[DEFAULT_DB_ALIAS]
+        if alias not in connections:
+            raise CommandError(f'There is no "{alias}" database configured')
+        target = connections[alias].settings_dict
+        if source.vendor != 'sqlite' or 'sqlite3' not in target['ENGINE']:
+            raise CommandError('sync_replica only copies SQLite databases, use the server\'s own replication')
+
+        # The backup API copies a consistent snapshot while writers keep going
+        source.ensure_connection()
+        replica = sqlite3.connect(str(target['NAME']))
+        try:
+            source.connection.backup(replica)
+        finally:
+            replica.close()
+        connections[alias].close()
+        self.stdout.write(self.style.SUCCESS(f'Copied {source.settings_dict["NAME"]} to {target["NAME"]}'))
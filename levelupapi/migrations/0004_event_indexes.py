@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('levelupapi', '0003_alter_event_attendees_alter_event_game'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['date', 'time'], name='event_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['game', 'date'], name='event_game_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['organizer', 'date'], name='event_organizer_date_idx'),
+        ),
+    ]
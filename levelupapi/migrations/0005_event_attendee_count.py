@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:07
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_attendees(apps, schema_editor):
+    Event = apps.get_model('levelupapi', 'Event')
+    counts = Event.attendees.through.objects.filter(event_id=OuterRef('pk')).order_by().values('event_id').annotate(
+        total=Count('*')
+    ).values('total')
+    Event.objects.update(attendee_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('levelupapi', '0004_event_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='attendee_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_attendees, migrations.RunPython.noop),
+    ]
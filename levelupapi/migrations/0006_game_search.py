@@ -0,0 +1,80 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:26
+
+import django.db.models.deletion
+import levelupapi.models.game_search
+from django.db import migrations, models
+
+# External content FTS5 index over levelupapi_game, the triggers keep it in
+# step with every insert, update and delete, including bulk and raw SQL ones
+CREATE_SEARCH_INDEX = [
+    """
+    CREATE VIRTUAL TABLE levelupapi_game_fts USING fts5(
+        title, maker,
+        content='levelupapi_game', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER levelupapi_game_fts_insert AFTER INSERT ON levelupapi_game BEGIN
+        INSERT INTO levelupapi_game_fts(rowid, title, maker) VALUES (new.id, new.title, new.maker);
+    END
+    """,
+    """
+    CREATE TRIGGER levelupapi_game_fts_delete AFTER DELETE ON levelupapi_game BEGIN
+        INSERT INTO levelupapi_game_fts(levelupapi_game_fts, rowid, title, maker)
+        VALUES ('delete', old.id, old.title, old.maker);
+    END
+    """,
+    """
+    CREATE TRIGGER levelupapi_game_fts_update AFTER UPDATE OF title, maker ON levelupapi_game BEGIN
+        INSERT INTO levelupapi_game_fts(levelupapi_game_fts, rowid, title, maker)
+        VALUES ('delete', old.id, old.title, old.maker);
+        INSERT INTO levelupapi_game_fts(rowid, title, maker) VALUES (new.id, new.title, new.maker);
+    END
+    """,
+    "INSERT INTO levelupapi_game_fts(levelupapi_game_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0)')",
+    "INSERT INTO levelupapi_game_fts(levelupapi_game_fts) VALUES ('rebuild')",
+]
+
+DROP_SEARCH_INDEX = [
+    'DROP TRIGGER IF EXISTS levelupapi_game_fts_insert',
+    'DROP TRIGGER IF EXISTS levelupapi_game_fts_delete',
+    'DROP TRIGGER IF EXISTS levelupapi_game_fts_update',
+    'DROP TABLE IF EXISTS levelupapi_game_fts',
+]
+
+
+def run_on_sqlite(statements):
+    def run(apps, schema_editor):
+        # FTS5 is SQLite only
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('levelupapi', '0005_event_attendee_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameSearch',
+            fields=[
+                ('game', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search', serialize=False, to='levelupapi.game')),
+                ('document', levelupapi.models.game_search.SearchDocumentField(db_column='levelupapi_game_fts')),
+                ('title', models.TextField()),
+                ('maker', models.TextField()),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'levelupapi_game_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(run_on_sqlite(CREATE_SEARCH_INDEX), run_on_sqlite(DROP_SEARCH_INDEX)),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def capacity_from_game(apps, schema_editor):
+    Event = apps.get_model('levelupapi', 'Event')
+    Game = apps.get_model('levelupapi', 'Game')
+    players = Game.objects.filter(pk=OuterRef('game_id'), number_of_players__gt=0).values('number_of_players')
+    Event.objects.update(capacity=Subquery(players))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('levelupapi', '0006_game_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='capacity',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(capacity_from_game, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='EventWaitlist',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist', to='levelupapi.event')),
+                ('gamer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='levelupapi.gamer')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['event', 'created_at'], name='event_waitlist_order_idx')],
+                'constraints': [models.UniqueConstraint(fields=('event', 'gamer'), name='event_waitlist_unique_gamer')],
+            },
+        ),
+    ]
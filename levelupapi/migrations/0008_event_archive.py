@@ -0,0 +1,109 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# The unmanaged EventHistory and EventHistoryAttendee models read these
+CREATE_HISTORY_VIEWS = [
+    """
+    CREATE VIEW levelupapi_eventhistory AS
+    SELECT id, game_id, description, date, time, organizer_id, attendee_count, capacity,
+        CAST(0 AS BOOLEAN) AS archived
+    FROM levelupapi_event
+    UNION ALL
+    SELECT id, game_id, description, date, time, organizer_id, attendee_count, capacity,
+        CAST(1 AS BOOLEAN) AS archived
+    FROM levelupapi_archivedevent
+    """,
+    """
+    CREATE VIEW levelupapi_eventhistory_attendees AS
+    SELECT id, event_id, gamer_id FROM levelupapi_event_attendees
+    UNION ALL
+    SELECT id, event_id, gamer_id FROM levelupapi_archivedeventattendee
+    """,
+]
+
+DROP_HISTORY_VIEWS = [
+    'DROP VIEW levelupapi_eventhistory_attendees',
+    'DROP VIEW levelupapi_eventhistory',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('levelupapi', '0007_event_capacity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('description', models.TextField()),
+                ('date', models.DateField()),
+                ('time', models.TimeField()),
+                ('attendee_count', models.PositiveIntegerField()),
+                ('capacity', models.PositiveIntegerField(null=True)),
+                ('archived', models.BooleanField()),
+            ],
+            options={
+                'db_table': 'levelupapi_eventhistory',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='EventHistoryAttendee',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+            ],
+            options={
+                'db_table': 'levelupapi_eventhistory_attendees',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedEvent',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('description', models.TextField()),
+                ('date', models.DateField()),
+                ('time', models.TimeField()),
+                ('attendee_count', models.PositiveIntegerField(default=0)),
+                ('capacity', models.PositiveIntegerField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='levelupapi.game')),
+                ('organizer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='levelupapi.gamer')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedEventAttendee',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='levelupapi.archivedevent')),
+                ('gamer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='levelupapi.gamer')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='archivedevent',
+            name='attendees',
+            field=models.ManyToManyField(related_name='+', through='levelupapi.ArchivedEventAttendee', to='levelupapi.gamer'),
+        ),
+        migrations.AddConstraint(
+            model_name='archivedeventattendee',
+            constraint=models.UniqueConstraint(fields=('event', 'gamer'), name='archivedevent_unique_attendee'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedevent',
+            index=models.Index(fields=['date', 'time'], name='archivedevent_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedevent',
+            index=models.Index(fields=['game', 'date'], name='archivedevent_game_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedevent',
+            index=models.Index(fields=['organizer', 'date'], name='archivedevent_org_date_idx'),
+        ),
+        migrations.RunSQL(CREATE_HISTORY_VIEWS, DROP_HISTORY_VIEWS),
+    ]
@@ -2,4 +2,8 @@ from .gamer import Gamer
 from .game_type import GameType
 from .event import Event
 from .event_gamer import EventGamer
-from .game import Game
\ No newline at end of file
+from .game import Game
+from .game_search import GameSearch
+from .event_waitlist import EventWaitlist
+from .archived_event import ArchivedEvent, ArchivedEventAttendee
+from .event_history import EventHistory, EventHistoryAttendee
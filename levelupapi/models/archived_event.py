@@ -0,0 +1,35 @@
+from django.db import models
+
+
+class ArchivedEvent(models.Model):
+    """An event moved out of levelupapi_event by the archive_events command, keeping its id"""
+
+    id = models.BigIntegerField(primary_key=True)
+    game = models.ForeignKey("Game", on_delete=models.CASCADE, related_name='+')
+    description = models.TextField()
+    date = models.DateField()
+    time = models.TimeField()
+    organizer = models.ForeignKey("Gamer", on_delete=models.CASCADE, related_name='+')
+    attendees = models.ManyToManyField("Gamer", through='ArchivedEventAttendee', related_name='+')
+    attendee_count = models.PositiveIntegerField(default=0)
+    capacity = models.PositiveIntegerField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date', 'time'], name='archivedevent_date_time_idx'),
+            models.Index(fields=['game', 'date'], name='archivedevent_game_date_idx'),
+            models.Index(fields=['organizer', 'date'], name='archivedevent_org_date_idx'),
+        ]
+
+
+class ArchivedEventAttendee(models.Model):
+    """An attendee row of an archived event"""
+
+    event = models.ForeignKey(ArchivedEvent, on_delete=models.CASCADE, related_name='+')
+    gamer = models.ForeignKey("Gamer", on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'gamer'], name='archivedevent_unique_attendee'),
+        ]
@@ -1,6 +1,39 @@
 from django.db import models
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 import datetime
 
+
+class EventQuerySet(models.QuerySet):
+    """Keeps the denormalized attendee_count column in step with the attendees table"""
+
+    def adjust_attendee_count(self, delta):
+        """Add delta to the count of every event in the queryset in a single UPDATE"""
+        return self.update(attendee_count=F('attendee_count') + delta)
+
+    def with_free_seat(self):
+        """Events whose attendee_count is below their capacity, no capacity means no limit
+
+        Used as the condition of the UPDATE that claims a seat, so the check
+        and the increment are one statement and concurrent signups can not
+        both take the last seat.
+        """
+        return self.filter(Q(capacity__isnull=True) | Q(attendee_count__lt=F('capacity')))
+
+    def recount_attendees(self):
+        """Recompute the count of every event in the queryset from the through table
+
+        Returns:
+            int -- the number of events whose count was wrong
+        """
+        through = self.model.attendees.through
+        counts = through.objects.filter(event_id=OuterRef('pk')).order_by().values('event_id').annotate(
+            total=Count('*')
+        ).values('total')
+        actual = Coalesce(Subquery(counts), 0)
+        return self.alias(actual=actual).exclude(attendee_count=F('actual')).update(attendee_count=actual)
+
+
 class Event(models.Model):
     
     game = models.ForeignKey("Game", on_delete=models.CASCADE, related_name='events')
@@ -9,6 +42,33 @@ class Event(models.Model):
     time = models.TimeField()
     organizer = models.ForeignKey("Gamer", on_delete=models.CASCADE)
     attendees = models.ManyToManyField("Gamer", related_name="events")
+    # Denormalized number of attendees, maintained with single UPDATE statements
+    # by the attendance views and levelupapi.signals, never by save()
+    attendee_count = models.PositiveIntegerField(default=0, editable=False)
+    # Most attendees the event takes, the game's number_of_players unless
+    # set; null means no limit
+    capacity = models.PositiveIntegerField(null=True, blank=True)
+
+    objects = EventQuerySet.as_manager()
+
+    class Meta:
+        # Match the filters on the event list, so date ranges stay index range scans
+        indexes = [
+            models.Index(fields=['date', 'time'], name='event_date_time_idx'),
+            models.Index(fields=['game', 'date'], name='event_game_date_idx'),
+            models.Index(fields=['organizer', 'date'], name='event_organizer_date_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self._state.adding and self.capacity is None and self.game.number_of_players > 0:
+            self.capacity = self.game.number_of_players
+        # Writing back a count loaded earlier would undo concurrent signups
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'attendee_count'
+            ]
+        super().save(*args, **kwargs)
 
     # this is a wrapper that adds a property === the value of the incoming value by using the .setter function
     @property # Is this a getter that collects a property from the db or a creator that adds a property
@@ -18,4 +78,4 @@ class Event(models.Model):
     #  This is a method that sets the value pair for the __joined property to the incoming value from the instantiation
     @joined.setter # This determines the value of the new property
     def joined(self, value):
-        self.__joined = value   
\ No newline at end of file
+        self.__joined = value   
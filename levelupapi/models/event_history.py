@@ -0,0 +1,45 @@
+from django.db import models
+
+
+class EventHistory(models.Model):
+    """Hot and archived events together, read only
+
+    Backed by the levelupapi_eventhistory view, a UNION ALL of
+    levelupapi_event and levelupapi_archivedevent, so ?include_archived=true
+    reads go through the same filters, pagination and serializers as the
+    hot ones.
+    """
+
+    game = models.ForeignKey("Game", on_delete=models.DO_NOTHING, related_name='+')
+    description = models.TextField()
+    date = models.DateField()
+    time = models.TimeField()
+    organizer = models.ForeignKey("Gamer", on_delete=models.DO_NOTHING, related_name='+')
+    attendees = models.ManyToManyField("Gamer", through='EventHistoryAttendee', related_name='+')
+    attendee_count = models.PositiveIntegerField()
+    capacity = models.PositiveIntegerField(null=True)
+    archived = models.BooleanField()
+
+    class Meta:
+        managed = False
+        db_table = 'levelupapi_eventhistory'
+
+    # Set by annotate_joined, like Event.joined
+    @property
+    def joined(self):
+        return self._joined
+
+    @joined.setter
+    def joined(self, value):
+        self._joined = value
+
+
+class EventHistoryAttendee(models.Model):
+    """The attendee rows of hot and archived events, see EventHistory"""
+
+    event = models.ForeignKey(EventHistory, on_delete=models.DO_NOTHING, related_name='+')
+    gamer = models.ForeignKey("Gamer", on_delete=models.DO_NOTHING, related_name='+')
+
+    class Meta:
+        managed = False
+        db_table = 'levelupapi_eventhistory_attendees'
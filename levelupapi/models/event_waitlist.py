@@ -0,0 +1,15 @@
+from django.db import models
+
+
+class EventWaitlist(models.Model):
+    """A gamer waiting for a seat at a full event, seated in order as others leave"""
+
+    event = models.ForeignKey("Event", on_delete=models.CASCADE, related_name='waitlist')
+    gamer = models.ForeignKey("Gamer", on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'gamer'], name='event_waitlist_unique_gamer'),
+        ]
+        indexes = [models.Index(fields=['event', 'created_at'], name='event_waitlist_order_idx')]
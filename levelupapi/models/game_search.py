@@ -0,0 +1,38 @@
+from django.db import models
+from django.db.models import Lookup
+
+
+class SearchDocumentField(models.TextField):
+    """The hidden FTS5 column named after its table, the left side of MATCH"""
+
+
+@SearchDocumentField.register_lookup
+class Match(Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', [*lhs_params, *rhs_params]
+
+
+class GameSearch(models.Model):
+    """Read-only view of the levelupapi_game_fts FTS5 index over game titles and makers
+
+    The table and the triggers that keep it in step with levelupapi_game
+    are created by migration 0006, so bulk_create, update() and raw SQL
+    writes are indexed as well. See levelupapi.search for querying it.
+    """
+
+    game = models.OneToOneField(
+        "Game", on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid', related_name='search'
+    )
+    document = SearchDocumentField(db_column='levelupapi_game_fts')
+    title = models.TextField()
+    maker = models.TextField()
+    # bm25 relevance, lower is better, only set in a MATCH query
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'levelupapi_game_fts'
@@ -0,0 +1,143 @@
+"""Keyset pagination for the levelupapi list endpoints"""
+import base64
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def query_params(request):
+    """Query params of a DRF Request or of a plain Django request (the async views)"""
+    return getattr(request, 'query_params', request.GET)
+
+
+class KeysetPagination(BasePagination):
+    """Opt-in cursor pagination keyed on a unique, stable ordering
+
+    Pagination only kicks in when the client sends `page_size` (the `next`
+    link carries it along with the cursor), so plain requests keep getting
+    the full list. Each page is fetched with a `WHERE key > last_key` range
+    instead of an OFFSET, so page 1000 costs the same as page 1.
+    """
+
+    # The last field must be unique so the ordering has no ties
+    ordering = ('id',)
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def __init__(self):
+        self.request = None
+        self.page_size = None
+        self.next_key = None
+
+    def get_page_size(self, request):
+        """Return the requested page size or None when the client did not opt in"""
+        try:
+            page_size = int(query_params(request)[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return None
+        if page_size < 1:
+            return None
+        return min(page_size, self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        query = self.page_queryset(queryset, request)
+        if query is None:
+            return None
+        return self.finish_page(list(query))
+
+    def page_queryset(self, queryset, request):
+        """The sliced queryset for the requested page, None when not paginating
+
+        Split from paginate_queryset so async views can evaluate it with the
+        async ORM and pass the rows to `finish_page`.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if self.page_size is None:
+            return None
+
+        queryset = queryset.order_by(*self.ordering)
+        cursor = query_params(request).get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self.after(self.decode_cursor(queryset.model, cursor)))
+
+        # Fetch one extra row to know whether there is a next page
+        return queryset[:self.page_size + 1]
+
+    def finish_page(self, page):
+        """Drop the look-ahead row and remember where the next page starts"""
+        if len(page) > self.page_size:
+            page = page[:self.page_size]
+            self.next_key = self.get_key(page[-1])
+        return page
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_next_link(),
+            'results': data
+        }
+
+    def get_next_link(self):
+        if self.next_key is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_key))
+
+    def get_key(self, row):
+        """Read the ordering values off a model instance or a values() dict"""
+        if isinstance(row, dict):
+            return [row[field] for field in self.ordering]
+        return [getattr(row, field) for field in self.ordering]
+
+    def after(self, key):
+        """Build the row-value comparison (a, b, c) > (x, y, z) as a Q object"""
+        condition = Q()
+        for position, field in enumerate(self.ordering):
+            term = Q(**{f'{field}__gt': key[position]})
+            for previous, value in zip(self.ordering[:position], key):
+                term &= Q(**{previous: value})
+            condition |= term
+        return condition
+
+    def encode_cursor(self, key):
+        values = [value if isinstance(value, int) else str(value) for value in key]
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def decode_cursor(self, model, cursor):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if len(values) != len(self.ordering):
+                raise ValueError(cursor)
+            return [self.to_python(model, field, value) for field, value in zip(self.ordering, values)]
+        except Exception as ex:
+            raise NotFound('Invalid cursor') from ex
+
+    def to_python(self, model, field, value):
+        return model._meta.get_field(field).to_python(value)
+
+
+class GamePagination(KeysetPagination):
+    ordering = ('id',)
+
+
+class EventPagination(KeysetPagination):
+    ordering = ('date', 'time', 'id')
+
+
+class SearchPagination(KeysetPagination):
+    """Game search results, best match first (see levelupapi.search)"""
+    ordering = ('search_rank', 'id')
+
+    def to_python(self, model, field, value):
+        if field == 'search_rank':
+            # An annotation, not a model field
+            return float(value)
+        return super().to_python(model, field, value)
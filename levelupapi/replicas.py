@@ -0,0 +1,128 @@
+"""Read replica routing
+
+ReplicaRoutingMiddleware marks GET/HEAD/OPTIONS requests as read-only, and
+ReplicaRouter sends the reads of a read-only request to the replica alias.
+Everything else (writes, reads inside POST/PUT/DELETE requests, management
+commands, signal receivers outside a request) uses `default`.
+
+A client that just wrote is pinned to `default` for STICKY_SECONDS so it
+reads its own writes even when the replica lags behind. Tokens and report
+jobs are always read from `default`: the token /register just issued has
+to authenticate at once, and a job's status changes after the POST that
+pinned its client has long expired.
+
+The version markers are bumped when `default` commits, so replica rows
+can be older than the markers. Reads served by the replica therefore skip
+the ETags and the response cache.
+
+ Clients are told
+apart by their Authorization header, or by address when they send none.
+The pins are kept in the PIN_ALIAS cache, which every worker process has
+to share: the next read of a client may land on any of them.
+"""
+import contextvars
+import hashlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PIN_KEY_PREFIX = 'levelupapi:pinned:'
+# Models read from default even in read-only requests, see above
+PRIMARY_MODELS = ('authtoken.token', 'levelupreports.reportjob')
+
+# Whether the current request may read from the replica. A context variable
+# so async views and the sync_to_async threads they use see the same value
+_read_only = contextvars.ContextVar('levelup_read_only', default=False)
+
+
+def get_settings():
+    return {
+        'ENABLED': False,
+        'ALIAS': 'replica',
+        'STICKY_SECONDS': 5,
+        'PIN_ALIAS': 'shared',
+        **getattr(settings, 'LEVELUP_REPLICA', {}),
+    }
+
+
+def replica_alias():
+    """The alias reads should use right now, None when they stay on default"""
+    config = get_settings()
+    if config['ENABLED'] and _read_only.get():
+        return config['ALIAS']
+    return None
+
+
+class ReplicaRouter:
+    """Database router: read-only requests read the replica, all writes go to default"""
+
+    def db_for_read(self, model, **hints):
+        if model._meta.label_lower in PRIMARY_MODELS:
+            return None
+        return replica_alias()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is a copy of default, see the sync_replica command
+        return db == DEFAULT_DB_ALIAS
+
+
+def pin_key(request):
+    client = request.headers.get('Authorization') or request.META.get('REMOTE_ADDR', '')
+    return PIN_KEY_PREFIX + hashlib.md5(client.encode()).hexdigest()
+
+
+class ReplicaRoutingMiddleware:
+    """Mark safe requests from clients without a recent write as read-only"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        token = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _read_only.reset(token)
+        self.finish(request, response)
+        return response
+
+    async def __acall__(self, request):
+        token = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _read_only.reset(token)
+        self.finish(request, response)
+        return response
+
+    def start(self, request):
+        config = get_settings()
+        read_only = (
+            config['ENABLED']
+            and request.method in SAFE_METHODS
+            and caches[config['PIN_ALIAS']].get(pin_key(request)) is None
+        )
+        return _read_only.set(read_only)
+
+    def finish(self, request, response):
+        config = get_settings()
+        if config['ENABLED'] and request.method not in SAFE_METHODS and response.status_code < 400:
+            caches[config['PIN_ALIAS']].set(pin_key(request), True, config['STICKY_SECONDS'])
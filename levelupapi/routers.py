@@ -0,0 +1,21 @@
+"""Router that also maps PUT on a collection to a bulk update"""
+from rest_framework import routers
+
+
+class BulkRouter(routers.DefaultRouter):
+    """DefaultRouter whose list route sends PUT to the viewset's `bulk_update`
+
+    Viewsets without a `bulk_update` method keep the default behaviour,
+    the router only maps methods a viewset actually implements.
+    """
+
+    routes = [
+        routers.Route(
+            url=route.url,
+            mapping={**route.mapping, 'put': 'bulk_update'},
+            name=route.name,
+            detail=route.detail,
+            initkwargs=route.initkwargs
+        ) if isinstance(route, routers.Route) and not route.detail else route
+        for route in routers.DefaultRouter.routes
+    ]
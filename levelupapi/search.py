@@ -0,0 +1,44 @@
+"""Full-text search over games, backed by the levelupapi_game_fts FTS5 table"""
+import re
+
+from django.db import connections
+from django.db.models import F
+
+# Title matches count ten times as much as maker matches
+RANK_FUNCTION = 'bm25(10.0, 1.0)'
+
+
+def match_expression(text):
+    """Turn free text into an FTS5 query: every word, as a prefix, must match
+
+    Quoting each word keeps FTS5 operators and punctuation in the input from
+    being read as query syntax.
+
+    Returns:
+        str -- the MATCH expression, None when the text has no words
+    """
+    words = re.findall(r'\w+', text)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search_games(games, text):
+    """Narrow a Game queryset to the games matching `text`, best match first
+
+    The rows are annotated with `search_rank` for SearchPagination.
+    """
+    expression = match_expression(text)
+    if expression is None:
+        return games.none()
+    return games.filter(search__document__match=expression).annotate(
+        search_rank=F('search__rank')
+    ).order_by('search_rank', 'id')
+
+
+def rebuild_index(using='default'):
+    """Refill the index from levelupapi_game, e.g. after restoring a backup"""
+    with connections[using].cursor() as cursor:
+        cursor.execute("INSERT INTO levelupapi_game_fts(levelupapi_game_fts) VALUES ('rebuild')")
+        cursor.execute("INSERT INTO levelupapi_game_fts(levelupapi_game_fts, rank) VALUES ('rank', %s)", [RANK_FUNCTION])
+        cursor.execute("INSERT INTO levelupapi_game_fts(levelupapi_game_fts) VALUES ('optimize')")
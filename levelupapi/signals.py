@@ -0,0 +1,131 @@
+"""Model signal receivers for the levelupapi app"""
+from django.contrib.auth.models import User
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+from rest_framework.authtoken.models import Token
+
+from levelupapi import live, versions
+from levelupapi.authentication import token_cache
+from levelupapi.models import ArchivedEvent, Event, Game, Gamer, GameType
+
+# Sent with `game_ids` after games are written with bulk_create/bulk_update,
+# which skip the per-instance post_save signal
+games_bulk_saved = Signal()
+
+# Sent with `event_ids` and `gamer_ids` (organizers and attendees) after
+# levelupapi.archive moved events to the archive tables, inside the same
+# transaction. The events are deleted without the per-row delete signals
+events_archived = Signal()
+
+# Sent with `event_ids`, `gamer_ids` and `action` ('joined' or 'left') whenever
+# gamers join or leave events, including the bulk attendance action that
+# writes the through table directly
+attendance_changed = Signal()
+
+
+@receiver([post_save, post_delete], sender=Token)
+def token_changed(sender, instance, **kwargs):
+    token_cache.invalidate_key(instance.key)
+    token_cache.invalidate_user(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=Gamer)
+def gamer_changed(sender, instance, **kwargs):
+    token_cache.invalidate_user(instance.user_id)
+    versions.bump(versions.GAMERS)
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, **kwargs):
+    token_cache.invalidate_user(instance.pk)
+    versions.bump(versions.GAMERS)
+
+
+@receiver([post_save, post_delete], sender=GameType)
+def game_type_changed(sender, **kwargs):
+    versions.bump(versions.GAME_TYPES)
+
+
+@receiver([post_save, post_delete], sender=Game)
+@receiver(games_bulk_saved)
+def game_changed(sender, **kwargs):
+    versions.bump(versions.GAMES)
+
+
+@receiver([pre_save, pre_delete], sender=Event)
+def event_changing(sender, instance, **kwargs):
+    """Remember whose calendar feeds hold the event before it changes or goes
+
+    The attendee rows are gone by post_delete, and a new organizer's feed
+    is not the only one that changes.
+    """
+    if instance.pk is None:
+        instance._feed_gamer_ids = set()
+        return
+    gamer_ids = set(Event.attendees.through.objects.filter(event_id=instance.pk).values_list('gamer_id', flat=True))
+    gamer_ids.update(Event.objects.filter(pk=instance.pk).values_list('organizer_id', flat=True))
+    instance._feed_gamer_ids = gamer_ids
+
+
+@receiver([post_save, post_delete], sender=Event)
+def event_changed(sender, instance, signal, created=False, **kwargs):
+    gamer_ids = instance.__dict__.pop('_feed_gamer_ids', set()) | {instance.organizer_id}
+    versions.bump(versions.EVENTS, *(versions.gamer_events(gamer_id) for gamer_id in gamer_ids))
+    if signal is post_delete:
+        live.event_deleted(instance)
+    else:
+        live.event_saved(instance, created)
+
+
+@receiver(events_archived)
+def events_archived_handler(sender, event_ids, gamer_ids=(), **kwargs):
+    versions.bump(versions.EVENTS, *(versions.gamer_events(gamer_id) for gamer_id in gamer_ids))
+    live.events_archived(event_ids)
+
+
+@receiver(pre_delete, sender=Gamer)
+def gamer_deleted(sender, instance, **kwargs):
+    """The gamer's attendee rows go with them, take them out of the counts"""
+    Event.objects.filter(attendees=instance).adjust_attendee_count(-1)
+    ArchivedEvent.objects.filter(attendees=instance).update(attendee_count=F('attendee_count') - 1)
+
+
+@receiver(m2m_changed, sender=Event.attendees.through)
+def attendees_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keep attendee_count right for changes made through the related managers
+    (event.attendees.add(), gamer.events.remove(), the admin...) and
+    translate them into attendance_changed
+    """
+    if action == 'pre_clear':
+        # clear() does not say which rows it touched
+        related = instance.events if reverse else instance.attendees
+        instance._cleared_ids = list(related.values_list('id', flat=True))
+    if not action.startswith('post_'):
+        return
+
+    if action == 'post_clear':
+        pk_set = instance.__dict__.pop('_cleared_ids', [])
+    if not reverse:
+        event_ids, gamer_ids = [instance.pk], list(pk_set)
+    else:
+        event_ids, gamer_ids = list(pk_set), [instance.pk]
+
+    events = Event.objects.filter(pk__in=event_ids)
+    if action == 'post_add' and not reverse:
+        # Django leaves ids that were already attending out of pk_set
+        events.adjust_attendee_count(len(pk_set))
+    elif action == 'post_add':
+        events.adjust_attendee_count(1)
+    else:
+        # pk_set of a remove also holds ids that never attended, so recount
+        events.recount_attendees()
+    attendance_changed.send(
+        sender=Event, event_ids=event_ids, gamer_ids=gamer_ids, action='joined' if action == 'post_add' else 'left'
+    )
+
+
+@receiver(attendance_changed)
+def attendance_changed_handler(sender, event_ids, gamer_ids=(), action=None, **kwargs):
+    versions.bump(versions.EVENTS, *(versions.gamer_events(gamer_id) for gamer_id in gamer_ids))
+    live.attendance_changed(event_ids, gamer_ids, action)
@@ -0,0 +1,130 @@
+"""Version markers for the levelupapi resource collections
+
+Each collection (games, events, ...) has a marker in a cache that the
+receivers in levelupapi.signals replace once a write commits. Views combine
+the markers they depend on into an ETag/Last-Modified pair, so a conditional
+GET is answered from two cache reads without querying the collection.
+
+The markers live in the LEVELUP_VERSIONS['ALIAS'] cache, which has to be
+shared by every worker process: a marker bumped in one process only is
+never seen by the others, and they would go on answering 304s and serving
+cached bodies for data that changed.
+"""
+import hashlib
+import time
+import uuid
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import condition
+
+from levelupapi import replicas
+
+GAME_TYPES = 'gametypes'
+GAMES = 'games'
+EVENTS = 'events'
+GAMERS = 'gamers'
+
+KEY_PREFIX = 'levelupapi:version:'
+
+
+def gamer_events(gamer_id):
+    """The events a single gamer organizes or attends, for the per-gamer calendar feed"""
+    return f'gamer-events:{gamer_id}'
+
+
+def get_settings():
+    return {
+        'ALIAS': 'default',
+        **getattr(settings, 'LEVELUP_VERSIONS', {}),
+    }
+
+
+def marker_cache():
+    return caches[get_settings()['ALIAS']]
+
+
+def new_marker():
+    return (uuid.uuid4().hex, time.time())
+
+
+def bump(*resources):
+    """Give each resource a new version marker once the current transaction commits
+
+    A marker bumped before the commit could be paired with data that is
+    not visible yet by a concurrent request, which would then tag or cache
+    the old data under the new marker. Outside a transaction the markers
+    change right away.
+    """
+    transaction.on_commit(
+        lambda: marker_cache().set_many({KEY_PREFIX + resource: new_marker() for resource in resources}, timeout=None)
+    )
+
+
+def get_versions(resources):
+    """Return the (marker, timestamp) pair of each resource, in order
+
+    A marker missing from the cache (evicted, or never written yet) is
+    created on the spot, which only costs clients one full download.
+    """
+    cache = marker_cache()
+    keys = [KEY_PREFIX + resource for resource in resources]
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        # add() keeps the marker of another process that got there first
+        for key in missing:
+            cache.add(key, new_marker(), timeout=None)
+        found.update(cache.get_many(missing))
+    return [found[key] for key in keys]
+
+
+def request_etag(request, resources):
+    """ETag for a request: the resource versions, the full path and the gamer
+
+    The gamer is part of the tag because responses such as the event list
+    carry per-gamer fields like `joined`.
+    """
+    gamer = getattr(request, 'gamer', None)
+    parts = [marker for marker, _ in get_versions(resources)]
+    parts.append(request.get_full_path())
+    parts.append(str(gamer.pk if gamer is not None else ''))
+    return hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+
+def request_last_modified(resources):
+    stamp = max(stamp for _, stamp in get_versions(resources))
+    return datetime.fromtimestamp(int(stamp), tz=timezone.utc)
+
+
+def conditional(*resources):
+    """Method decorator that answers If-None-Match/If-Modified-Since with a 304
+
+    The check runs before the wrapped view, so an unchanged collection is
+    never queried or serialized. Requests reading the replica get no ETag.
+
+    Args:
+        resources (str): the collections the response is built from
+    """
+    def decorator(view):
+        @condition(
+            etag_func=lambda request, *args, **kwargs: request_etag(request, resources),
+            last_modified_func=lambda request, *args, **kwargs: request_last_modified(resources),
+        )
+        def conditional_view(request, viewset, *args, **kwargs):
+            return view(viewset, request, *args, **kwargs)
+
+        @wraps(view)
+        def wrapper(self, request, *args, **kwargs):
+            if replicas.replica_alias() is not None:
+                # Replica rows may be older than the markers
+                return view(self, request, *args, **kwargs)
+            response = conditional_view(request, self, *args, **kwargs)
+            patch_vary_headers(response, ['Authorization'])
+            return response
+        return wrapper
+    return decorator
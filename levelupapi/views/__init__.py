@@ -1,4 +1,6 @@
 from .auth import login_user, register_user
 from .game_type import GameTypeView
 from .event import EventView
-from .game import GameView
\ No newline at end of file
+from .game import GameView
+from .stats import admission_stats, cache_stats, request_stats
+from .calendar import gamer_events_feed
@@ -0,0 +1,375 @@
+"""Async versions of the auth, game and event endpoints, served under /async/
+
+DRF views are synchronous, so under levelup/asgi.py every request to them
+holds a worker thread for its whole duration. These are plain Django async
+views on the async ORM instead: a request waiting on the database does not
+hold a thread. Password hashing is CPU bound, so login and register run it
+on a small dedicated thread pool rather than on the event loop.
+
+The JSON matches the DRF endpoints; the lists go through the values() fast
+path (levelupapi.views.fast) and support the same filters and pagination.
+Writes run in transactions, which the async ORM has no interface for, so
+they call the helpers the DRF views use through sync_to_async.
+events/stream is only served here: its open connections cost a coroutine
+each rather than a thread.
+"""
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import ObjectDoesNotExist
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import APIException
+
+from levelupapi import live
+from levelupapi.authentication import aauthenticate_token
+from levelupapi.models import Event, Game, Gamer
+from levelupapi.pagination import EventPagination, GamePagination
+from levelupapi.views.event import (
+    SIGNUP_RESPONSES, AttendanceOverlap, annotate_joined, change_attendance, create_event, event_source,
+    filter_events, join_event, leave_event, update_event
+)
+from levelupapi.views.fast import FastSerializer
+from levelupapi.views.game import (
+    CreateGameSerializer, GameSerializer, create_game, create_games, update_game, update_games
+)
+
+hashing_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'LEVELUP_HASHING_WORKERS', 4),
+    thread_name_prefix='levelup-hashing'
+)
+
+
+async def hash_in_executor(func, *args):
+    """Run a password hashing function on the bounded hashing pool"""
+    return await asyncio.get_running_loop().run_in_executor(hashing_executor, func, *args)
+
+
+def async_endpoint(*methods, authenticated=True, query_token=False):
+    """Decorator for the async views: method check, token auth and DRF exceptions
+
+    Sets `request.gamer` like GamerTokenAuthentication does and turns the
+    APIExceptions raised by shared helpers (filters, cursors, serializers)
+    into JSON errors, and a missing object into a 404.
+    With `query_token` the token may also be sent as ?token=, for clients
+    like EventSource that can not set headers.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return HttpResponseNotAllowed(methods)
+            try:
+                if authenticated:
+                    keyword, _, key = request.headers.get('Authorization', '').partition(' ')
+                    if query_token and 'token' in request.GET:
+                        keyword, key = 'token', request.GET['token']
+                    if keyword.lower() != 'token' or not key.strip():
+                        return JsonResponse(
+                            {'detail': 'Authentication credentials were not provided.'},
+                            status=status.HTTP_401_UNAUTHORIZED
+                        )
+                    user, _ = await aauthenticate_token(key.strip())
+                    request.gamer = getattr(user, 'gamer', None)
+                return await view(request, *args, **kwargs)
+            except APIException as ex:
+                return JsonResponse(ex.detail, status=ex.status_code, safe=False)
+            except ObjectDoesNotExist as ex:
+                return JsonResponse({'message': ex.args[0]}, status=status.HTTP_404_NOT_FOUND)
+
+        # Token auth only, like the DRF views
+        wrapper.csrf_exempt = True
+        return wrapper
+    return decorator
+
+
+def read_json(request, *names, many=False):
+    """Parse the JSON body and check that every name in `names` is present
+
+    With `many` the body may also be a list, which is returned unchecked.
+
+    Returns:
+        tuple -- (data, None), or (None, JsonResponse) describing the error
+    """
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return None, JsonResponse({'message': 'Malformed JSON'}, status=status.HTTP_400_BAD_REQUEST)
+    if many and isinstance(data, list):
+        return data, None
+    if not isinstance(data, dict):
+        return None, JsonResponse({'message': 'Expected a JSON object'}, status=status.HTTP_400_BAD_REQUEST)
+    missing = [name for name in names if name not in data]
+    if missing:
+        return None, JsonResponse(
+            {name: ['This field is required.'] for name in missing}, status=status.HTTP_400_BAD_REQUEST
+        )
+    return data, None
+
+
+async def render_list(request, queryset, serializer_class, paginator):
+    """Fetch and render a list like the DRF list views, paginated when ?page_size= is sent"""
+    fast = FastSerializer.for_serializer(serializer_class)
+    rows = fast.values(queryset)
+    query = paginator.page_queryset(rows, request)
+    if query is None:
+        return JsonResponse(await fast.arender([row async for row in rows]), safe=False)
+    page = paginator.finish_page([row async for row in query])
+    return JsonResponse(paginator.get_paginated_data(await fast.arender(page)))
+
+
+async def render_one(queryset, serializer_class, pk):
+    fast = FastSerializer.for_serializer(serializer_class)
+    rows = [row async for row in fast.values(queryset.filter(pk=pk))]
+    if not rows:
+        model = serializer_class.Meta.model
+        return JsonResponse(
+            {'message': f'{model.__name__} matching query does not exist.'}, status=status.HTTP_404_NOT_FOUND
+        )
+    data = await fast.arender(rows)
+    return JsonResponse(data[0])
+
+
+@async_endpoint('POST', authenticated=False)
+async def login_user(request):
+    '''Handles the authentication of a gamer
+
+    Method arguments:
+      request -- The full HTTP request object
+    '''
+    data, error = read_json(request, 'username', 'password')
+    if error is not None:
+        return error
+
+    # Same checks as ModelBackend.authenticate, with the user read through
+    # the async ORM and only the hash comparison sent to the pool
+    user = await User.objects.filter(**{User.USERNAME_FIELD: data['username']}).afirst()
+    if user is None:
+        # Hash anyway so unknown usernames take as long as wrong passwords
+        await hash_in_executor(make_password, data['password'])
+        return JsonResponse({'valid': False})
+    valid = await hash_in_executor(check_password, data['password'], user.password)
+    if not valid or not user.is_active:
+        return JsonResponse({'valid': False})
+
+    token = await Token.objects.aget(user=user)
+    return JsonResponse({'valid': True, 'token': token.key})
+
+
+@async_endpoint('POST', authenticated=False)
+async def register_user(request):
+    '''Handles the creation of a new gamer for authentication
+
+    Method arguments:
+      request -- The full HTTP request object
+    '''
+    data, error = read_json(request, 'username', 'password', 'first_name', 'last_name', 'bio')
+    if error is not None:
+        return error
+
+    # What User.objects.create_user does, with the hashing off the event loop
+    new_user = User(
+        username=User.normalize_username(data['username']),
+        email='',
+        first_name=data['first_name'],
+        last_name=data['last_name'],
+        password=await hash_in_executor(make_password, data['password'])
+    )
+    await new_user.asave()
+    gamer = await Gamer.objects.acreate(bio=data['bio'], user=new_user)
+    token = await Token.objects.acreate(user=gamer.user)
+    return JsonResponse({'token': token.key})
+
+
+GAME_FIELDS = ('title', 'maker', 'number_of_players', 'skill_level', 'game_type')
+
+
+@sync_to_async
+def serialize_games(games, many=False):
+    return CreateGameSerializer(games, many=many).data
+
+
+@async_endpoint('GET', 'POST', 'PUT')
+async def game_list(request):
+    """Handle GET requests to get all games, optionally filtered by ?type=
+
+    POST creates a game, or every game of a list in one transaction. PUT
+    updates every game of a list, each carrying its id.
+    """
+    if request.method == 'GET':
+        games = Game.objects.all()
+        game_type = request.GET.get('type', None)
+        if game_type is not None:
+            games = games.filter(game_type_id=game_type)
+        return await render_list(request, games, GameSerializer, GamePagination())
+
+    data, error = read_json(request, many=True)
+    if error is not None:
+        return error
+    if request.method == 'PUT':
+        if not isinstance(data, list):
+            return JsonResponse({'message': 'Expected a list of games'}, status=status.HTTP_400_BAD_REQUEST)
+        errors = await sync_to_async(update_games)(data)
+        if errors is not None:
+            return JsonResponse(errors, status=status.HTTP_400_BAD_REQUEST, safe=False)
+        return HttpResponse(status=status.HTTP_204_NO_CONTENT)
+
+    if isinstance(data, list):
+        games, errors = await sync_to_async(create_games)(data, request.gamer)
+        if errors is not None:
+            return JsonResponse(errors, status=status.HTTP_400_BAD_REQUEST, safe=False)
+        return JsonResponse(await serialize_games(games, many=True), status=status.HTTP_201_CREATED, safe=False)
+
+    data, error = read_json(request, *GAME_FIELDS)
+    if error is not None:
+        return error
+    game = await sync_to_async(create_game)(data, request.gamer)
+    return JsonResponse(await serialize_games(game), status=status.HTTP_201_CREATED)
+
+
+@async_endpoint('GET', 'PUT', 'DELETE')
+async def game_detail(request, pk):
+    """Handle GET requests for single game, PUT to update it and DELETE to remove it"""
+    if request.method == 'GET':
+        return await render_one(Game.objects.all(), GameSerializer, pk)
+
+    game = await Game.objects.aget(pk=pk)
+    if request.method == 'DELETE':
+        await game.adelete()
+        return HttpResponse(status=status.HTTP_204_NO_CONTENT)
+
+    data, error = read_json(request)
+    if error is not None:
+        return error
+    await sync_to_async(update_game)(game, data)
+    return HttpResponse(status=status.HTTP_204_NO_CONTENT)
+
+
+@async_endpoint('GET', 'POST')
+async def event_list(request):
+    """Handle GET requests to get all events, with the filters of the DRF event list, and POST to create one"""
+    if request.method == 'POST':
+        data, error = read_json(request, 'game')
+        if error is not None:
+            return error
+        event = await sync_to_async(create_event)(data, request.gamer)
+        return JsonResponse(event, status=status.HTTP_201_CREATED)
+
+    model, serializer_class, _ = event_source(request.GET)
+    events = annotate_joined(filter_events(model.objects.all(), request.GET), request.gamer)
+    return await render_list(request, events, serializer_class, EventPagination())
+
+
+@async_endpoint('GET', 'PUT', 'DELETE')
+async def event_detail(request, pk):
+    """Handle GET requests for single event, PUT to update it and DELETE to remove it"""
+    if request.method == 'GET':
+        model, serializer_class, _ = event_source(request.GET)
+        return await render_one(model.objects.all(), serializer_class, pk)
+
+    event = await Event.objects.aget(pk=pk)
+    if request.method == 'DELETE':
+        await event.adelete()
+        return HttpResponse(status=status.HTTP_204_NO_CONTENT)
+
+    data, error = read_json(request)
+    if error is not None:
+        return error
+    await sync_to_async(update_event)(event, data)
+    return HttpResponse(status=status.HTTP_204_NO_CONTENT)
+
+
+@async_endpoint('POST')
+async def event_attendance(request):
+    """Post request to join and leave several events at once, like POST /events/attendance"""
+    data, error = read_json(request)
+    if error is not None:
+        return error
+    try:
+        results = await sync_to_async(change_attendance)(data, request.gamer)
+    except AttendanceOverlap as ex:
+        return JsonResponse({'message': str(ex)}, status=status.HTTP_400_BAD_REQUEST)
+    return JsonResponse(results)
+
+
+@async_endpoint('POST')
+async def event_signup(request, pk):
+    """Post request for a user to sign up for an event"""
+    event = await Event.objects.filter(pk=pk).afirst()
+    if event is None:
+        return JsonResponse({'message': 'Event matching query does not exist.'}, status=status.HTTP_404_NOT_FOUND)
+    data, error = read_json(request)
+    if error is not None:
+        return error
+    # Runs in a transaction, which the async ORM has no interface for
+    outcome = await sync_to_async(join_event)(event, request.gamer, waitlist=data.get('waitlist') is True)
+    message, status_code = SIGNUP_RESPONSES[outcome]
+    return JsonResponse({'message': message}, status=status_code)
+
+
+@async_endpoint('DELETE')
+async def event_leave(request, pk):
+    """Remove request for a user to leave an event"""
+    event = await Event.objects.filter(pk=pk).afirst()
+    if event is None:
+        return JsonResponse({'message': 'Event matching query does not exist.'}, status=status.HTTP_404_NOT_FOUND)
+    await sync_to_async(leave_event)(event, request.gamer)
+    return HttpResponse(status=status.HTTP_204_NO_CONTENT)
+
+
+def sse_message(kind, data, message_id=None):
+    """One server-sent event in the text/event-stream format"""
+    lines = [] if message_id is None else [f'id: {message_id}']
+    lines += [f'event: {kind}', f'data: {json.dumps(data, separators=(",", ":"))}']
+    return '\n'.join(lines) + '\n\n'
+
+
+async def live_messages(keepalive):
+    """Yield the published messages, with a comment line whenever it is quiet for `keepalive` seconds"""
+    # Subscribed once the server starts sending, so the subscription can not
+    # outlive a response that was never iterated
+    subscription = live.broker.subscribe()
+    try:
+        yield 'retry: 3000\n\n'
+        while True:
+            try:
+                message_id, kind, data = await asyncio.wait_for(subscription.get(), keepalive)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            yield sse_message(kind, data, message_id)
+    finally:
+        live.broker.unsubscribe(subscription)
+
+
+@async_endpoint('GET', query_token=True)
+async def event_stream(request):
+    '''Handles GET requests for the live stream of event and attendance changes
+
+    A text/event-stream of `created`, `updated`, `deleted`, `joined` and
+    `left` events (see levelupapi.live for the data), replacing polling of
+    /events. A `resync` event means messages were dropped and /events should
+    be fetched again. The token may be sent as ?token=.
+
+    Method arguments:
+      request -- The full HTTP request object
+    '''
+    if not isinstance(request, ASGIRequest):
+        # Under WSGI every open stream would hold a worker thread forever
+        return JsonResponse(
+            {'message': 'The event stream is only served through levelup/asgi.py'},
+            status=status.HTTP_501_NOT_IMPLEMENTED
+        )
+    response = StreamingHttpResponse(live_messages(live.get_settings()['KEEPALIVE']), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stops nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,148 @@
+"""View module for the per-gamer iCalendar feed of the events they organize or attend"""
+import hashlib
+from datetime import datetime, timezone
+
+from django.core.cache import caches
+from django.db.models import Q
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
+from django.views.decorators.http import require_GET
+from rest_framework import exceptions, status
+
+from levelupapi import caching, replicas, versions
+from levelupapi.authentication import GamerTokenAuthentication
+from levelupapi.models import Event
+
+KEY_PREFIX = 'levelupapi:calendar:'
+
+# Rows fetched per round trip while a feed streams
+FEED_CHUNK_SIZE = 500
+
+
+def escape_text(value):
+    """Escape a TEXT property value (RFC 5545 3.3.11)"""
+    return (
+        value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def content_line(name, value):
+    """One property line folded at 75 octets (RFC 5545 3.1)"""
+    line = f'{name}:{value}'.encode()
+    parts = []
+    while len(line) > 75:
+        cut = 75 if not parts else 74
+        # Never split a multi-byte character
+        while cut and (line[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(line[:cut])
+        line = line[cut:]
+    parts.append(line)
+    return (b'\r\n '.join(parts) + b'\r\n').decode()
+
+
+def feed_events(gamer_id):
+    """The gamer's events as values() rows, oldest first"""
+    attending = Event.attendees.through.objects.filter(gamer_id=gamer_id).values('event_id')
+    return Event.objects.filter(Q(organizer_id=gamer_id) | Q(pk__in=attending)).order_by(
+        'date', 'time', 'id'
+    ).values('id', 'description', 'date', 'time', 'organizer_id', 'game__title')
+
+
+def calendar_lines(gamer_id, stamp):
+    """Yield the feed line by line, reading the events a chunk at a time
+
+    Args:
+        stamp (datetime): DTSTAMP of every event, the time the data last changed
+    """
+    dtstamp = stamp.strftime('%Y%m%dT%H%M%SZ')
+    yield 'BEGIN:VCALENDAR\r\n'
+    yield 'VERSION:2.0\r\n'
+    yield 'PRODID:-//Level Up//Gamer events//EN\r\n'
+    yield 'CALSCALE:GREGORIAN\r\n'
+    yield 'X-WR-CALNAME:Level Up\r\n'
+    for event in feed_events(gamer_id).iterator(chunk_size=FEED_CHUNK_SIZE):
+        start = datetime.combine(event['date'], event['time'])
+        yield 'BEGIN:VEVENT\r\n'
+        yield content_line('UID', f'event-{event["id"]}@levelup')
+        yield content_line('DTSTAMP', dtstamp)
+        # Floating time, events are stored without a time zone
+        yield content_line('DTSTART', start.strftime('%Y%m%dT%H%M%S'))
+        yield content_line('SUMMARY', escape_text(event['description']))
+        yield content_line('DESCRIPTION', escape_text(f'Game: {event["game__title"]}'))
+        yield content_line('CATEGORIES', 'Organizing' if event['organizer_id'] == gamer_id else 'Attending')
+        yield 'END:VEVENT\r\n'
+    yield 'END:VCALENDAR\r\n'
+
+
+def caching_stream(lines, cache, key, timeout):
+    """Pass the lines through and cache the whole body once the last one is sent"""
+    body = []
+    for line in lines:
+        body.append(line)
+        yield line
+    cache.set(key, ''.join(body), timeout)
+
+
+@require_GET
+def gamer_events_feed(request, pk):
+    '''Handles GET requests for a gamer's calendar feed (text/calendar)
+
+    Calendar apps can not send headers, so the gamer's token may be passed
+    as ?token= as well as in the Authorization header. Repeated polls cost a
+    couple of cache reads: the body is cached under the gamer's version
+    marker, and If-None-Match is answered from the markers alone. The
+    markers are shared by the workers and change once a write commits, so
+    whichever worker answers a poll sees the change.
+
+    Method arguments:
+      request -- The full HTTP request object
+      pk -- The id of the gamer
+    '''
+    key = request.GET.get('token')
+    if key is None:
+        keyword, _, key = request.headers.get('Authorization', '').partition(' ')
+        if keyword.lower() != 'token':
+            key = ''
+    try:
+        user, _ = GamerTokenAuthentication().authenticate_credentials(key.strip())
+    except exceptions.AuthenticationFailed as ex:
+        return JsonResponse({'detail': ex.detail}, status=status.HTTP_401_UNAUTHORIZED)
+    gamer = getattr(user, 'gamer', None)
+    if gamer is None or gamer.pk != pk:
+        return JsonResponse({'detail': 'A feed can only be read by its gamer.'}, status=status.HTTP_403_FORBIDDEN)
+
+    resources = (versions.gamer_events(pk), versions.GAMES)
+    markers = versions.get_versions(resources)
+    digest = hashlib.md5('|'.join(marker for marker, _ in markers).encode()).hexdigest()
+    etag = quote_etag(digest)
+    stamp = datetime.fromtimestamp(int(max(stamp for _, stamp in markers)), tz=timezone.utc)
+    # Replica rows may be older than the markers, so no ETag or cached body
+    from_replica = replicas.replica_alias() is not None
+
+    if not from_replica and etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        config = caching.get_settings()
+        cache = caches[config['ALIAS']]
+        cache_key = f'{KEY_PREFIX}{pk}:{digest}'
+        body = None
+        use_cache = config['ENABLED'] and not from_replica
+        if use_cache:
+            body = cache.get(cache_key)
+            caching.stats.record('gamer_events_feed', hit=body is not None)
+        if body is not None:
+            response = HttpResponse(body, content_type='text/calendar; charset=utf-8')
+        else:
+            lines = calendar_lines(pk, stamp)
+            if use_cache:
+                lines = caching_stream(lines, cache, cache_key, config['TIMEOUT'])
+            response = StreamingHttpResponse(lines, content_type='text/calendar; charset=utf-8')
+        response['Content-Disposition'] = 'inline; filename="events.ics"'
+
+    if not from_replica:
+        response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -1,15 +1,28 @@
 """View module for handling requests about events"""
+import datetime
+from functools import partial
 from rest_framework.viewsets import ViewSet
 from rest_framework.response import Response
 from rest_framework import serializers, status
-from levelupapi.models import  Event, Gamer, Game 
+from levelupapi.models import  Event, EventHistory, EventWaitlist, Gamer, Game 
 from rest_framework.decorators import action
-from django.db.models import Count, Q
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, IntegerField, OuterRef, Prefetch
+from django.db.models.functions import Cast
+from levelupapi import caching, versions
+from levelupapi.pagination import EventPagination
+from levelupapi.signals import attendance_changed
+from levelupapi.views.fast import FastSerializer
+from levelupapi.views.fieldsets import ExpandableFieldsMixin, GamerSummarySerializer, get_fieldset, sparse_queryset
+from levelupapi.views.game import SparseGameSerializer
 
 
 class EventView(ViewSet):
     """Level up event view"""
     
+    @versions.conditional(versions.EVENTS, versions.GAMES, versions.GAME_TYPES, versions.GAMERS)
+    @caching.cached(versions.EVENTS, versions.GAMES, versions.GAME_TYPES, versions.GAMERS, per_gamer=True)
     def retrieve(self, request, pk):
         """Handle GET requests for single event type
         
@@ -17,15 +30,22 @@ class EventView(ViewSet):
             Response -- JSON serialized event
         """
        
+        model, serializer_class, sparse_class = event_source(request.query_params)
+        fieldset = get_fieldset(request, sparse_class)
         try:
-            event = Event.objects.annotate(attendee_count=Count('attendees'))
-            event = Event.objects.get(pk=pk)
-            serializer = EventSerializer(event)
+            if fieldset is None:
+                event = serializer_class.setup_eager_loading(model.objects.all()).get(pk=pk)
+                serializer = serializer_class(event)
+            else:
+                event = sparse_queryset(model.objects.all(), sparse_class, **fieldset).get(pk=pk)
+                serializer = sparse_class(event, **fieldset)
             return Response(serializer.data)
-        except event.DoesNotExist as ex:
+        except model.DoesNotExist as ex:
             return Response({'message': ex.args[0]}, status=status.HTTP_404_NOT_FOUND)
 
 
+    @versions.conditional(versions.EVENTS, versions.GAMES, versions.GAME_TYPES, versions.GAMERS)
+    @caching.cached(versions.EVENTS, versions.GAMES, versions.GAME_TYPES, versions.GAMERS, per_gamer=True)
     def list(self, request):
         """Handle GET requests to get all events
         
@@ -33,15 +53,42 @@ class EventView(ViewSet):
             Response -- JSON serialized list of event types
         """
         
-        gamer = Gamer.objects.get(user=request.auth.user)
-        events = Event.objects.annotate(
-            attendee_count=Count('attendees'),
-            joined=Count(
-                'attendees',
-                filter=Q(attendees=gamer)
-                )
-            )
-        serializer = EventSerializer(events, many=True)
+        gamer = request.gamer
+        # Only the hot set unless ?include_archived=true
+        model, event_serializer, sparse_serializer = event_source(request.query_params)
+        fieldset = get_fieldset(request, sparse_serializer)
+        events = filter_events(model.objects.all(), request.query_params)
+        if fieldset is None or fieldset['fields'] is None or 'joined' in fieldset['fields']:
+            # attendee_count is a column now, joined is a per-row EXISTS so
+            # there is no join and GROUP BY over the attendees table
+            events = annotate_joined(events, gamer)
+
+        # Only paginated when the client asks for a page_size
+        paginator = EventPagination()
+
+        if fieldset is None and settings.LEVELUP_FAST_SERIALIZERS:
+            # Same JSON as EventSerializer, built straight from values() rows
+            fast = FastSerializer.for_serializer(event_serializer)
+            rows = fast.values(events)
+            page = paginator.paginate_queryset(rows, request, view=self)
+            if page is not None:
+                return paginator.get_paginated_response(fast.render(page))
+            return Response(fast.render(rows))
+
+        if fieldset is None:
+            events = event_serializer.setup_eager_loading(events)
+            serializer_class = event_serializer
+        else:
+            # ?fields= / ?expand= only read the requested columns and relations
+            events = sparse_queryset(events, sparse_serializer, extra=EventPagination.ordering, **fieldset)
+            serializer_class = partial(sparse_serializer, **fieldset)
+
+        page = paginator.paginate_queryset(events, request, view=self)
+        if page is not None:
+            serializer = serializer_class(page, many=True)
+            return paginator.get_paginated_response(serializer.data)
+
+        serializer = serializer_class(events, many=True)
         return Response(serializer.data)
     
     def create(self, request):
@@ -51,12 +98,7 @@ class EventView(ViewSet):
             Response -- JSON serialized event instance
         """
         
-        organizer = Gamer.objects.get(user=request.auth.user)
-        game = Game.objects.get(pk=request.data["game"])
-        serializer = CreateEventSerializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        serializer.save(organizer=organizer, game=game)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(create_event(request.data, request.gamer), status=status.HTTP_201_CREATED)
         
     def update(self, request, pk):
         """Handle PUT requests for an event
@@ -65,9 +107,7 @@ class EventView(ViewSet):
             Response -- Empty body with 204 status code
         """
         event = Event.objects.get(pk=pk)
-        serializer = CreateEventSerializer(event, data=request.data)
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
+        update_event(event, request.data)
         return Response(None, status=status.HTTP_204_NO_CONTENT)
     
     def destroy(self, request, pk):
@@ -86,30 +126,313 @@ class EventView(ViewSet):
         # this extra action is only intended for this one instance of the class, not every event
     @action(methods=['post'], detail=True) 
     def signup(self, request, pk):
-        """Post request for a user to sign up for an event"""
+        """Post request for a user to sign up for an event
+
+        A full event answers 409, or puts the gamer on its waitlist with a
+        202 when the body is {"waitlist": true}.
+        """
     
-        gamer = Gamer.objects.get(user=request.auth.user)
+        gamer = request.gamer
         event = Event.objects.get(pk=pk)
-        # Create rows on an event-gamer bridge table
-        event.attendees.add(gamer)
-        return Response({'message': 'Gamer added'}, status=status.HTTP_201_CREATED)
+        outcome = join_event(event, gamer, waitlist=request.data.get('waitlist') is True)
+        message, status_code = SIGNUP_RESPONSES[outcome]
+        return Response({'message': message}, status=status_code)
     
     @action(methods=['delete'], detail=True)
     def leave(self, request, pk):
-        """Remove request for a user to leave an event"""
+        """Remove request for a user to leave an event or its waitlist"""
 
-        gamer = Gamer.objects.get(user=request.auth.user)
+        gamer = request.gamer
         event = Event.objects.get(pk=pk)
-        event.attendees.remove(gamer) 
+        leave_event(event, gamer)
         return Response({'message': 'Gamer removed'}, status=status.HTTP_204_NO_CONTENT)
-    
+
+    @action(methods=['post'], detail=False)
+    def attendance(self, request):
+        """Post request to join and leave many events at once
+
+        Expects {"join": [event ids], "leave": [event ids]} and applies every
+        change in one transaction with a single insert and a single delete
+        on the attendees bridge table. Leaving an event the gamer is only
+        waiting for takes them off its waitlist.
+
+        Returns:
+            Response -- the outcome of each requested event id
+        """
+
+        try:
+            results = change_attendance(request.data, request.gamer)
+        except AttendanceOverlap as ex:
+            return Response({'message': str(ex)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(results)
+
+
+def event_source(params):
+    """The model and serializers events are read with, EventHistory for ?include_archived=true
+
+    Returns:
+        tuple -- (model, serializer class, sparse serializer class)
+    """
+    value = params.get('include_archived', 'false').lower()
+    if value not in ('true', 'false'):
+        raise serializers.ValidationError({'include_archived': [f'Invalid value "{value}"']})
+    if value == 'true':
+        return EventHistory, EventHistorySerializer, SparseEventHistorySerializer
+    return Event, EventSerializer, SparseEventSerializer
+
+
+def annotate_joined(events, gamer):
+    """Annotate each event with `joined`, 1 when the gamer attends it and 0 otherwise"""
+    return events.annotate(
+        joined=Cast(
+            Exists(events.model.attendees.through.objects.filter(event_id=OuterRef('pk'), gamer=gamer)),
+            output_field=IntegerField()
+            )
+        )
+
+
+# Outcomes of join_event
+JOINED, ALREADY_JOINED, WAITLISTED, FULL = 'joined', 'already_joined', 'waitlisted', 'full'
+
+# join_event outcome -> (message, status) of the signup action
+SIGNUP_RESPONSES = {
+    JOINED: ('Gamer added', status.HTTP_201_CREATED),
+    ALREADY_JOINED: ('Gamer added', status.HTTP_201_CREATED),
+    WAITLISTED: ('Gamer waitlisted', status.HTTP_202_ACCEPTED),
+    FULL: ('Event is full', status.HTTP_409_CONFLICT),
+}
+
+
+class EventFull(Exception):
+    """Raised inside join_event's transaction to undo the attendee row"""
+
+
+def join_event(event, gamer, waitlist=False):
+    """Give the gamer a seat at the event and bump its attendee_count
+
+    The seat is claimed with a single conditional UPDATE (see
+    EventQuerySet.with_free_seat), so concurrent signups can not overbook
+    and only wait on each other when they are for the same event.
+
+    Returns:
+        str -- JOINED, ALREADY_JOINED, or when the event is full WAITLISTED
+        if `waitlist` is set and FULL otherwise
+    """
+    try:
+        with transaction.atomic():
+            # Create rows on an event-gamer bridge table
+            _, created = Event.attendees.through.objects.get_or_create(event=event, gamer=gamer)
+            if not created:
+                return ALREADY_JOINED
+            if not Event.objects.filter(pk=event.pk).with_free_seat().adjust_attendee_count(1):
+                raise EventFull
+    except EventFull:
+        if not waitlist:
+            return FULL
+        with transaction.atomic():
+            EventWaitlist.objects.get_or_create(event=event, gamer=gamer)
+            # A seat may have come free since the UPDATE above
+            promoted = promote_waitlist(event.pk)
+        if promoted:
+            attendance_changed.send(sender=Event, event_ids=[event.pk], gamer_ids=promoted, action='joined')
+        return JOINED if gamer.pk in promoted else WAITLISTED
+    attendance_changed.send(sender=Event, event_ids=[event.pk], gamer_ids=[gamer.pk], action='joined')
+    return JOINED
+
+
+def leave_event(event, gamer):
+    """Remove the gamer from the event's attendees or waitlist, seating the next waiting gamer
+
+    Returns:
+        bool -- False when the gamer was neither attending nor waiting
+    """
+    promoted = []
+    with transaction.atomic():
+        removed, _ = Event.attendees.through.objects.filter(event=event, gamer=gamer).delete()
+        if removed:
+            Event.objects.filter(pk=event.pk).adjust_attendee_count(-removed)
+            promoted = promote_waitlist(event.pk)
+        else:
+            removed, _ = EventWaitlist.objects.filter(event=event, gamer=gamer).delete()
+            if removed:
+                return True
+    if removed:
+        attendance_changed.send(sender=Event, event_ids=[event.pk], gamer_ids=[gamer.pk], action='left')
+    if promoted:
+        attendance_changed.send(sender=Event, event_ids=[event.pk], gamer_ids=promoted, action='joined')
+    return bool(removed)
+
+
+def promote_waitlist(event_id):
+    """Seat waiting gamers in the order they joined the waitlist while the event has free seats
+
+    Call it inside a transaction. Each seat is claimed before its waitlist
+    entry is read, so the event's row is locked and concurrent promotions
+    can not seat the same gamer twice.
+
+    Returns:
+        list -- ids of the gamers that were seated
+    """
+    waiting = EventWaitlist.objects.filter(event_id=event_id).order_by('created_at', 'id')
+    if not waiting.exists():
+        return []
+    events = Event.objects.filter(pk=event_id)
+    promoted = []
+    while events.with_free_seat().adjust_attendee_count(1):
+        entry = waiting.first()
+        if entry is None:
+            events.adjust_attendee_count(-1)
+            break
+        entry.delete()
+        _, created = Event.attendees.through.objects.get_or_create(event_id=event_id, gamer_id=entry.gamer_id)
+        if created:
+            promoted.append(entry.gamer_id)
+        else:
+            events.adjust_attendee_count(-1)
+    return promoted
+
+
+# Query parameter -> (lookup, parser) for the event list filters
+EVENT_FILTERS = {
+    'from': ('date__gte', datetime.date.fromisoformat),
+    'to': ('date__lte', datetime.date.fromisoformat),
+    'game': ('game_id', int),
+    'game_type': ('game__game_type_id', int),
+    'organizer': ('organizer_id', int),
+}
+
+
+# The writes below are shared with the async views in levelupapi.views.async_api
+
+def create_event(data, organizer):
+    """Create an event from the body of POST /events
+
+    Returns:
+        dict -- the serialized event
+    """
+    game = Game.objects.get(pk=data["game"])
+    serializer = CreateEventSerializer(data=data)
+    serializer.is_valid(raise_exception=True)
+    serializer.save(organizer=organizer, game=game)
+    return serializer.data
+
+
+def update_event(event, data):
+    """Validate the body of PUT /events/<pk> and save it onto the event, raises ValidationError"""
+    serializer = CreateEventSerializer(event, data=data)
+    serializer.is_valid(raise_exception=True)
+    serializer.save()
+    # A raised capacity seats whoever is waiting
+    with transaction.atomic():
+        promoted = promote_waitlist(event.pk)
+    if promoted:
+        attendance_changed.send(sender=Event, event_ids=[event.pk], gamer_ids=promoted, action='joined')
+
+
+class AttendanceOverlap(Exception):
+    """Raised by change_attendance for an event both joined and left"""
+
+
+def change_attendance(data, gamer):
+    """Apply the body of POST /events/attendance for the gamer in one transaction
+
+    Raises ValidationError for a malformed body and AttendanceOverlap for an
+    event in both lists.
+
+    Returns:
+        dict -- the outcome of each requested event id
+    """
+    serializer = AttendanceSerializer(data=data)
+    serializer.is_valid(raise_exception=True)
+    join = list(dict.fromkeys(serializer.validated_data['join']))
+    leave = list(dict.fromkeys(serializer.validated_data['leave']))
+    if set(join) & set(leave):
+        raise AttendanceOverlap('An event can not be joined and left in the same request')
+
+    attendees = Event.attendees.through
+    with transaction.atomic():
+        found = set(Event.objects.filter(pk__in=join).values_list('id', flat=True))
+        attending = set(
+            attendees.objects.filter(gamer=gamer, event_id__in=join + leave).values_list('event_id', flat=True)
+        )
+        left = [pk for pk in leave if pk in attending]
+        attendees.objects.filter(gamer=gamer, event_id__in=left).delete()
+        Event.objects.filter(pk__in=left).adjust_attendee_count(-1)
+        promoted = {pk: promote_waitlist(pk) for pk in left}
+        waiting = set(
+            EventWaitlist.objects.filter(gamer=gamer, event_id__in=leave).exclude(event_id__in=left)
+            .values_list('event_id', flat=True)
+        )
+        EventWaitlist.objects.filter(gamer=gamer, event_id__in=waiting).delete()
+
+        # One conditional UPDATE per event claims its seat
+        joining = [pk for pk in join if pk in found and pk not in attending]
+        joined = [pk for pk in joining if Event.objects.filter(pk=pk).with_free_seat().adjust_attendee_count(1)]
+        attendees.objects.bulk_create([attendees(event_id=pk, gamer=gamer) for pk in joined])
+    if joined:
+        attendance_changed.send(sender=Event, event_ids=joined, gamer_ids=[gamer.pk], action='joined')
+    if left:
+        attendance_changed.send(sender=Event, event_ids=left, gamer_ids=[gamer.pk], action='left')
+    for pk, gamer_ids in promoted.items():
+        if gamer_ids:
+            attendance_changed.send(sender=Event, event_ids=[pk], gamer_ids=gamer_ids, action='joined')
+
+    def outcome(pk):
+        if pk in joined:
+            return JOINED
+        if pk in left:
+            return 'left'
+        if pk in waiting:
+            return 'left_waitlist'
+        if pk in attending:
+            return ALREADY_JOINED
+        if pk in joining:
+            return FULL
+        if pk in leave:
+            return 'not_attending'
+        return 'not_found'
+
+    return {
+        'join': [{'event': pk, 'result': outcome(pk)} for pk in join],
+        'leave': [{'event': pk, 'result': outcome(pk)} for pk in leave]
+    }
+
+
+def filter_events(events, params):
+    """Narrow an event queryset by the ?from=, ?to=, ?game=, ?game_type= and ?organizer= params
+
+    Dates are ISO formatted (YYYY-MM-DD) and both ends of the range are inclusive.
+    """
+    lookups = {}
+    errors = {}
+    for param, (lookup, parse) in EVENT_FILTERS.items():
+        value = params.get(param)
+        if value is None:
+            continue
+        try:
+            lookups[lookup] = parse(value)
+        except ValueError:
+            errors[param] = [f'Invalid value "{value}"']
+    if errors:
+        raise serializers.ValidationError(errors)
+    return events.filter(**lookups)
+
+
+class AttendanceSerializer(serializers.Serializer):
+    """JSON serializer for bulk attendance changes
+    """
+
+    join = serializers.ListField(child=serializers.IntegerField(), default=list)
+    leave = serializers.ListField(child=serializers.IntegerField(), default=list)
+
+
 class CreateEventSerializer(serializers.ModelSerializer):
     """JSON serializer for events
     """
     
     class Meta:
         model = Event
-        fields = ('id', 'description', 'date', 'time')
+        fields = ('id', 'description', 'date', 'time', 'capacity')
         
         
 class EventSerializer(serializers.ModelSerializer):
@@ -121,4 +444,65 @@ class EventSerializer(serializers.ModelSerializer):
     class Meta:
         model = Event
         depth = 2
-        fields = ('id', 'description', 'date', 'time', 'game', 'organizer', 'attendees', 'joined', 'attendee_count')
\ No newline at end of file
+        fields = (
+            'id', 'description', 'date', 'time', 'game', 'organizer', 'attendees', 'joined', 'attendee_count', 'capacity'
+        )
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Load every relation the nested depth = 2 output touches up front
+
+        The number of queries stays the same however many events or
+        attendees there are, the nested users also render their groups
+        and permissions so those are prefetched as well.
+        """
+        users = ('user__groups', 'user__user_permissions')
+        return queryset.select_related(
+            'game__game_type',
+            'game__gamer',
+            'organizer__user',
+        ).prefetch_related(
+            Prefetch('attendees', queryset=Gamer.objects.select_related('user')),
+            *[f'attendees__{lookup}' for lookup in users],
+            *[f'organizer__{lookup}' for lookup in users],
+        )
+
+
+class SparseEventSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    """JSON serializer for events when the client picks ?fields= or ?expand=
+
+    Relations render as ids unless expanded, nested gamers never carry the
+    user's password hash or permissions.
+    """
+
+    joined = serializers.IntegerField(read_only=True)
+
+    expandable_fields = {
+        'game': SparseGameSerializer,
+        'organizer': GamerSummarySerializer,
+        'attendees': GamerSummarySerializer,
+    }
+
+    class Meta:
+        model = Event
+        fields = (
+            'id', 'description', 'date', 'time', 'game', 'organizer', 'attendees', 'joined', 'attendee_count', 'capacity'
+        )
+
+
+class EventHistorySerializer(EventSerializer):
+    """EventSerializer for ?include_archived=true, over hot and archived events alike
+    """
+
+    class Meta(EventSerializer.Meta):
+        model = EventHistory
+        fields = EventSerializer.Meta.fields + ('archived',)
+
+
+class SparseEventHistorySerializer(SparseEventSerializer):
+    """SparseEventSerializer for ?include_archived=true
+    """
+
+    class Meta(SparseEventSerializer.Meta):
+        model = EventHistory
+        fields = SparseEventSerializer.Meta.fields + ('archived',)
@@ -0,0 +1,153 @@
+"""Sparse fieldsets and controllable nesting for the levelupapi serializers
+
+`?fields=id,title` picks the top level fields of a response and
+`?expand=game,game.game_type` picks which relations are nested, every other
+relation is rendered as its primary key. `sparse_queryset` turns the same
+choice into the matching only()/select_related()/prefetch_related() calls,
+so columns and joins nobody asked for are never read.
+"""
+from django.contrib.auth.models import User
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+from levelupapi.models import Gamer
+
+
+def parse_list(value):
+    """Split a comma separated query parameter, None when it was not sent"""
+    if value is None:
+        return None
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def get_fieldset(request, serializer_class):
+    """Read ?fields= and ?expand= for a sparse serializer
+
+    Returns:
+        dict -- `fields` and `expand` keyword arguments, None when neither param was sent
+    """
+    fields = parse_list(request.query_params.get('fields'))
+    expand = parse_list(request.query_params.get('expand'))
+    if fields is None and expand is None:
+        return None
+    errors = serializer_class.check_request(fields, expand)
+    if errors:
+        raise serializers.ValidationError(errors)
+    return {'fields': fields, 'expand': expand or []}
+
+
+def child_paths(expand, name):
+    """The expand paths below `name`, e.g. game.game_type -> game_type"""
+    prefix = f'{name}.'
+    return [path[len(prefix):] for path in expand if path.startswith(prefix)]
+
+
+class ExpandableFieldsMixin:
+    """ModelSerializer mixin that drops unrequested fields and nests only expanded relations
+
+    Subclasses list their nestable relations in `expandable_fields`, mapping
+    the field name to the serializer class used when it is expanded.
+    """
+
+    expandable_fields = {}
+
+    def __init__(self, *args, fields=None, expand=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        expand = list(expand)
+        for name, serializer_class in self.expandable_fields.items():
+            if name in self.fields and (name in expand or child_paths(expand, name)):
+                relation = self.fields[name]
+                self.fields[name] = serializer_class(
+                    read_only=True,
+                    many=isinstance(relation, serializers.ManyRelatedField),
+                    expand=child_paths(expand, name)
+                )
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def check_request(cls, fields, expand):
+        """Return an error dict for unknown field names or expand paths, None when valid"""
+        errors = {}
+        unknown = sorted(set(fields or ()) - set(cls.Meta.fields))
+        if unknown:
+            errors['fields'] = [f'Unknown field "{name}"' for name in unknown]
+        bad_paths = [path for path in expand or () if not cls.can_expand(path)]
+        if bad_paths:
+            errors['expand'] = [f'Can not expand "{path}"' for path in bad_paths]
+        return errors or None
+
+    @classmethod
+    def can_expand(cls, path):
+        name, _, rest = path.partition('.')
+        child = cls.expandable_fields.get(name)
+        if child is None:
+            return False
+        return not rest or child.can_expand(rest)
+
+
+def plan_queryset(serializer_class, fields, expand, prefix, only, select, prefetch):
+    """Collect the only()/select_related()/prefetch_related() lookups for one serializer level"""
+    model = serializer_class.Meta.model
+    only.add(prefix + model._meta.pk.name)
+    for name in fields if fields is not None else serializer_class.Meta.fields:
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # Annotations such as `joined` are added by the view
+            continue
+
+        expanded = name in expand or bool(child_paths(expand, name))
+        child_class = serializer_class.expandable_fields.get(name)
+        if field.many_to_many:
+            if expanded:
+                queryset = sparse_queryset(
+                    field.related_model.objects.all(), child_class, expand=child_paths(expand, name)
+                )
+            else:
+                queryset = field.related_model.objects.only('pk')
+            prefetch.append(Prefetch(prefix + name, queryset=queryset))
+        elif field.is_relation:
+            only.add(prefix + name)
+            if expanded:
+                select.add(prefix + name)
+                plan_queryset(
+                    child_class, None, child_paths(expand, name), f'{prefix}{name}__', only, select, prefetch
+                )
+        else:
+            only.add(prefix + name)
+
+
+def sparse_queryset(queryset, serializer_class, fields=None, expand=(), extra=()):
+    """Restrict a queryset to what `serializer_class(fields=..., expand=...)` will read
+
+    Args:
+        extra (tuple): more columns to load, e.g. the pagination ordering
+    """
+    only, select, prefetch = set(extra), set(), []
+    plan_queryset(serializer_class, fields, list(expand), '', only, select, prefetch)
+    queryset = queryset.only(*only).prefetch_related(*prefetch)
+    # select_related() without arguments would follow every foreign key
+    return queryset.select_related(*select) if select else queryset
+
+
+class UserSummarySerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    """Public part of a user, never the password hash or permissions
+    """
+
+    class Meta:
+        model = User
+        fields = ('id', 'username', 'first_name', 'last_name')
+
+
+class GamerSummarySerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    """JSON serializer for gamers nested in other resources
+    """
+
+    expandable_fields = {'user': UserSummarySerializer}
+
+    class Meta:
+        model = Gamer
+        fields = ('id', 'bio', 'user')
@@ -1,16 +1,30 @@
 """View module for handling requests about games"""
+from functools import partial
 from rest_framework.viewsets import ViewSet
 from rest_framework.response import Response
 from rest_framework import serializers, status
 from levelupapi.models import Game
 from levelupapi.models.game_type import GameType
-from levelupapi.models.gamer import Gamer
+from django.conf import settings
+from django.db import transaction
 from django.db.models import Count
 from django.core.exceptions import ObjectDoesNotExist
+from levelupapi import caching, versions
+from levelupapi.pagination import GamePagination, SearchPagination
+from levelupapi.search import search_games
+from levelupapi.signals import games_bulk_saved
+from levelupapi.views.fast import FastSerializer
+from levelupapi.views.fieldsets import ExpandableFieldsMixin, GamerSummarySerializer, get_fieldset, sparse_queryset
+from levelupapi.views.game_type import GameTypeSerializer
+
+# Rows per INSERT/UPDATE statement for bulk writes
+BULK_BATCH_SIZE = 500
 
 class GameView(ViewSet):
     """Level up game view"""
     
+    @versions.conditional(versions.GAMES, versions.GAME_TYPES, versions.GAMERS)
+    @caching.cached(versions.GAMES, versions.GAME_TYPES, versions.GAMERS)
     def retrieve(self, request, pk):
         """Handle GET requests for single game 
         
@@ -18,13 +32,20 @@ class GameView(ViewSet):
             Response -- JSON serialized game
         """
         
+        fieldset = get_fieldset(request, SparseGameSerializer)
         try:
-            game = Game.objects.get(pk=pk)
-            serializer = GameSerializer(game)
+            if fieldset is None:
+                game = Game.objects.get(pk=pk)
+                serializer = GameSerializer(game)
+            else:
+                game = sparse_queryset(Game.objects.all(), SparseGameSerializer, **fieldset).get(pk=pk)
+                serializer = SparseGameSerializer(game, **fieldset)
             return Response(serializer.data)
         except ObjectDoesNotExist as ex:
             return Response({'message': ex.args[0]}, status=status.HTTP_404_NOT_FOUND)
     
+    @versions.conditional(versions.GAMES, versions.GAME_TYPES, versions.GAMERS)
+    @caching.cached(versions.GAMES, versions.GAME_TYPES, versions.GAMERS)
     def list(self, request):
         """Handle GET requests to get all games
         
@@ -32,6 +53,7 @@ class GameView(ViewSet):
             Response -- JSON serialized list of game types
         """
         
+        fieldset = get_fieldset(request, SparseGameSerializer)
         games = Game.objects.all()
         
         # games = Game.objects.annotate(event_count=Count('events'))
@@ -40,8 +62,37 @@ class GameView(ViewSet):
         game_type = request.query_params.get('type', None)
         if game_type is not None:
             games = games.filter(game_type_id=game_type)
-            
-        serializer = GameSerializer(games, many=True)
+
+        # Only paginated when the client asks for a page_size
+        paginator = GamePagination()
+
+        # ?q= full-text search on title and maker, ranked by relevance
+        search = request.query_params.get('q', None)
+        if search is not None:
+            games = search_games(games, search)
+            paginator = SearchPagination()
+
+        if fieldset is None and settings.LEVELUP_FAST_SERIALIZERS:
+            # Same JSON as GameSerializer, built straight from values() rows
+            fast = FastSerializer.for_serializer(GameSerializer)
+            rows = fast.values(games)
+            page = paginator.paginate_queryset(rows, request, view=self)
+            if page is not None:
+                return paginator.get_paginated_response(fast.render(page))
+            return Response(fast.render(rows))
+
+        serializer_class = GameSerializer
+        if fieldset is not None:
+            # ?fields= / ?expand= only read the requested columns and relations
+            games = sparse_queryset(games, SparseGameSerializer, extra=GamePagination.ordering, **fieldset)
+            serializer_class = partial(SparseGameSerializer, **fieldset)
+
+        page = paginator.paginate_queryset(games, request, view=self)
+        if page is not None:
+            serializer = serializer_class(page, many=True)
+            return paginator.get_paginated_response(serializer.data)
+
+        serializer = serializer_class(games, many=True)
         return Response(serializer.data)
     
     def create(self, request):
@@ -50,23 +101,11 @@ class GameView(ViewSet):
         Returns
             Response -- JSON serialized game instance
         """
-        
-        gamer = Gamer.objects.get(user=request.auth.user)
-        game_type = GameType.objects.get(pk=request.data["game_type"])
-        
-        
-        game = Game.objects.create(
-            
-            title = request.data["title"],
-            maker = request.data["maker"],
-            number_of_players = request.data["number_of_players"],
-            skill_level = request.data["skill_level"],
-            gamer = gamer,
-            game_type = game_type
-        )
-        
-        
-        
+
+        if isinstance(request.data, list):
+            return self.create_many(request)
+
+        game = create_game(request.data, request.gamer)
         serializer = CreateGameSerializer(game)
         # serializer.is_valid(raise_exception=True)
         # serializer.save(gamer=gamer)
@@ -102,16 +141,136 @@ class GameView(ViewSet):
             Response -- Empty body with 204 status code
         """
         game = Game.objects.get(pk=pk)
-        serializer = CreateGameSerializer(game, data=request.data)
-        serializer.is_valid(raise_exception=True) # When the user's data is invalid, does this return a 400 code to the client?
-        serializer.save()
+        update_game(game, request.data)
         return Response(None, status=status.HTTP_204_NO_CONTENT)
     
     def destroy(self, request, pk):
         game = Game.objects.get(pk=pk)
         game.delete()
         return Response(None, status=status.HTTP_204_NO_CONTENT)
-    
+
+    def create_many(self, request):
+        """Handle POST requests with a list of games
+
+        Returns:
+            Response -- JSON serialized game instances, or one error object per item
+        """
+
+        games, errors = create_games(request.data, request.gamer)
+        if errors is not None:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = CreateGameSerializer(games, many=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def bulk_update(self, request):
+        """Handle PUT requests with a list of games, each carrying its id
+
+        Returns:
+            Response -- Empty body with 204 status code, or one error object per item
+        """
+
+        if not isinstance(request.data, list):
+            return Response({'message': 'Expected a list of games'}, status=status.HTTP_400_BAD_REQUEST)
+
+        errors = update_games(request.data)
+        if errors is not None:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        return Response(None, status=status.HTTP_204_NO_CONTENT)
+
+
+# The writes below are shared with the async views in levelupapi.views.async_api
+
+def create_game(data, gamer):
+    """Create a game from the body of POST /games
+
+    Returns:
+        Game -- the new game
+    """
+    game_type = GameType.objects.get(pk=data["game_type"])
+    return Game.objects.create(
+        title=data["title"],
+        maker=data["maker"],
+        number_of_players=data["number_of_players"],
+        skill_level=data["skill_level"],
+        gamer=gamer,
+        game_type=game_type
+    )
+
+
+def update_game(game, data):
+    """Validate the body of PUT /games/<pk> and save it onto the game, raises ValidationError"""
+    serializer = CreateGameSerializer(game, data=data)
+    serializer.is_valid(raise_exception=True)
+    serializer.save()
+
+
+def create_games(data, gamer):
+    """Create every game of a POST /games list in one transaction, or none when any is invalid
+
+    Returns:
+        tuple -- (the new games, None), or (None, an error dict per item)
+    """
+    items, errors = validate_games(data, BulkGameSerializer)
+    if any(errors):
+        return None, errors
+
+    games = [Game(gamer=gamer, **item) for item in items]
+    with transaction.atomic():
+        Game.objects.bulk_create(games, batch_size=BULK_BATCH_SIZE)
+        games_bulk_saved.send(sender=Game, game_ids=[game.id for game in games])
+    return games, None
+
+
+def update_games(data):
+    """Update every game of a PUT /games list in one transaction, or none when any is invalid
+
+    Returns:
+        list -- an error dict per item, None once the games are saved
+    """
+    items, errors = validate_games(data, BulkUpdateGameSerializer)
+    games = Game.objects.in_bulk([item['id'] for item in items if item])
+    for index, item in enumerate(items):
+        if item and item['id'] not in games:
+            errors[index] = {'id': [f'Invalid pk "{item["id"]}" - object does not exist.']}
+    if any(errors):
+        return errors
+
+    for item in items:
+        game = games[item.pop('id')]
+        for field, value in item.items():
+            setattr(game, field, value)
+
+    with transaction.atomic():
+        Game.objects.bulk_update(games.values(), BULK_UPDATE_FIELDS, batch_size=BULK_BATCH_SIZE)
+        games_bulk_saved.send(sender=Game, game_ids=list(games))
+    return None
+
+
+def validate_games(data, serializer_class):
+    """Validate a list of game payloads, resolving every game_type in one query
+
+    Returns:
+        tuple -- validated items (None where invalid) and an error dict per item
+    """
+
+    checked = [serializer_class(data=item) for item in data]
+    valid = [serializer.is_valid() for serializer in checked]
+    items = [dict(serializer.validated_data) if ok else None for serializer, ok in zip(checked, valid)]
+    errors = [{} if ok else serializer.errors for serializer, ok in zip(checked, valid)]
+
+    game_types = GameType.objects.in_bulk({item['game_type'] for item in items if item})
+    for index, item in enumerate(items):
+        if item is None:
+            continue
+        if item['game_type'] not in game_types:
+            errors[index] = {'game_type': [f'Invalid pk "{item["game_type"]}" - object does not exist.']}
+            items[index] = None
+        else:
+            item['game_type'] = game_types[item['game_type']]
+    return items, errors
+
+
 class CreateGameSerializer(serializers.ModelSerializer):
     """JSON serializer for games
     """
@@ -120,6 +279,31 @@ class CreateGameSerializer(serializers.ModelSerializer):
         model = Game
         fields = ('id', 'title', 'maker', 'skill_level', 'number_of_players', 'game_type')
 
+class BulkGameSerializer(serializers.ModelSerializer):
+    """Validates one item of a bulk create, game_type is resolved afterwards
+    in a single query for the whole list
+    """
+
+    game_type = serializers.IntegerField()
+
+    class Meta:
+        model = Game
+        fields = ('title', 'maker', 'skill_level', 'number_of_players', 'game_type')
+
+
+class BulkUpdateGameSerializer(BulkGameSerializer):
+    """Validates one item of a bulk update
+    """
+
+    id = serializers.IntegerField()
+
+    class Meta(BulkGameSerializer.Meta):
+        fields = ('id',) + BulkGameSerializer.Meta.fields
+
+
+BULK_UPDATE_FIELDS = BulkGameSerializer.Meta.fields
+
+
 class GameSerializer(serializers.ModelSerializer):
     """JSON serializer for games
     """
@@ -131,4 +315,18 @@ class GameSerializer(serializers.ModelSerializer):
         model = Game
         depth = 2 
         # fields = ('id', 'title', 'maker', 'number_of_players', 'skill_level', 'game_type', 'event_count')
-        fields = ('id', 'title', 'maker', 'number_of_players', 'skill_level', 'game_type')
\ No newline at end of file
+        fields = ('id', 'title', 'maker', 'number_of_players', 'skill_level', 'game_type')
+
+
+class SparseGameSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
+    """JSON serializer for games when the client picks ?fields= or ?expand=
+    """
+
+    expandable_fields = {
+        'game_type': GameTypeSerializer,
+        'gamer': GamerSummarySerializer,
+    }
+
+    class Meta:
+        model = Game
+        fields = ('id', 'title', 'maker', 'number_of_players', 'skill_level', 'game_type', 'gamer')
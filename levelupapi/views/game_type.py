@@ -2,12 +2,16 @@
 from rest_framework.viewsets import ViewSet
 from rest_framework.response import Response
 from rest_framework import serializers, status
+from levelupapi import caching, versions
 from levelupapi.models import GameType
+from levelupapi.views.fieldsets import ExpandableFieldsMixin
 
 
 class GameTypeView(ViewSet):
     """Level up game types view"""
 
+    @versions.conditional(versions.GAME_TYPES)
+    @caching.cached(versions.GAME_TYPES)
     def retrieve(self, request, pk):
         """Handle GET requests for single game type
 
@@ -22,6 +26,8 @@ class GameTypeView(ViewSet):
         except GameType.DoesNotExist as ex:
             return Response({'message': ex.args[0]}, status=status.HTTP_404_NOT_FOUND)
 
+    @versions.conditional(versions.GAME_TYPES)
+    @caching.cached(versions.GAME_TYPES)
     def list(self, request):
         """Handle GET requests to get all game types
 
@@ -32,7 +38,7 @@ class GameTypeView(ViewSet):
         serializer = GameTypeSerializer(game_types, many=True)
         return Response(serializer.data)
     
-class GameTypeSerializer(serializers.ModelSerializer):
+class GameTypeSerializer(ExpandableFieldsMixin, serializers.ModelSerializer):
     """JSON serializer for game types
     """
     class Meta:
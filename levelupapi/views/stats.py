@@ -0,0 +1,45 @@
+"""View module for runtime statistics, staff only"""
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from levelupapi import admission, caching, instrumentation
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def cache_stats(request):
+    '''Handles GET requests for the response cache hit and miss counters
+
+    Method arguments:
+      request -- The full HTTP request object
+    '''
+    return Response({'response_cache': caching.stats.snapshot()})
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def request_stats(request):
+    '''Handles GET requests for the query counts and timing percentiles of each route
+
+    Method arguments:
+      request -- The full HTTP request object
+    '''
+    return Response({
+        'enabled': instrumentation.get_settings()['ENABLED'],
+        'routes': instrumentation.stats.snapshot()
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def admission_stats(request):
+    '''Handles GET requests for the admitted, queued and shed counters of each route class
+
+    Method arguments:
+      request -- The full HTTP request object
+    '''
+    return Response({
+        'enabled': admission.get_settings()['ENABLED'],
+        'classes': admission.limiters.snapshot()
+    })
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class LevelupreportsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'levelupreports'
+
+    def ready(self):
+        # Importing the module connects the report table receivers
+        from levelupreports import signals  # pylint: disable=import-outside-toplevel,unused-import
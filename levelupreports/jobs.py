@@ -0,0 +1,138 @@
+"""Background computation of the reports, backed by the ReportJob table
+
+POST /reports/usergames?format=csv (or userevents, or format=ndjson/json)
+records a pending job and answers 202 with its id. The run_report_jobs
+command claims pending jobs and computes them on a local process pool, so
+a report never runs inside a request. GET /reports/jobs/<id> reports the
+status and GET /reports/jobs/<id>/result serves the finished body.
+
+A submission identical to a pending or running job, or to one that
+finished less than FRESH_SECONDS ago, gets that job back instead of a new
+one. Nothing but the database is shared between the web and worker
+processes.
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils import timezone
+
+from levelupreports.models import ReportJob
+from levelupreports.views.helpers import csv_lines, grouped_rows, ndjson_lines, report_connection, stream_rows
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json',
+}
+
+
+def get_settings():
+    return {
+        # How long a finished result is handed out again for identical submissions
+        'FRESH_SECONDS': 300,
+        # Finished and failed jobs are deleted after this long
+        'KEEP_SECONDS': 24 * 60 * 60,
+        # A running job not finished after this long is assumed lost and run again
+        'STALE_SECONDS': 600,
+        **getattr(settings, 'LEVELUP_REPORT_JOBS', {}),
+    }
+
+
+def reports():
+    """Report name mapped to (flat SQL, grouped JSON SQL, name of the grouped children)"""
+    # The view modules submit jobs through this module
+    # pylint: disable=import-outside-toplevel
+    from levelupreports.views.users.eventsbyuser import (
+        USER_EVENT_HISTORY_JSON_SQL, USER_EVENT_HISTORY_SQL, USER_EVENTS_JSON_SQL, USER_EVENTS_SQL
+    )
+    from levelupreports.views.users.gamesbyuser import USER_GAMES_JSON_SQL, USER_GAMES_SQL
+    return {
+        'usergames': (USER_GAMES_SQL, USER_GAMES_JSON_SQL, 'games'),
+        'userevents': (USER_EVENTS_SQL, USER_EVENTS_JSON_SQL, 'events'),
+        # userevents with ?include_archived=true
+        'usereventhistory': (USER_EVENT_HISTORY_SQL, USER_EVENT_HISTORY_JSON_SQL, 'events'),
+    }
+
+
+def job_key(report, export_format, params):
+    return hashlib.sha1(json.dumps([report, export_format, params], sort_keys=True).encode()).hexdigest()
+
+
+def submit(report, export_format, params):
+    """Record a job, or find an identical one that is still running or fresh
+
+    Returns:
+        tuple -- (ReportJob, bool) the job and whether it already existed
+    """
+    key = job_key(report, export_format, params)
+    fresh_after = timezone.now() - timedelta(seconds=get_settings()['FRESH_SECONDS'])
+    job = ReportJob.objects.filter(key=key).filter(
+        Q(status__in=(ReportJob.PENDING, ReportJob.RUNNING)) | Q(status=ReportJob.DONE, finished_at__gte=fresh_after)
+    ).order_by('-created_at').first()
+    if job is not None:
+        return job, True
+    return ReportJob.objects.create(report=report, format=export_format, params=params, key=key), False
+
+
+def compute(report, export_format, params):
+    """The body of a report, as the synchronous views would have sent it"""
+    flat_sql, grouped_sql, children = reports()[report]
+    if export_format == 'json':
+        gamer_id = params.get('gamer_id')
+        conditions, values = (['gamer_id = %s'], [gamer_id]) if gamer_id is not None else ([], [])
+        return json.dumps(grouped_rows(grouped_sql, children, conditions, values), cls=DjangoJSONEncoder)
+    rows = stream_rows(report_connection(), flat_sql)
+    return ''.join(csv_lines(rows) if export_format == 'csv' else ndjson_lines(rows))
+
+
+def claim(limit):
+    """Mark up to `limit` of the oldest pending jobs as running
+
+    The conditional UPDATE makes sure two workers never claim the same job.
+
+    Returns:
+        list -- ids of the claimed jobs
+    """
+    claimed = []
+    pending = ReportJob.objects.filter(status=ReportJob.PENDING).order_by('created_at')
+    for pk in pending.values_list('pk', flat=True)[:limit]:
+        if ReportJob.objects.filter(pk=pk, status=ReportJob.PENDING).update(
+            status=ReportJob.RUNNING, started_at=timezone.now()
+        ):
+            claimed.append(pk)
+    return claimed
+
+
+def execute(job_id):
+    """Compute a claimed job and store its result, runs in the worker processes"""
+    job = ReportJob.objects.get(pk=job_id)
+    try:
+        result = compute(job.report, job.format, job.params)
+    except Exception as ex:  # pylint: disable=broad-except
+        ReportJob.objects.filter(pk=job_id).update(
+            status=ReportJob.FAILED, error=f'{type(ex).__name__}: {ex}', finished_at=timezone.now()
+        )
+        return ReportJob.FAILED
+    ReportJob.objects.filter(pk=job_id).update(status=ReportJob.DONE, result=result, finished_at=timezone.now())
+    return ReportJob.DONE
+
+
+def requeue_stale():
+    """Put running jobs whose worker went away back in the queue"""
+    stale_before = timezone.now() - timedelta(seconds=get_settings()['STALE_SECONDS'])
+    return ReportJob.objects.filter(status=ReportJob.RUNNING, started_at__lt=stale_before).update(
+        status=ReportJob.PENDING, started_at=None
+    )
+
+
+def prune():
+    """Delete finished and failed jobs older than KEEP_SECONDS"""
+    keep_after = timezone.now() - timedelta(seconds=get_settings()['KEEP_SECONDS'])
+    deleted, _ = ReportJob.objects.filter(
+        status__in=(ReportJob.DONE, ReportJob.FAILED), finished_at__lt=keep_after
+    ).delete()
+    return deleted
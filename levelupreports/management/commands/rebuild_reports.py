@@ -0,0 +1,25 @@
+"""Management command that rebuilds and checks the report tables"""
+from django.core.management.base import BaseCommand, CommandError
+
+from levelupreports import materialize
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-gamer report tables from scratch and verify them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify-only', action='store_true',
+            help='Only compare the tables against the source data'
+        )
+
+    def handle(self, *args, **options):
+        if not options['verify_only']:
+            materialize.rebuild()
+            self.stdout.write('Rebuilt report tables')
+
+        problems = {name: pks for name, pks in materialize.differences().items() if pks}
+        if problems:
+            details = ', '.join(f'{name}: {len(pks)} rows differ' for name, pks in problems.items())
+            raise CommandError(f'Report tables are out of date ({details})')
+        self.stdout.write(self.style.SUCCESS('Report tables match the source data'))
@@ -0,0 +1,72 @@
+"""Management command that computes submitted report jobs on a local process pool"""
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from levelupreports import jobs
+
+
+class Command(BaseCommand):
+    help = 'Run the report jobs submitted with POST /reports/...; no broker needed, jobs live in the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=2,
+            help='Worker processes, 0 computes the jobs in this process'
+        )
+        parser.add_argument('--poll', type=float, default=1.0, help='Seconds between looks for new jobs')
+        parser.add_argument('--once', action='store_true', help='Exit once no jobs are pending')
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        if workers < 0:
+            raise CommandError('--workers can not be negative')
+        if workers == 0:
+            self.run_inline(options)
+            return
+        # Spawned workers set Django up from scratch and open their own
+        # connections rather than sharing this process's
+        pool = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context('spawn'), initializer=django.setup
+        )
+        running = {}
+        try:
+            while True:
+                self.housekeeping()
+                for job_id in jobs.claim(workers - len(running)):
+                    running[pool.submit(jobs.execute, job_id)] = job_id
+                if not running:
+                    if options['once']:
+                        return
+                    time.sleep(options['poll'])
+                    continue
+                done, _ = wait(running, timeout=options['poll'], return_when=FIRST_COMPLETED)
+                for future in done:
+                    self.finished(running.pop(future), future.result())
+        finally:
+            pool.shutdown(cancel_futures=True)
+            connections.close_all()
+
+    def run_inline(self, options):
+        while True:
+            self.housekeeping()
+            claimed = jobs.claim(1)
+            if claimed:
+                self.finished(claimed[0], jobs.execute(claimed[0]))
+            elif options['once']:
+                return
+            else:
+                time.sleep(options['poll'])
+
+    def housekeeping(self):
+        requeued = jobs.requeue_stale()
+        if requeued:
+            self.stdout.write(f'Requeued {requeued} stale jobs')
+        jobs.prune()
+
+    def finished(self, job_id, status):
+        self.stdout.write(f'Job {job_id} {status}')
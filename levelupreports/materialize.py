@@ -0,0 +1,107 @@
+"""Keeps the per-gamer report tables in step with the levelupapi tables
+
+Every function here is set based, so a single save and a bulk import both
+cost a handful of queries.
+"""
+from django.db import transaction
+
+from levelupapi.models import Event, Game
+from levelupreports.models import UserEventReport, UserGameReport
+
+GAME_COLUMNS = ('title', 'maker', 'skill_level', 'number_of_players')
+EVENT_COLUMNS = ('description', 'date', 'time')
+
+
+def full_name(first_name, last_name):
+    return f'{first_name} {last_name}'
+
+
+def game_rows(games):
+    """Build report rows from a Game queryset"""
+    rows = games.values(
+        'id', 'gamer_id', 'gamer__user__first_name', 'gamer__user__last_name', *GAME_COLUMNS
+    )
+    return [
+        UserGameReport(
+            game_id=row['id'],
+            gamer_id=row['gamer_id'],
+            full_name=full_name(row['gamer__user__first_name'], row['gamer__user__last_name']),
+            **{column: row[column] for column in GAME_COLUMNS}
+        )
+        for row in rows.iterator()
+    ]
+
+
+def event_rows(events):
+    """Build report rows from an Event queryset"""
+    rows = events.values(
+        'id', 'game__gamer_id', 'game__title',
+        'game__gamer__user__first_name', 'game__gamer__user__last_name', *EVENT_COLUMNS
+    )
+    return [
+        UserEventReport(
+            event_id=row['id'],
+            gamer_id=row['game__gamer_id'],
+            full_name=full_name(row['game__gamer__user__first_name'], row['game__gamer__user__last_name']),
+            game_title=row['game__title'],
+            **{column: row[column] for column in EVENT_COLUMNS}
+        )
+        for row in rows.iterator()
+    ]
+
+
+def refresh_events(event_ids):
+    """Replace the report rows of the given events"""
+    event_ids = list(event_ids)
+    with transaction.atomic():
+        UserEventReport.objects.filter(event_id__in=event_ids).delete()
+        UserEventReport.objects.bulk_create(event_rows(Event.objects.filter(pk__in=event_ids)), batch_size=500)
+
+
+def refresh_games(game_ids):
+    """Replace the report rows of the given games and of their events"""
+    game_ids = list(game_ids)
+    with transaction.atomic():
+        UserGameReport.objects.filter(game_id__in=game_ids).delete()
+        UserGameReport.objects.bulk_create(game_rows(Game.objects.filter(pk__in=game_ids)), batch_size=500)
+        # Events carry the game title and owner, so they follow the game
+        refresh_events(Event.objects.filter(game_id__in=game_ids).values_list('id', flat=True))
+
+
+def rename_gamer(gamer_id, first_name, last_name):
+    """Push a gamer's new name into both report tables"""
+    name = full_name(first_name, last_name)
+    UserGameReport.objects.filter(gamer_id=gamer_id).exclude(full_name=name).update(full_name=name)
+    UserEventReport.objects.filter(gamer_id=gamer_id).exclude(full_name=name).update(full_name=name)
+
+
+def rebuild():
+    """Throw away both tables and fill them again from the source tables"""
+    with transaction.atomic():
+        UserGameReport.objects.all().delete()
+        UserEventReport.objects.all().delete()
+        UserGameReport.objects.bulk_create(game_rows(Game.objects.all()), batch_size=500)
+        UserEventReport.objects.bulk_create(event_rows(Event.objects.all()), batch_size=500)
+
+
+def differences():
+    """Compare both tables against the source tables
+
+    Returns:
+        dict -- report name mapped to the primary keys whose rows are missing, stale or extra
+    """
+    fields = {
+        'usergames': (UserGameReport, game_rows(Game.objects.all()), 'game_id'),
+        'userevents': (UserEventReport, event_rows(Event.objects.all()), 'event_id'),
+    }
+    result = {}
+    for name, (model, expected, key) in fields.items():
+        columns = [field.attname for field in model._meta.concrete_fields]
+        expected = {getattr(row, key): tuple(getattr(row, column) for column in columns) for row in expected}
+        actual = {row[0]: row for row in model.objects.values_list(*columns)}
+        # values_list puts the primary key first, which matches `columns`
+        result[name] = sorted(
+            pk for pk in expected.keys() | actual.keys()
+            if expected.get(pk) != actual.get(pk)
+        )
+    return result
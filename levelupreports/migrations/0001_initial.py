@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('levelupapi', '0003_alter_event_attendees_alter_event_game'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserEventReport',
+            fields=[
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='levelupapi.event')),
+                ('full_name', models.CharField(max_length=301)),
+                ('game_title', models.CharField(max_length=50)),
+                ('description', models.TextField()),
+                ('date', models.DateField()),
+                ('time', models.TimeField()),
+                ('gamer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='levelupapi.gamer')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UserGameReport',
+            fields=[
+                ('game', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='levelupapi.game')),
+                ('full_name', models.CharField(max_length=301)),
+                ('title', models.CharField(max_length=50)),
+                ('maker', models.TextField()),
+                ('skill_level', models.TextField()),
+                ('number_of_players', models.IntegerField()),
+                ('gamer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='levelupapi.gamer')),
+            ],
+        ),
+    ]
@@ -0,0 +1,45 @@
+from django.db import migrations
+
+
+def populate(apps, schema_editor):
+    """Fill the report tables from whatever is already in the database"""
+    Game = apps.get_model('levelupapi', 'Game')
+    Event = apps.get_model('levelupapi', 'Event')
+    UserGameReport = apps.get_model('levelupreports', 'UserGameReport')
+    UserEventReport = apps.get_model('levelupreports', 'UserEventReport')
+
+    UserGameReport.objects.bulk_create([
+        UserGameReport(
+            game_id=game.id,
+            gamer_id=game.gamer_id,
+            full_name=f'{game.gamer.user.first_name} {game.gamer.user.last_name}',
+            title=game.title,
+            maker=game.maker,
+            skill_level=game.skill_level,
+            number_of_players=game.number_of_players
+        )
+        for game in Game.objects.select_related('gamer__user').iterator()
+    ], batch_size=500)
+    UserEventReport.objects.bulk_create([
+        UserEventReport(
+            event_id=event.id,
+            gamer_id=event.game.gamer_id,
+            full_name=f'{event.game.gamer.user.first_name} {event.game.gamer.user.last_name}',
+            game_title=event.game.title,
+            description=event.description,
+            date=event.date,
+            time=event.time
+        )
+        for event in Event.objects.select_related('game__gamer__user').iterator()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('levelupreports', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate, migrations.RunPython.noop),
+    ]
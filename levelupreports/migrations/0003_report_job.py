@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:41
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('levelupreports', '0002_populate_reports'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('report', models.CharField(max_length=20)),
+                ('format', models.CharField(max_length=10)),
+                ('params', models.JSONField(default=dict)),
+                ('key', models.CharField(db_index=True, max_length=40)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('result', models.TextField(null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(null=True)),
+                ('finished_at', models.DateTimeField(null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='leveluprepo_status_a872df_idx')],
+            },
+        ),
+    ]
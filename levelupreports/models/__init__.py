@@ -0,0 +1,3 @@
+from .user_game_report import UserGameReport
+from .user_event_report import UserEventReport
+from .report_job import ReportJob
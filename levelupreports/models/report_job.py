@@ -0,0 +1,30 @@
+import uuid
+
+from django.db import models
+
+
+class ReportJob(models.Model):
+    """A report computed in the background by the run_report_jobs worker, see levelupreports.jobs"""
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = [(PENDING, 'Pending'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    # Random so the result of a job can only be fetched by whoever submitted it
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    report = models.CharField(max_length=20)
+    format = models.CharField(max_length=10)
+    params = models.JSONField(default=dict)
+    # Digest of report, format and params, identical submissions share it
+    key = models.CharField(max_length=40, db_index=True)
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+    result = models.TextField(null=True)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True)
+    finished_at = models.DateTimeField(null=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'created_at'])]
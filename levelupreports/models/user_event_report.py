@@ -0,0 +1,13 @@
+from django.db import models
+
+
+class UserEventReport(models.Model):
+    """One row per event, grouped under the gamer who owns the event's game"""
+
+    event = models.OneToOneField("levelupapi.Event", on_delete=models.CASCADE, primary_key=True, related_name='+')
+    gamer = models.ForeignKey("levelupapi.Gamer", on_delete=models.CASCADE, related_name='+')
+    full_name = models.CharField(max_length=301)
+    game_title = models.CharField(max_length=50)
+    description = models.TextField()
+    date = models.DateField()
+    time = models.TimeField()
@@ -0,0 +1,13 @@
+from django.db import models
+
+
+class UserGameReport(models.Model):
+    """One row per game, denormalized for the games by user report"""
+
+    game = models.OneToOneField("levelupapi.Game", on_delete=models.CASCADE, primary_key=True, related_name='+')
+    gamer = models.ForeignKey("levelupapi.Gamer", on_delete=models.CASCADE, related_name='+')
+    full_name = models.CharField(max_length=301)
+    title = models.CharField(max_length=50)
+    maker = models.TextField()
+    skill_level = models.TextField()
+    number_of_players = models.IntegerField()
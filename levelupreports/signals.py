@@ -0,0 +1,47 @@
+"""Model signal receivers that keep the report tables up to date"""
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from levelupapi.models import Event, Game, Gamer
+from levelupapi.signals import events_archived, games_bulk_saved
+from levelupreports import materialize
+
+
+# Deletes need no receiver, the report rows cascade with their game or
+# event. Archiving skips the cascade, see events_archived_handler
+
+@receiver(post_save, sender=Game)
+def game_saved(sender, instance, **kwargs):
+    materialize.refresh_games([instance.pk])
+
+
+@receiver(games_bulk_saved)
+def games_bulk_saved_handler(sender, game_ids, **kwargs):
+    materialize.refresh_games(game_ids)
+
+
+@receiver(post_save, sender=Event)
+def event_saved(sender, instance, **kwargs):
+    materialize.refresh_events([instance.pk])
+
+
+@receiver(events_archived)
+def events_archived_handler(sender, event_ids, **kwargs):
+    # The events are gone, so this only drops their rows
+    materialize.refresh_events(event_ids)
+
+
+@receiver(post_save, sender=Gamer)
+def gamer_saved(sender, instance, created, **kwargs):
+    if not created:
+        user = User.objects.get(pk=instance.user_id)
+        materialize.rename_gamer(instance.pk, user.first_name, user.last_name)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    if not created:
+        gamer_id = Gamer.objects.filter(user=instance).values_list('id', flat=True).first()
+        if gamer_id is not None:
+            materialize.rename_gamer(gamer_id, instance.first_name, instance.last_name)
@@ -1,8 +1,11 @@
 from django.urls import path
 from .views import UserGameList
 from .views import UserEventList
+from .views import report_job, report_job_result
 
 urlpatterns = [
     path('reports/usergames', UserGameList.as_view()),
-    path('reports/userevents', UserEventList.as_view())
-]
\ No newline at end of file
+    path('reports/userevents', UserEventList.as_view()),
+    path('reports/jobs/<uuid:pk>', report_job),
+    path('reports/jobs/<uuid:pk>/result', report_job_result),
+]
@@ -1,3 +1,33 @@
+import csv
+import json
+from itertools import groupby
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, router
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import NotFound
+
+from levelupapi.pagination import KeysetPagination
+from levelupreports.models import UserGameReport
+
+# Number of rows pulled from the cursor per round trip when streaming
+STREAM_CHUNK_SIZE = 2000
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def report_connection():
+    """Connection the report queries run on, the replica for read-only requests
+
+    Resolved while the view runs, the routing decision is gone by the time
+    a streaming response is being sent.
+    """
+    return connections[router.db_for_read(UserGameReport)]
+
+
 def dict_fetch_all(cursor):
     """Return all rows from a cursor as a list of dictionaries"""
     columns = [col[0] for col in cursor.description]
@@ -5,3 +35,136 @@ def dict_fetch_all(cursor):
         dict(zip(columns, row))
         for row in cursor.fetchall()
     ]
+
+
+def group_by_gamer(rows, children, columns):
+    """Nest flat report rows under their gamer in a single pass
+
+    Args:
+        rows (list): dictionaries ordered by gamer_id
+        children (str): key the nested list is stored under
+        columns (dict): nested key mapped to the row column it is read from
+    """
+    grouped = []
+    for gamer_id, group in groupby(rows, key=lambda row: row['gamer_id']):
+        group = list(group)
+        grouped.append({
+            "gamer_id": gamer_id,
+            "full_name": group[0]['full_name'],
+            children: [
+                {key: row[column] for key, column in columns.items()}
+                for row in group
+            ]
+        })
+    return grouped
+
+
+def stream_rows(db_connection, sql, params=None, chunk_size=STREAM_CHUNK_SIZE):
+    """Yield the column names and then every row of a query, chunk by chunk
+
+    The cursor is opened inside the generator so it stays alive while the
+    response is being sent, and only `chunk_size` rows are held at a time.
+    """
+    with db_connection.cursor() as db_cursor:
+        db_cursor.execute(sql, params)
+        yield [col[0] for col in db_cursor.description]
+        while True:
+            rows = db_cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield from rows
+
+
+class Echo:
+    """Pseudo buffer that hands back what csv.writer writes to it"""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(Echo())
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def ndjson_lines(rows):
+    columns = next(rows)
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def export_response(export_format, sql, filename):
+    """Stream a report query as CSV or newline delimited JSON"""
+    rows = stream_rows(report_connection(), sql)
+    lines = csv_lines(rows) if export_format == 'csv' else ndjson_lines(rows)
+    response = StreamingHttpResponse(lines, content_type=EXPORT_FORMATS[export_format])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    return response
+
+
+def include_archived(request):
+    """Whether ?include_archived=true was sent, None for anything but true or false"""
+    return {'true': True, 'false': False}.get(request.GET.get('include_archived', 'false').lower())
+
+
+class GamerPagination(KeysetPagination):
+    """Pages of whole gamers for the ?format=json reports"""
+    ordering = ('gamer_id',)
+
+
+def grouped_rows(sql, children, conditions=(), params=(), limit=None):
+    """Run a grouped report query and parse the JSON array of each gamer
+
+    Args:
+        conditions (list): SQL conditions on gamer_id, joined with AND
+        limit (int): most gamers to return, None for all of them
+    """
+    # SQLite reads a negative LIMIT as no limit
+    with report_connection().cursor() as db_cursor:
+        db_cursor.execute(
+            sql.format(where=' AND '.join(conditions) or '1 = 1'), [*params, -1 if limit is None else limit]
+        )
+        rows = dict_fetch_all(db_cursor)
+    for row in rows:
+        row[children] = json.loads(row[children])
+    return rows
+
+
+def grouped_report_response(request, sql, model, children):
+    """Answer ?format=json with one object per gamer, grouped by the database
+
+    `sql` aggregates each gamer's rows into a JSON array named `children`
+    and has a `{where}` placeholder for the gamer ids to include, followed
+    by a LIMIT parameter. ?gamer_id= narrows it to a single gamer and
+    ?page_size= / ?cursor= page through the gamers.
+    """
+    paginator = GamerPagination()
+    paginator.request = request
+    paginator.page_size = paginator.get_page_size(request)
+    conditions, params = [], []
+
+    gamer_id = request.GET.get('gamer_id')
+    if gamer_id is not None:
+        try:
+            params.append(int(gamer_id))
+        except ValueError:
+            return JsonResponse({'gamer_id': ['A valid integer is required.']}, status=400)
+        conditions.append('gamer_id = %s')
+
+    cursor = request.GET.get(paginator.cursor_query_param)
+    if paginator.page_size is not None and cursor:
+        try:
+            after, = paginator.decode_cursor(model, cursor)
+        except NotFound as ex:
+            return JsonResponse({'detail': ex.detail}, status=ex.status_code)
+        conditions.append('gamer_id > %s')
+        params.append(after)
+
+    # One extra gamer tells whether there is a next page
+    limit = None if paginator.page_size is None else paginator.page_size + 1
+    rows = grouped_rows(sql, children, conditions, params, limit)
+
+    if paginator.page_size is None:
+        return JsonResponse(rows, safe=False)
+    return JsonResponse(paginator.get_paginated_data(paginator.finish_page(rows)))
@@ -0,0 +1,107 @@
+"""Module for submitting reports as background jobs and reading their results"""
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET
+
+from levelupreports import jobs
+from levelupreports.models import ReportJob
+from levelupreports.views.helpers import include_archived
+
+
+def describe(job):
+    """The status document of a job"""
+    data = {
+        'id': str(job.id),
+        'report': job.report,
+        'format': job.format,
+        'params': job.params,
+        'status': job.status,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+        'url': f'/reports/jobs/{job.id}',
+    }
+    if job.status == ReportJob.DONE:
+        data['result'] = f'/reports/jobs/{job.id}/result'
+    if job.status == ReportJob.FAILED:
+        data['error'] = job.error
+    return data
+
+
+class ReportJobMixin:
+    """Adds POST to a report view, which submits the report as a job instead of running it
+
+    Takes the same ?format= as GET (csv, ndjson or json, and ?gamer_id= for
+    json) and answers 202 with the job, or 200 with an identical job that
+    is still running or finished recently. Views with an `archived_report`
+    also take ?include_archived=true, which submits that report instead.
+    """
+    report = None
+    archived_report = None
+
+    # The reports take no credentials, so there is no session to forge
+    @method_decorator(csrf_exempt)
+    def dispatch(self, request, *args, **kwargs):
+        return super().dispatch(request, *args, **kwargs)
+
+    def post(self, request):
+        export_format = request.GET.get('format')
+        if export_format not in jobs.FORMATS:
+            return JsonResponse(
+                {'format': [f'One of {", ".join(jobs.FORMATS)} is required.']}, status=400
+            )
+        report = self.report
+        archived = include_archived(request)
+        if archived is None or (archived and self.archived_report is None):
+            return JsonResponse({'include_archived': ['Not supported for this value or report.']}, status=400)
+        if archived:
+            report = self.archived_report
+
+        params = {}
+        gamer_id = request.GET.get('gamer_id')
+        if export_format == 'json' and gamer_id is not None:
+            try:
+                params['gamer_id'] = int(gamer_id)
+            except ValueError:
+                return JsonResponse({'gamer_id': ['A valid integer is required.']}, status=400)
+
+        job, existed = jobs.submit(report, export_format, params)
+        response = JsonResponse(describe(job), status=200 if existed else 202)
+        response['Location'] = f'/reports/jobs/{job.id}'
+        return response
+
+
+@require_GET
+def report_job(request, pk):
+    '''Handles GET requests for the status of a report job
+
+    Method arguments:
+      request -- The full HTTP request object
+      pk -- The id of the job
+    '''
+    return JsonResponse(describe(get_object_or_404(ReportJob, pk=pk)))
+
+
+@require_GET
+def report_job_result(request, pk):
+    '''Handles GET requests for the body of a finished report job
+
+    Answers 409 while the job is pending, running or failed.
+
+    Method arguments:
+      request -- The full HTTP request object
+      pk -- The id of the job
+    '''
+    job = get_object_or_404(ReportJob, pk=pk)
+    if job.status != ReportJob.DONE:
+        response = JsonResponse(
+            {'detail': f'The job is {job.status}.', 'status': job.status}, status=409
+        )
+        if job.status in (ReportJob.PENDING, ReportJob.RUNNING):
+            response['Retry-After'] = '1'
+        return response
+    response = HttpResponse(job.result, content_type=jobs.FORMATS[job.format])
+    response['Content-Disposition'] = f'attachment; filename="{job.report}.{job.format}"'
+    return response
@@ -1,85 +1,130 @@
 """Module for generating events by user report"""
+from django.http import JsonResponse
 from django.shortcuts import render
-from django.db import connection
 from django.views import View
 
-from levelupreports.views.helpers import dict_fetch_all
+from levelupreports.views.helpers import (
+    EXPORT_FORMATS, dict_fetch_all, export_response, group_by_gamer,
+    grouped_report_response, include_archived, report_connection
+)
+from levelupreports.views.jobs import ReportJobMixin
+from levelupreports.models import UserEventReport
 
+# Reads the precomputed levelupreports_usereventreport table, which the
+# signals in levelupreports.signals keep in step with events, games and gamers
+USER_EVENT_ROWS = "levelupreports_usereventreport"
+
+# ?include_archived=true: archived events have no report rows, so they are
+# joined from the archive tables the way the signals build the report rows
+USER_EVENT_HISTORY_ROWS = """(
+    SELECT event_id, gamer_id, full_name, game_title, description, date, time
+    FROM levelupreports_usereventreport
+    UNION ALL
+    SELECT
+        a.id, g.gamer_id, u.first_name || ' ' || u.last_name,
+        g.title, a.description, a.date, a.time
+    FROM levelupapi_archivedevent a
+    JOIN levelupapi_game g ON g.id = a.game_id
+    JOIN levelupapi_gamer gm ON gm.id = g.gamer_id
+    JOIN auth_user u ON u.id = gm.user_id
+)"""
+
+USER_EVENTS_TEMPLATE = """
+    SELECT
+        r.game_title, r.description AS event_description,
+        r.date, r.time, r.gamer_id,
+        r.full_name
+    FROM {rows} r
+    ORDER BY r.gamer_id, r.event_id
+"""
+
+# ?format=json: the same report with each gamer's events aggregated by the
+# database. The inner query picks the page of gamers off the gamer_id index
+USER_EVENTS_JSON_TEMPLATE = """
+    SELECT
+        r.gamer_id,
+        MIN(r.full_name) AS full_name,
+        json_group_array(json_object(
+            'game_title', r.game_title,
+            'description', r.description,
+            'date', r.date,
+            'time', r.time
+        )) AS events
+    FROM (
+        SELECT *
+        FROM {rows}
+        WHERE gamer_id IN (
+            SELECT DISTINCT gamer_id
+            FROM {rows}
+            WHERE {{where}}
+            ORDER BY gamer_id
+            LIMIT %s
+        )
+        ORDER BY gamer_id, event_id
+    ) r
+    GROUP BY r.gamer_id
+    ORDER BY r.gamer_id
+"""
+
+USER_EVENTS_SQL = USER_EVENTS_TEMPLATE.format(rows=USER_EVENT_ROWS)
+USER_EVENTS_JSON_SQL = USER_EVENTS_JSON_TEMPLATE.format(rows=USER_EVENT_ROWS)
+USER_EVENT_HISTORY_SQL = USER_EVENTS_TEMPLATE.format(rows=USER_EVENT_HISTORY_ROWS)
+USER_EVENT_HISTORY_JSON_SQL = USER_EVENTS_JSON_TEMPLATE.format(rows=USER_EVENT_HISTORY_ROWS)
+
+
+class UserEventList(ReportJobMixin, View):
+    # POST submits the report as a background job, see levelupreports.jobs
+    report = 'userevents'
+    archived_report = 'usereventhistory'
 
-class UserEventList(View):
     def get(self, request):
-        with connection.cursor() as db_cursor:
-
-            # TODO: Write a query to get all events along with the gamer first name, last name, and id
-            db_cursor.execute("""
-                SELECT
-                    g.title AS game_title, e.description AS event_description,
-                    e.date, e.time, gm.id AS gamer_id,
-                    au.first_name || " " || au.last_name AS "full_name"
-                    FROM levelupapi_gamer gm
-                    JOIN levelupapi_game g 
-                        ON gm.id = g.gamer_id
-                    JOIN levelupapi_event e
-                        ON e.game_id = g.id
-                    JOIN auth_user au
-                        ON au.id = gm.user_id
-            """)
-            
+        archived = include_archived(request)
+        if archived is None:
+            return JsonResponse({'include_archived': ['Must be true or false.']}, status=400)
+        flat_sql, grouped_sql = (
+            (USER_EVENT_HISTORY_SQL, USER_EVENT_HISTORY_JSON_SQL) if archived
+            else (USER_EVENTS_SQL, USER_EVENTS_JSON_SQL)
+        )
+
+        # ?format=json returns the nested report as JSON, ?format=csv or
+        # ?format=ndjson streams the flat rows instead of rendering the page
+        export_format = request.GET.get('format')
+        if export_format == 'json':
+            return grouped_report_response(request, grouped_sql, UserEventReport, 'events')
+        if export_format in EXPORT_FORMATS:
+            return export_response(export_format, flat_sql, 'userevents')
+
+        with report_connection().cursor() as db_cursor:
+            db_cursor.execute(flat_sql)
+
             # Pass the db_cursor to the dict_fetch_all function to turn the fetch_all() response into a dictionary
             dataset = dict_fetch_all(db_cursor)
 
-            # Take the flat data from the dataset, and build the
-            # following data structure for each event.
-            # This will be the structure of the events_by_user list:
-            
-# [
-#   {
-#     "gamer_id": 1,
-#     "full_name": "Molly Ringwald",
-#     "events": [
-#       {
-#         "id": 5,
-#         "date": "2020-12-23",
-#         "time": "19:00",
-#         "game_name": "Fortress America"
-#       }
-#     ]
-#   }
-# ]
-
-            events_by_user = []
-
-            for row in dataset:
-                # TODO: Create a dictionary called event that includes 
-                # the name, description, number_of_players, maker,
-                # event_type_id, and skill_level from the row dictionary
-                event = {
-                    'description': row['event_description'],
-                    'date': row['date'],
-                    'time': row['time']
-                }
-                
-                # See if the gamer has been added to the events_by_user list already
-                user_dict = None
-                for user_event in events_by_user:
-                     if user_event['gamer_id'] == row['gamer_id']:
-                         user_dict = user_event
-                
-                
-                if user_dict:
-                    # If the user_dict is already in the events_by_user list, append the event to the events list
-                    user_dict['events'].append(event)
-                else:
-                    # If the user is not on the events_by_user list, create and add the user to the list
-                    events_by_user.append({
-                        "gamer_id": row['gamer_id'],
-                        "full_name": row['full_name'],
-                        "events": [event]
-                    })
-        
+        # The rows come back ordered by gamer, so one pass builds
+        # the following data structure for each gamer:
+        #
+        # [
+        #   {
+        #     "gamer_id": 1,
+        #     "full_name": "Molly Ringwald",
+        #     "events": [
+        #       {
+        #         "description": "Game night",
+        #         "date": "2020-12-23",
+        #         "time": "19:00"
+        #       }
+        #     ]
+        #   }
+        # ]
+        events_by_user = group_by_gamer(dataset, 'events', {
+            'description': 'event_description',
+            'date': 'date',
+            'time': 'time'
+        })
+
         # The template string must match the file name of the html template
         template = 'users/list_with_events.html'
-        
+
         # The context will be a dictionary that the template can access to show data
         context = {
             "userevent_list": events_by_user
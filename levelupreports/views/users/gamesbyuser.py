@@ -1,96 +1,101 @@
 """Module for generating games by user report"""
 from django.shortcuts import render
-from django.db import connection
 from django.views import View
 
-from levelupreports.views.helpers import dict_fetch_all
+from levelupreports.views.helpers import (
+    EXPORT_FORMATS, dict_fetch_all, export_response, group_by_gamer,
+    grouped_report_response, report_connection
+)
+from levelupreports.views.jobs import ReportJobMixin
+from levelupreports.models import UserGameReport
 
+# Reads the precomputed levelupreports_usergamereport table, which the
+# signals in levelupreports.signals keep in step with games and gamers
+USER_GAMES_SQL = """
+    SELECT
+        r.title, r.maker, r.skill_level,
+        r.number_of_players,
+        r.gamer_id,
+        r.full_name
+    FROM levelupreports_usergamereport r
+    ORDER BY r.gamer_id, r.game_id
+"""
+
+# ?format=json: the same report with each gamer's games aggregated by the
+# database. The inner query picks the page of gamers off the gamer_id index
+USER_GAMES_JSON_SQL = """
+    SELECT
+        r.gamer_id,
+        MIN(r.full_name) AS full_name,
+        json_group_array(json_object(
+            'title', r.title,
+            'maker', r.maker,
+            'skill_level', r.skill_level,
+            'number_of_players', r.number_of_players
+        )) AS games
+    FROM (
+        SELECT *
+        FROM levelupreports_usergamereport
+        WHERE gamer_id IN (
+            SELECT DISTINCT gamer_id
+            FROM levelupreports_usergamereport
+            WHERE {where}
+            ORDER BY gamer_id
+            LIMIT %s
+        )
+        ORDER BY gamer_id, game_id
+    ) r
+    GROUP BY r.gamer_id
+    ORDER BY r.gamer_id
+"""
+
+
+class UserGameList(ReportJobMixin, View):
+    # POST submits the report as a background job, see levelupreports.jobs
+    report = 'usergames'
 
-class UserGameList(View):
     def get(self, request):
-        with connection.cursor() as db_cursor:
+        # ?format=json returns the nested report as JSON, ?format=csv or
+        # ?format=ndjson streams the flat rows instead of rendering the page
+        export_format = request.GET.get('format')
+        if export_format == 'json':
+            return grouped_report_response(request, USER_GAMES_JSON_SQL, UserGameReport, 'games')
+        if export_format in EXPORT_FORMATS:
+            return export_response(export_format, USER_GAMES_SQL, 'usergames')
+
+        with report_connection().cursor() as db_cursor:
+            db_cursor.execute(USER_GAMES_SQL)
 
-            # TODO: Write a query to get all games along with the gamer first name, last name, and id
-            db_cursor.execute("""
-                SELECT
-                    g.title, g.maker, g.skill_level, 
-                    g.number_of_players, 
-                    gm.id AS "gamer_id", 
-                    au.first_name || "" || au.last_name AS "full_name"
-                FROM levelupapi_game g
-                JOIN levelupapi_gamer gm
-                    ON g.gamer_id = gm.id
-                JOIN auth_user au
-                    ON gm.user_id = au.id
-            
-            """)
-            
             # Pass the db_cursor to the dict_fetch_all function to turn the fetch_all() response into a dictionary
             dataset = dict_fetch_all(db_cursor)
 
-            # Take the flat data from the dataset, and build the
-            # following data structure for each gamer.
-            # This will be the structure of the games_by_user list:
-            #
-            # [
-            #   {
-            #     "id": 1,
-            #     "full_name": "Admina Straytor",
-            #     "games": [
-            #       {
-            #         "id": 1,
-            #         "title": "Foo",
-            #         "maker": "Bar Games",
-            #         "skill_level": 3,
-            #         "number_of_players": 4,
-            #         "game_type_id": 2
-            #       },
-            #       {
-            #         "id": 2,
-            #         "title": "Foo 2",
-            #         "maker": "Bar Games 2",
-            #         "skill_level": 3,
-            #         "number_of_players": 4,
-            #         "game_type_id": 2
-            #       }
-            #     ]
-            #   },
-            # ]
-
-            games_by_user = []
+        # The rows come back ordered by gamer, so one pass builds
+        # the following data structure for each gamer:
+        #
+        # [
+        #   {
+        #     "gamer_id": 1,
+        #     "full_name": "Admina Straytor",
+        #     "games": [
+        #       {
+        #         "title": "Foo",
+        #         "maker": "Bar Games",
+        #         "skill_level": 3,
+        #         "number_of_players": 4
+        #       }
+        #     ]
+        #   },
+        # ]
+        games_by_user = group_by_gamer(dataset, 'games', {
+            'title': 'title',
+            'maker': 'maker',
+            'skill_level': 'skill_level',
+            'number_of_players': 'number_of_players'
+        })
 
-            for row in dataset:
-                # TODO: Create a dictionary called game that includes 
-                # the name, description, number_of_players, maker,
-                # game_type_id, and skill_level from the row dictionary
-                game = {
-                    'title': row['title'],
-                    'maker': row['maker'],
-                    'skill_level': row['skill_level'],
-                    'number_of_players': row['number_of_players']
-                }
-                
-                # See if the gamer has been added to the games_by_user list already
-                user_dict = None
-                for user_game in games_by_user:
-                     if user_game['gamer_id'] == row['gamer_id']:
-                         user_dict = user_game
-                
-                
-                if user_dict:
-                    # If the user_dict is already in the games_by_user list, append the game to the games list
-                    user_dict['games'].append(game)
-                else:
-                    # If the user is not on the games_by_user list, create and add the user to the list
-                    games_by_user.append({
-                        "gamer_id": row['gamer_id'],
-                        "full_name": row['full_name'],
-                        "games": [game]
-                    })
-        
         # The template string must match the file name of the html template
         template = 'users/list_with_games.html'
-        
+
         # The context will be a dictionary that the template can access to show data
         context = {
             "usergame_list": games_by_user
@@ -0,0 +1,144 @@
+import threading
+
+from django.test import RequestFactory, override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.authtoken.models import Token
+from levelupapi import admission
+from levelupapi.models import Gamer
+
+LIMITS = {
+    'ENABLED': True,
+    'CLASSES': {
+        'expensive': {'CONCURRENCY': 1, 'QUEUE': 1, 'TIMEOUT': 2, 'PER_CLIENT': 1, 'RETRY_AFTER': 5},
+        'reads': {'CONCURRENCY': 1, 'QUEUE': 0, 'PER_CLIENT': 1, 'RETRY_AFTER': 1},
+    },
+}
+
+
+@override_settings(LEVELUP_ADMISSION=LIMITS, LEVELUP_RESPONSE_CACHE={'ENABLED': False})
+class AdmissionControlTests(APITestCase):
+
+    fixtures = ['users', 'tokens', 'gamers', 'game_types', 'games', 'events']
+
+    def setUp(self):
+        admission.limiters.reset()
+        self.gamer = Gamer.objects.first()
+        self.authorization = f'Token {Token.objects.get(user=self.gamer.user).key}'
+        self.client.credentials(HTTP_AUTHORIZATION=self.authorization)
+
+    def tearDown(self):
+        admission.limiters.reset()
+
+    def occupy(self, route_class, client='someone else'):
+        limiter, _ = admission.limiters.get(route_class)
+        self.assertEqual(admission.ADMITTED, limiter.acquire(client, admission.ThreadWaiter)[0])
+        return limiter
+
+    def test_classify(self):
+        """Requests are put in the class of their route"""
+        factory = RequestFactory()
+        cases = [
+            (factory.post('/login'), 'auth'),
+            (factory.post('/async/register'), 'auth'),
+            (factory.post('/events/1/signup'), 'writes'),
+            (factory.delete('/games/1'), 'writes'),
+            (factory.get('/reports/usergames'), 'expensive'),
+            (factory.get('/reports/userevents?format=csv'), 'expensive'),
+            (factory.get('/events'), 'reads'),
+            (factory.get('/async/games'), 'reads'),
+            (factory.get('/events?page_size=10'), 'reads'),
+            (factory.get('/gametypes'), 'reads'),
+            (factory.get('/async/events/stream'), None),
+            (factory.get('/nowhere'), None),
+        ]
+        for request, expected in cases:
+            self.assertEqual(expected, admission.classify(request), request.path)
+
+    def test_sheds_when_full(self):
+        """A full class with a full queue answers 503 at once, other classes are unaffected"""
+        limiter = self.occupy('reads')
+        response = self.client.get('/gametypes')
+        self.assertEqual(status.HTTP_503_SERVICE_UNAVAILABLE, response.status_code)
+        self.assertEqual('1', response['Retry-After'])
+
+        # Auth has no limits configured here, the reports have their own
+        self.assertEqual(status.HTTP_200_OK, self.client.get('/reports/usergames?format=json').status_code)
+        limiter.release('someone else')
+        self.assertEqual(status.HTTP_200_OK, self.client.get('/gametypes').status_code)
+        self.assertEqual(
+            {'concurrency': 1, 'queue': 0, 'active': 0, 'waiting': 0, 'admitted': 2, 'queued': 0, 'shed': 1, 'limited': 0},
+            limiter.snapshot()
+        )
+
+    def test_per_client_limit(self):
+        """A client holding its share of a class gets a 429"""
+        self.occupy('reads', client=self.authorization)
+        response = self.client.get('/gametypes')
+        self.assertEqual(status.HTTP_429_TOO_MANY_REQUESTS, response.status_code)
+        self.assertEqual('1', response['Retry-After'])
+
+    def test_queued_request_gets_released_slot(self):
+        """A queued request runs as soon as a slot is released"""
+        limiter = self.occupy('expensive')
+        timer = threading.Timer(0.05, limiter.release, ['someone else'])
+        timer.start()
+        response = self.client.get('/reports/usergames?format=json')
+        timer.join()
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(1, limiter.snapshot()['queued'])
+
+    @override_settings(LEVELUP_ADMISSION={**LIMITS, 'CLASSES': {
+        'expensive': {'CONCURRENCY': 1, 'QUEUE': 1, 'TIMEOUT': 0.01, 'RETRY_AFTER': 5}
+    }})
+    def test_queue_timeout(self):
+        """A request that waits out its TIMEOUT is shed"""
+        self.occupy('expensive')
+        response = self.client.get('/reports/usergames?format=json')
+        self.assertEqual(status.HTTP_503_SERVICE_UNAVAILABLE, response.status_code)
+        self.assertEqual('5', response['Retry-After'])
+
+    async def test_async_requests(self):
+        """Under ASGI requests queue on the event loop and are shed the same way"""
+        headers = {'Authorization': self.authorization}
+        limiter = self.occupy('reads')
+        response = await self.async_client.get('/async/games?page_size=1', headers=headers)
+        self.assertEqual(status.HTTP_503_SERVICE_UNAVAILABLE, response.status_code)
+
+        limiter = self.occupy('expensive')
+        timer = threading.Timer(0.05, limiter.release, ['someone else'])
+        timer.start()
+        response = await self.async_client.get('/reports/usergames?format=json', headers=headers)
+        timer.join()
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(0, limiter.snapshot()['active'])
+
+    def test_streamed_report_holds_slot(self):
+        """A streamed report keeps its slot until the body has been sent"""
+        response = self.client.get('/reports/usergames?format=ndjson')
+        limiter, _ = admission.limiters.get('expensive')
+        self.assertEqual(1, limiter.snapshot()['active'])
+        b''.join(response.streaming_content)
+        self.assertEqual(0, limiter.snapshot()['active'])
+
+    def test_stats(self):
+        """Counters are served to staff under /stats/admission"""
+        self.client.get('/gametypes')
+        self.assertEqual(status.HTTP_403_FORBIDDEN, self.client.get('/stats/admission').status_code)
+
+        self.gamer.user.is_staff = True
+        self.gamer.user.save()
+        response = self.client.get('/stats/admission')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertTrue(response.data['enabled'])
+        reads = response.data['classes']['reads']
+        # This request holds the slot while the counters are read
+        self.assertEqual(1, reads['active'])
+        self.assertEqual(3, reads['admitted'])
+        self.assertEqual(0, reads['shed'])
+
+    @override_settings(LEVELUP_ADMISSION={'ENABLED': False})
+    def test_disabled(self):
+        """The middleware drops out and nothing is limited"""
+        self.assertEqual(status.HTTP_200_OK, self.client.get('/gametypes').status_code)
+        self.assertEqual({}, admission.limiters.snapshot())
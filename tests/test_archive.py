@@ -0,0 +1,132 @@
+import datetime
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.authtoken.models import Token
+from levelupapi import live, versions
+from levelupapi.models import ArchivedEvent, Event, EventHistory, Game, Gamer
+from levelupreports.models import UserEventReport
+
+
+class ArchiveTests(APITestCase):
+
+    fixtures = ['users', 'tokens', 'gamers', 'game_types', 'games', 'events']
+
+    def setUp(self):
+        self.gamer = Gamer.objects.first()
+        token = Token.objects.get(user=self.gamer.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        # The fixture events are from 2022, this one stays in the hot set
+        self.recent = Event.objects.create(
+            game=Game.objects.first(),
+            description='Next week',
+            date=datetime.date.today() + datetime.timedelta(days=7),
+            time=datetime.time(19, 0),
+            organizer=self.gamer
+        )
+        self.old = Event.objects.get(pk=1)
+        self.old.attendees.add(self.gamer)
+
+    def archive(self, *args):
+        out = StringIO()
+        call_command('archive_events', *args, stdout=out)
+        return out.getvalue()
+
+    def test_archive_moves_old_events(self):
+        """Old events and their attendees move to the archive tables, recent ones stay"""
+        self.assertIn('Archived 2 event(s)', self.archive('--batch-size', '1'))
+
+        self.assertEqual([self.recent.id], list(Event.objects.values_list('id', flat=True)))
+        archived = ArchivedEvent.objects.get(pk=self.old.id)
+        self.assertEqual(self.old.description, archived.description)
+        self.assertEqual(self.old.game_id, archived.game_id)
+        self.assertEqual([self.gamer.id], list(archived.attendees.values_list('id', flat=True)))
+        self.assertEqual(1, archived.attendee_count)
+        self.assertFalse(UserEventReport.objects.filter(event_id=self.old.id).exists())
+
+        # Nothing left to do on the next run
+        self.assertIn('Archived 0 event(s)', self.archive())
+
+    def test_archive_is_announced_once_per_batch(self):
+        """Archiving publishes `archived` rather than `deleted` and bumps the markers on commit"""
+        before = versions.get_versions([versions.EVENTS, versions.gamer_events(self.gamer.id)])
+        with mock.patch.object(live.broker, 'has_subscribers', return_value=True), \
+                mock.patch.object(live.broker, 'publish') as publish, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.archive()
+        self.assertCountEqual([mock.call('archived', {'id': 1}), mock.call('archived', {'id': 2})], publish.call_args_list)
+        after = versions.get_versions([versions.EVENTS, versions.gamer_events(self.gamer.id)])
+        self.assertNotEqual(before[0], after[0])
+        self.assertNotEqual(before[1], after[1])
+
+    def test_dry_run_and_max_batches(self):
+        """--dry-run only counts, --max-batches stops early"""
+        self.assertIn('2 event(s) would be archived', self.archive('--dry-run'))
+        self.assertEqual(3, Event.objects.count())
+        self.assertIn('Archived 1 event(s)', self.archive('--batch-size', '1', '--max-batches', '1'))
+        self.assertEqual(2, Event.objects.count())
+
+    def test_list_only_reads_archive_when_asked(self):
+        """The event list serves the hot set unless ?include_archived=true"""
+        self.archive()
+
+        response = self.client.get('/events')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual([self.recent.id], [event['id'] for event in response.data])
+
+        response = self.client.get('/events?include_archived=true')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        events = {event['id']: event for event in response.data}
+        self.assertEqual({1, 2, self.recent.id}, set(events))
+        self.assertTrue(events[1]['archived'])
+        self.assertTrue(events[1]['joined'])
+        self.assertFalse(events[self.recent.id]['archived'])
+        self.assertEqual(self.old.description, events[1]['description'])
+
+        response = self.client.get('/events?include_archived=true&page_size=2')
+        self.assertEqual(2, len(response.data['results']))
+
+        response = self.client.get('/events?include_archived=maybe')
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+    def test_retrieve_archived_event(self):
+        """An archived event is only found with ?include_archived=true"""
+        self.archive()
+
+        response = self.client.get('/events/1')
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+
+        response = self.client.get('/events/1?include_archived=true')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertTrue(response.data['archived'])
+        self.assertEqual(1, EventHistory.objects.get(pk=1).attendees.count())
+
+        response = self.client.get('/async/events/1?include_archived=true')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertTrue(response.json()['archived'])
+
+    def test_report_includes_archived_events(self):
+        """The events by user report adds archived events when asked"""
+        before = self.client.get('/reports/userevents?format=json').json()
+        self.archive()
+
+        after = self.client.get('/reports/userevents?format=json').json()
+        self.assertEqual(['Next week'], [event['description'] for row in after for event in row['events']])
+
+        history = self.client.get('/reports/userevents?format=json&include_archived=true').json()
+        self.assertEqual(
+            sorted(event['description'] for row in before for event in row['events']),
+            sorted(event['description'] for row in history for event in row['events'])
+        )
+        self.assertEqual(before[0]['full_name'], history[0]['full_name'])
+
+        response = self.client.get('/reports/userevents?format=ndjson&include_archived=true')
+        self.assertEqual(3, len(b''.join(response.streaming_content).splitlines()))
+        self.assertEqual(400, self.client.get('/reports/userevents?include_archived=x').status_code)
+
+        job = self.client.post('/reports/userevents?format=csv&include_archived=true').json()
+        self.assertEqual('usereventhistory', job['report'])
+        self.assertEqual(400, self.client.post('/reports/usergames?format=csv&include_archived=true').status_code)
@@ -0,0 +1,162 @@
+import json
+
+from django.contrib.auth.models import User
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.authtoken.models import Token
+from levelupapi.models import Event, Game, Gamer
+
+
+@override_settings(LEVELUP_RESPONSE_CACHE={'ENABLED': False})
+class AsyncViewTests(APITestCase):
+    """The /async/ endpoints must answer like their DRF counterparts"""
+
+    fixtures = ['users', 'tokens', 'gamers', 'game_types', 'games', 'events']
+
+    def setUp(self):
+        self.gamer = Gamer.objects.first()
+        token = Token.objects.get(user=self.gamer.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+    def assert_same_json(self, path):
+        expected = self.client.get(path)
+        actual = self.client.get(f'/async{path}')
+        self.assertEqual(status.HTTP_200_OK, actual.status_code)
+        # Next links point back at the endpoint that was called
+        self.assertEqual(json.loads(expected.content), json.loads(actual.content.decode().replace('/async/', '/')))
+
+    def test_lists_and_details_match(self):
+        """Games and events, including a filtered page and single items"""
+        event = Event.objects.first()
+        self.assert_same_json('/games')
+        self.assert_same_json('/games?page_size=1')
+        self.assert_same_json(f'/games/{event.game_id}')
+        self.assert_same_json('/events')
+        self.assert_same_json(f'/events?game={event.game_id}&page_size=1')
+        self.assert_same_json(f'/events/{event.id}')
+
+    def test_requires_token(self):
+        """Missing and unknown tokens get a 401"""
+        self.client.credentials()
+        self.assertEqual(status.HTTP_401_UNAUTHORIZED, self.client.get('/async/games').status_code)
+        self.client.credentials(HTTP_AUTHORIZATION='Token nope')
+        self.assertEqual(status.HTTP_401_UNAUTHORIZED, self.client.get('/async/events').status_code)
+
+    def test_errors(self):
+        """Unknown ids, bad filters and cursors, and wrong methods"""
+        self.assertEqual(status.HTTP_404_NOT_FOUND, self.client.get('/async/events/9999').status_code)
+        response = self.client.get('/async/events?from=soon')
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.assertIn('from', json.loads(response.content))
+        self.assertEqual(status.HTTP_404_NOT_FOUND, self.client.get('/async/games?page_size=1&cursor=x').status_code)
+        self.assertEqual(status.HTTP_405_METHOD_NOT_ALLOWED, self.client.post('/async/games/1').status_code)
+        self.assertEqual(status.HTTP_404_NOT_FOUND, self.client.delete('/async/games/9999').status_code)
+
+    def test_signup_and_leave(self):
+        """Attendance changes keep attendee_count in step"""
+        event = Event.objects.exclude(attendees=self.gamer).first()
+        before = event.attendee_count
+
+        response = self.client.post(f'/async/events/{event.id}/signup')
+        self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+        event.refresh_from_db()
+        self.assertEqual(before + 1, event.attendee_count)
+        self.assertTrue(event.attendees.filter(pk=self.gamer.pk).exists())
+
+        response = self.client.delete(f'/async/events/{event.id}/leave')
+        self.assertEqual(status.HTTP_204_NO_CONTENT, response.status_code)
+        event.refresh_from_db()
+        self.assertEqual(before, event.attendee_count)
+
+    def test_game_writes(self):
+        """Games are created, updated and deleted one at a time and in bulk"""
+        game = {'title': 'Async Chess', 'maker': 'Staunton', 'number_of_players': 2, 'skill_level': 3, 'game_type': 1}
+        response = self.client.post('/async/games', game, format='json')
+        self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+        created = Game.objects.get(pk=json.loads(response.content)['id'])
+        self.assertEqual(self.gamer, created.gamer)
+
+        response = self.client.put(f'/async/games/{created.id}', {**game, 'title': 'Async Go'}, format='json')
+        self.assertEqual(status.HTTP_204_NO_CONTENT, response.status_code)
+        created.refresh_from_db()
+        self.assertEqual('Async Go', created.title)
+        response = self.client.put(f'/async/games/{created.id}', {'title': 'No maker'}, format='json')
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+        response = self.client.post('/async/games', [game, {**game, 'title': 'Async Shogi'}], format='json')
+        self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+        ids = [item['id'] for item in json.loads(response.content)]
+        self.assertEqual(2, Game.objects.filter(pk__in=ids).count())
+        response = self.client.post('/async/games', [game, {'title': 'Half a game'}], format='json')
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.assertEqual({}, json.loads(response.content)[0])
+
+        response = self.client.put('/async/games', [{**game, 'id': pk, 'skill_level': 5} for pk in ids], format='json')
+        self.assertEqual(status.HTTP_204_NO_CONTENT, response.status_code)
+        self.assertEqual({'5'}, set(Game.objects.filter(pk__in=ids).values_list('skill_level', flat=True)))
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, self.client.put('/async/games', game, format='json').status_code)
+
+        self.assertEqual(status.HTTP_204_NO_CONTENT, self.client.delete(f'/async/games/{created.id}').status_code)
+        self.assertFalse(Game.objects.filter(pk=created.id).exists())
+
+    def test_event_writes(self):
+        """Events are created, updated and deleted"""
+        data = {'game': Game.objects.first().id, 'description': 'Async night', 'date': '2030-01-01', 'time': '19:00'}
+        response = self.client.post('/async/events', data, format='json')
+        self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+        event = Event.objects.get(pk=json.loads(response.content)['id'])
+        self.assertEqual(self.gamer, event.organizer)
+        response = self.client.post('/async/events', {'description': 'No game'}, format='json')
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+        response = self.client.put(f'/async/events/{event.id}', {**data, 'description': 'Async day'}, format='json')
+        self.assertEqual(status.HTTP_204_NO_CONTENT, response.status_code)
+        event.refresh_from_db()
+        self.assertEqual('Async day', event.description)
+
+        self.assertEqual(status.HTTP_204_NO_CONTENT, self.client.delete(f'/async/events/{event.id}').status_code)
+        self.assertFalse(Event.objects.filter(pk=event.id).exists())
+        self.assertEqual(status.HTTP_404_NOT_FOUND, self.client.delete(f'/async/events/{event.id}').status_code)
+
+    def test_bulk_attendance(self):
+        """Many events are joined and left in one request, like POST /events/attendance"""
+        first, second = Event.objects.exclude(attendees=self.gamer)[:2]
+        response = self.client.post('/async/events/attendance', {'join': [first.id, second.id, 999]}, format='json')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(
+            ['joined', 'joined', 'not_found'], [item['result'] for item in json.loads(response.content)['join']]
+        )
+
+        response = self.client.post('/async/events/attendance', {'leave': [second.id]}, format='json')
+        self.assertEqual([{'event': second.id, 'result': 'left'}], json.loads(response.content)['leave'])
+        self.assertEqual([first.id], list(self.gamer.events.values_list('id', flat=True)))
+
+        response = self.client.post(
+            '/async/events/attendance', {'join': [first.id], 'leave': [first.id]}, format='json'
+        )
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+    def test_register_and_login(self):
+        """A registered gamer can log in and use the returned token"""
+        self.client.credentials()
+        data = {
+            'username': 'asyncgamer',
+            'password': 'Secret123',
+            'first_name': 'Async',
+            'last_name': 'Gamer',
+            'bio': 'Waits a lot'
+        }
+        response = self.client.post('/async/register', data, format='json')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        token = json.loads(response.content)['token']
+        user = User.objects.get(username='asyncgamer')
+        self.assertTrue(user.check_password('Secret123'))
+        self.assertEqual('Waits a lot', user.gamer.bio)
+
+        response = self.client.post('/async/login', {'username': 'asyncgamer', 'password': 'Secret123'}, format='json')
+        self.assertEqual({'valid': True, 'token': token}, json.loads(response.content))
+        response = self.client.post('/async/login', {'username': 'asyncgamer', 'password': 'wrong'}, format='json')
+        self.assertEqual({'valid': False}, json.loads(response.content))
+        response = self.client.post('/async/login', {'username': 'asyncgamer'}, format='json')
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
@@ -0,0 +1,63 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.authtoken.models import Token
+from levelupapi.authentication import TokenCache, token_cache
+from levelupapi.models import Gamer
+
+
+class AuthenticationTests(APITestCase):
+
+    fixtures = ['users', 'tokens', 'gamers', 'game_types', 'games', 'events']
+
+    def setUp(self):
+        token_cache.clear()
+        self.gamer = Gamer.objects.first()
+        self.token = Token.objects.get(user=self.gamer.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_token_lookup_is_cached(self):
+        """Only the first request looks the token up"""
+        self.client.get('/gametypes')
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/gametypes')
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertFalse(any('authtoken_token' in query['sql'] for query in context.captured_queries))
+
+    def test_deleted_token_is_rejected(self):
+        """Deleting a token drops it from the cache"""
+        self.client.get('/gametypes')
+        self.token.delete()
+
+        response = self.client.get('/gametypes')
+        self.assertEqual(status.HTTP_401_UNAUTHORIZED, response.status_code)
+
+    def test_revocation_reaches_other_processes(self):
+        """A user changed through another process is looked up again once that change commits"""
+        self.client.get('/gametypes')
+        other_process = TokenCache(alias='shared')
+        with self.captureOnCommitCallbacks(execute=True):
+            other_process.invalidate_user(self.gamer.user_id)
+        # update() fires no signals here, as if the write happened elsewhere
+        User.objects.filter(pk=self.gamer.user_id).update(is_active=False)
+
+        response = self.client.get('/gametypes')
+        self.assertEqual(status.HTTP_401_UNAUTHORIZED, response.status_code)
+
+    def test_cache_is_bounded(self):
+        """The least recently used entry is evicted once the cache is full"""
+        cache = TokenCache(max_size=2, ttl=60)
+        user = self.gamer.user
+        cache.set('a', (user, None))
+        cache.set('b', (user, None))
+        cache.get('a')
+        cache.set('c', (user, None))
+
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+        cache.invalidate_user(user.pk)
+        self.assertIsNone(cache.get('a'))
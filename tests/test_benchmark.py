@@ -0,0 +1,65 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Count, F
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from levelupapi.models import Event, Game, Gamer
+from levelupreports import materialize
+
+
+class DatasetAndBenchmarkTests(TestCase):
+
+    fixtures = ['users', 'tokens', 'gamers', 'game_types', 'games', 'events']
+
+    def generate(self, **options):
+        call_command('generate_dataset', stdout=StringIO(), seed=1, batch_size=7, **options)
+
+    def test_generate_dataset(self):
+        """Bulk generated rows are consistent with what the signals would have kept up"""
+        gamers, games, events = Gamer.objects.count(), Game.objects.count(), Event.objects.count()
+        self.generate(users=20, games=5, events=30, attendees=3)
+
+        self.assertEqual(gamers + 20, Gamer.objects.count())
+        self.assertEqual(20, Token.objects.filter(user__username__startswith='bench-').count())
+        self.assertEqual(games + 5, Game.objects.count())
+        self.assertEqual(events + 30, Event.objects.count())
+        mismatched = Event.objects.filter(description__startswith='bench').annotate(
+            attendees_total=Count('attendees')
+        ).exclude(attendee_count=F('attendees_total'))
+        self.assertFalse(mismatched.exists())
+        self.assertFalse(any(materialize.differences().values()))
+
+        with self.assertRaises(CommandError):
+            self.generate(users=1, games=0, events=0)
+
+    def test_benchmark_against_baseline(self):
+        """Every scenario runs without errors and the results round trip through a baseline"""
+        self.generate(users=5, games=3, events=10, attendees=2)
+        attendance = Event.attendees.through.objects.count()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'baseline.json')
+            out = StringIO()
+            call_command('benchmark', requests=4, host='testserver', save_baseline=path, stdout=out)
+            with open(path, encoding='utf-8') as baseline:
+                results = json.load(baseline)
+
+            self.assertEqual({'games', 'events', 'attendance', 'login', 'usergames', 'userevents'}, set(results))
+            for result in results.values():
+                self.assertEqual(0, result['errors'])
+                self.assertEqual(4, result['requests'])
+                self.assertLessEqual(result['p50'], result['p99'])
+            # Signups were all undone
+            self.assertEqual(attendance, Event.attendees.through.objects.count())
+
+            call_command('benchmark', requests=2, host='testserver', scenario=['games'], baseline=path, stdout=out)
+            self.assertIn('Compared with', out.getvalue())
+            with self.assertRaises(CommandError):
+                call_command(
+                    'benchmark', requests=2, host='testserver', scenario=['games'],
+                    baseline=path, max_regression=-100, stdout=out
+                )
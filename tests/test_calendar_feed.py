@@ -0,0 +1,110 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.authtoken.models import Token
+from levelupapi.models import Event, Game, Gamer
+
+
+class CalendarFeedTests(APITestCase):
+
+    fixtures = ['users', 'tokens', 'gamers', 'game_types', 'games', 'events']
+
+    def setUp(self):
+        cache.clear()
+        self.gamer = Gamer.objects.first()
+        self.token = Token.objects.get(user=self.gamer.user).key
+        self.url = f'/gamers/{self.gamer.id}/events.ics?token={self.token}'
+
+        user = User.objects.create_user(username='organizer', password='pw')
+        self.organizer = Gamer.objects.create(user=user, bio='Organizer')
+        self.event = Event.objects.create(
+            game=Game.objects.first(),
+            description='Long night, bring snacks; and dice',
+            date=datetime.date(2022, 7, 1),
+            time=datetime.time(19, 30),
+            organizer=self.organizer
+        )
+
+    def feed(self, url=None, **headers):
+        response = self.client.get(url or self.url, **headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body.decode()
+
+    def test_feed_lists_organized_and_joined_events(self):
+        response, body = self.feed()
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual('text/calendar; charset=utf-8', response['Content-Type'])
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertTrue(body.endswith('END:VCALENDAR\r\n'))
+        organized = Event.objects.filter(organizer=self.gamer).count()
+        self.assertEqual(organized + self.gamer.events.exclude(organizer=self.gamer).count(), body.count('BEGIN:VEVENT'))
+        self.assertNotIn(f'UID:event-{self.event.id}@', body)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.attendees.add(self.gamer)
+        _, body = self.feed()
+        self.assertIn(f'UID:event-{self.event.id}@levelup\r\n', body)
+        self.assertIn('DTSTART:20220701T193000\r\n', body)
+        self.assertIn('SUMMARY:Long night\\, bring snacks\; and dice\r\n', body)
+
+    def test_unchanged_feed_is_served_from_the_cache(self):
+        """A repeated poll runs no queries past authentication, changes show up at once"""
+        response, first = self.feed()
+        self.assertTrue(response.streaming)
+
+        with CaptureQueriesContext(connection) as context:
+            response, second = self.feed()
+        self.assertEqual(0, len(context.captured_queries))
+        self.assertEqual(first, second)
+
+        response, _ = self.feed(HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(status.HTTP_304_NOT_MODIFIED, response.status_code)
+
+        # Joining, and edits to a joined event, change the feed
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/events/{self.event.id}/signup')
+        _, body = self.feed()
+        self.assertIn(f'UID:event-{self.event.id}@', body)
+        self.event.description = 'Renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.save()
+        _, body = self.feed()
+        self.assertIn('SUMMARY:Renamed\r\n', body)
+
+    def test_feed_changes_on_commit_for_every_worker(self):
+        """The ETag holds until a write commits, then changes wherever the poll lands"""
+        response, _ = self.feed()
+        etag = response['ETag']
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.event.attendees.add(self.gamer)
+            response, _ = self.feed(HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(status.HTTP_304_NOT_MODIFIED, response.status_code)
+        for callback in callbacks:
+            callback()
+
+        # A worker that did not take the write has nothing of it in its own cache
+        cache.clear()
+        response, body = self.feed(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertIn(f'UID:event-{self.event.id}@', body)
+
+    def test_feed_is_private(self):
+        self.assertEqual(status.HTTP_401_UNAUTHORIZED, self.client.get(f'/gamers/{self.gamer.id}/events.ics').status_code)
+        self.assertEqual(
+            status.HTTP_401_UNAUTHORIZED,
+            self.client.get(f'/gamers/{self.gamer.id}/events.ics?token=nope').status_code
+        )
+        other = Token.objects.create(user=self.organizer.user)
+        self.assertEqual(
+            status.HTTP_403_FORBIDDEN,
+            self.client.get(f'/gamers/{self.gamer.id}/events.ics?token={other.key}').status_code
+        )
+        # The Authorization header works too
+        response, _ = self.feed(f'/gamers/{self.gamer.id}/events.ics', HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
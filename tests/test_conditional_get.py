@@ -0,0 +1,65 @@
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.authtoken.models import Token
+from levelupapi import versions
+from levelupapi.models import Event, Gamer, GameType
+
+
+class ConditionalGetTests(APITestCase):
+
+    fixtures = ['users', 'tokens', 'gamers', 'game_types', 'games', 'events']
+
+    def setUp(self):
+        self.gamer = Gamer.objects.first()
+        token = Token.objects.get(user=self.gamer.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+    def test_unchanged_list_is_not_modified(self):
+        """A matching If-None-Match gets a 304 without querying the table"""
+        response = self.client.get('/gametypes')
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/gametypes', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(status.HTTP_304_NOT_MODIFIED, response.status_code)
+        self.assertFalse(any('levelupapi_gametype' in query['sql'] for query in context.captured_queries))
+
+    def test_write_changes_etag(self):
+        """Saving a row gives its collection a new ETag"""
+        etag = self.client.get('/gametypes')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            GameType.objects.create(label='Card game')
+
+        response = self.client.get('/gametypes', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertNotEqual(etag, response['ETag'])
+
+    def test_etag_changes_on_commit(self):
+        """The marker is only bumped once the write commits, in the shared marker cache"""
+        etag = self.client.get('/gametypes')['ETag']
+        with self.captureOnCommitCallbacks() as callbacks:
+            GameType.objects.create(label='Card game')
+            response = self.client.get('/gametypes', HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(status.HTTP_304_NOT_MODIFIED, response.status_code)
+
+        marker = caches['shared'].get(versions.KEY_PREFIX + versions.GAME_TYPES)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(marker, caches['shared'].get(versions.KEY_PREFIX + versions.GAME_TYPES))
+        response = self.client.get('/gametypes', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+
+    def test_attendance_changes_event_etag(self):
+        """Joining an event changes the event list ETag"""
+        etag = self.client.get('/events')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/events/{Event.objects.first().id}/signup')
+
+        response = self.client.get('/events', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
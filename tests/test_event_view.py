@@ -0,0 +1,309 @@
+import datetime
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.authtoken.models import Token
+from levelupapi.models import Event, EventWaitlist, Game, Gamer
+from levelupapi.views.event import FULL, join_event, leave_event
+
+
+class EventTests(APITestCase):
+
+    fixtures = ['users', 'tokens', 'gamers', 'game_types', 'games', 'events']
+
+    def setUp(self):
+        self.gamer = Gamer.objects.first()
+        token = Token.objects.get(user=self.gamer.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+    def add_events(self, count):
+        """Create events that each have a fresh attendee"""
+        game = Game.objects.first()
+        for i in range(count):
+            user = User.objects.create_user(username=f'attendee{Event.objects.count()}-{i}', password='pw')
+            attendee = Gamer.objects.create(user=user, bio='Attendee')
+            event = Event.objects.create(
+                game=game,
+                description=f'Event {i}',
+                date=datetime.date(2022, 6, 1),
+                time=datetime.time(18, 0),
+                organizer=attendee
+            )
+            event.attendees.add(attendee, self.gamer)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        return len(context.captured_queries)
+
+    def test_list_events_query_count_is_constant(self):
+        """Listing events costs the same number of queries as the table grows"""
+        self.add_events(1)
+        baseline = self.count_queries('/events')
+
+        self.add_events(5)
+        self.assertEqual(baseline, self.count_queries('/events'))
+
+    def test_list_events_nested_shape(self):
+        """Events keep their nested game, organizer and attendee objects"""
+        self.add_events(1)
+        response = self.client.get('/events')
+
+        event = next(event for event in response.data if event['description'] == 'Event 0')
+        game = Game.objects.first()
+        self.assertEqual(game.game_type.label, event['game']['game_type']['label'])
+        usernames = [attendee['user']['username'] for attendee in event['attendees']]
+        self.assertIn(event['organizer']['user']['username'], usernames)
+        self.assertEqual(2, event['attendee_count'])
+        self.assertEqual(1, event['joined'])
+
+    def test_get_event(self):
+        """Retrieve keeps the attendee_count annotation"""
+        event = Event.objects.first()
+        event.attendees.add(self.gamer)
+
+        response = self.client.get(f'/events/{event.id}')
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(1, response.data['attendee_count'])
+
+    def test_get_missing_event(self):
+        """Retrieve answers 404 for an unknown event"""
+        response = self.client.get('/events/999')
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+
+    def test_list_events_paginated(self):
+        """Events page through in (date, time, id) order"""
+        self.add_events(3)
+
+        ids = []
+        url = '/events?page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+            ids.extend(event['id'] for event in response.data['results'])
+            url = response.data['next']
+
+        expected = list(Event.objects.order_by('date', 'time', 'id').values_list('id', flat=True))
+        self.assertEqual(expected, ids)
+
+    def test_list_events_invalid_cursor(self):
+        """A garbled cursor is rejected"""
+        response = self.client.get('/events?page_size=2&cursor=nonsense')
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+
+    def test_bulk_attendance(self):
+        """Many events are joined and left in one request"""
+        first, second = Event.objects.all()[:2]
+        second.attendees.add(self.gamer)
+
+        response = self.client.post(
+            '/events/attendance',
+            {'join': [first.id, 999], 'leave': [second.id]},
+            format='json'
+        )
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(
+            [{'event': first.id, 'result': 'joined'}, {'event': 999, 'result': 'not_found'}],
+            response.data['join']
+        )
+        self.assertEqual([{'event': second.id, 'result': 'left'}], response.data['leave'])
+        self.assertEqual([first.id], list(self.gamer.events.values_list('id', flat=True)))
+
+        response = self.client.post('/events/attendance', {'join': [first.id]}, format='json')
+        self.assertEqual([{'event': first.id, 'result': 'already_joined'}], response.data['join'])
+
+    def test_list_events_filtered(self):
+        """Events can be narrowed by date range, game, game type and organizer"""
+        self.add_events(2)
+        game = Game.objects.first()
+
+        response = self.client.get('/events?from=2022-06-01&to=2022-06-01')
+        self.assertEqual(
+            set(Event.objects.filter(date=datetime.date(2022, 6, 1)).values_list('id', flat=True)),
+            {event['id'] for event in response.data}
+        )
+
+        response = self.client.get(f'/events?game={game.id}&game_type={game.game_type_id}&organizer={self.gamer.id}')
+        self.assertEqual(
+            set(Event.objects.filter(game=game, organizer=self.gamer).values_list('id', flat=True)),
+            {event['id'] for event in response.data}
+        )
+
+    def test_list_events_invalid_filter(self):
+        """A malformed filter value is a 400"""
+        response = self.client.get('/events?from=yesterday')
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.assertIn('from', response.data)
+
+    def test_signup_and_leave_maintain_attendee_count(self):
+        """The stored attendee count follows signups and departures"""
+        event = Event.objects.first()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/events/{event.id}/signup')
+            self.client.post(f'/events/{event.id}/signup')
+        event.refresh_from_db()
+        self.assertEqual(1, event.attendee_count)
+
+        response = self.client.get('/events')
+        listed = next(item for item in response.data if item['id'] == event.id)
+        self.assertEqual(1, listed['attendee_count'])
+        self.assertIn(b'"joined":1', response.content)
+
+        self.client.delete(f'/events/{event.id}/leave')
+        self.client.delete(f'/events/{event.id}/leave')
+        event.refresh_from_db()
+        self.assertEqual(0, event.attendee_count)
+
+    def make_gamers(self, count):
+        return [
+            Gamer.objects.create(user=User.objects.create_user(username=f'seat{i}', password='pw'), bio='Seat')
+            for i in range(count)
+        ]
+
+    def test_capacity_defaults_to_number_of_players(self):
+        """New events take the game's number_of_players unless a capacity is sent"""
+        game = Game.objects.first()
+        data = {'game': game.id, 'description': 'Capped', 'date': '2030-01-01', 'time': '19:00'}
+        response = self.client.post('/events', data, format='json')
+        self.assertEqual(game.number_of_players, response.data['capacity'])
+        response = self.client.post('/events', {**data, 'capacity': 2}, format='json')
+        self.assertEqual(2, Event.objects.get(pk=response.data['id']).capacity)
+
+    def test_full_event_and_waitlist(self):
+        """A full event answers 409, waitlisted gamers are seated in order as others leave"""
+        first, second, third = self.make_gamers(3)
+        event = Event.objects.first()
+        event.attendees.clear()
+        Event.objects.filter(pk=event.pk).update(capacity=1)
+        join_event(event, first)
+
+        response = self.client.post(f'/events/{event.id}/signup')
+        self.assertEqual(status.HTTP_409_CONFLICT, response.status_code)
+        response = self.client.post(f'/events/{event.id}/signup', {'waitlist': True}, format='json')
+        self.assertEqual(status.HTTP_202_ACCEPTED, response.status_code)
+        self.assertEqual('waitlisted', join_event(event, second, waitlist=True))
+
+        # Leaving the waitlist gives up the place, leaving the event seats the next in line
+        self.client.delete(f'/events/{event.id}/leave')
+        self.assertFalse(EventWaitlist.objects.filter(event=event, gamer=self.gamer).exists())
+        leave_event(event, first)
+        event.refresh_from_db()
+        self.assertEqual([second], list(event.attendees.all()))
+        self.assertEqual(1, event.attendee_count)
+        self.assertFalse(EventWaitlist.objects.exists())
+
+        # Raising the capacity seats waiting gamers too
+        self.assertEqual('waitlisted', join_event(event, third, waitlist=True))
+        self.client.put(
+            f'/events/{event.id}',
+            {'description': event.description, 'date': event.date, 'time': event.time, 'capacity': 2},
+            format='json'
+        )
+        event.refresh_from_db()
+        self.assertEqual(2, event.attendee_count)
+        self.assertIn(third, event.attendees.all())
+
+    def test_stale_event_can_not_overbook(self):
+        """The seat is claimed by the UPDATE, not by a count read beforehand"""
+        first, second = self.make_gamers(2)
+        event = Event.objects.first()
+        event.attendees.clear()
+        Event.objects.filter(pk=event.pk).update(capacity=1)
+        stale = Event.objects.get(pk=event.pk)
+        join_event(event, first)
+
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(FULL, join_event(stale, second))
+        self.assertFalse(any('SELECT COUNT' in query['sql'].upper() for query in context.captured_queries))
+        stale.refresh_from_db()
+        self.assertEqual(1, stale.attendee_count)
+        self.assertEqual([first], list(stale.attendees.all()))
+
+        response = self.client.post('/events/attendance', {'join': [event.id]}, format='json')
+        self.assertEqual([{'event': event.id, 'result': 'full'}], response.data['join'])
+
+    def test_bulk_leave_removes_waitlist_entry(self):
+        """Leaving an event in bulk also gives up a place on its waitlist"""
+        first, = self.make_gamers(1)
+        event = Event.objects.first()
+        event.attendees.clear()
+        Event.objects.filter(pk=event.pk).update(capacity=1)
+        join_event(event, first)
+        self.assertEqual('waitlisted', join_event(event, self.gamer, waitlist=True))
+
+        response = self.client.post('/events/attendance', {'leave': [event.id]}, format='json')
+        self.assertEqual([{'event': event.id, 'result': 'left_waitlist'}], response.data['leave'])
+        self.assertFalse(EventWaitlist.objects.filter(event=event, gamer=self.gamer).exists())
+
+        # Nobody waiting is seated when the seat frees up
+        leave_event(event, first)
+        self.assertFalse(event.attendees.exists())
+
+    def test_attendee_count_follows_gamer_deletion(self):
+        """Deleting an attendee takes them out of the count"""
+        self.add_events(1)
+        event = Event.objects.get(description='Event 0')
+        event.organizer.user.delete()
+
+        self.gamer.events.remove(Event.objects.first())
+        for event in Event.objects.all():
+            self.assertEqual(event.attendees.count(), event.attendee_count)
+
+    def test_recount_attendees_command(self):
+        """The repair command recounts from the through table"""
+        event = Event.objects.first()
+        event.attendees.add(self.gamer)
+        Event.objects.update(attendee_count=7)
+        etag = self.client.get('/events')['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('recount_attendees', stdout=StringIO())
+
+        event.refresh_from_db()
+        self.assertEqual(1, event.attendee_count)
+        # Cached lists and ETags do not keep the wrong counts
+        response = self.client.get('/events', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        listed = next(item for item in response.data if item['id'] == event.id)
+        self.assertEqual(1, listed['attendee_count'])
+
+    def test_list_events_sparse_fields(self):
+        """?fields= returns and selects only the requested columns"""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/events?fields=id,date')
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual({'id', 'date'}, set(response.data[0]))
+        event_queries = [query['sql'] for query in context.captured_queries if 'FROM "levelupapi_event"' in query['sql']]
+        self.assertEqual(1, len(event_queries))
+        self.assertNotIn('description', event_queries[0])
+        self.assertNotIn('JOIN', event_queries[0])
+
+    def test_list_events_expand(self):
+        """?expand= nests only the requested relations, without user secrets"""
+        self.add_events(1)
+        response = self.client.get('/events?expand=game.game_type,attendees.user')
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        event = next(event for event in response.data if event['description'] == 'Event 0')
+        self.assertIsInstance(event['organizer'], int)
+        self.assertIsInstance(event['game']['gamer'], int)
+        self.assertIn('label', event['game']['game_type'])
+        user = event['attendees'][0]['user']
+        self.assertEqual({'id', 'username', 'first_name', 'last_name'}, set(user))
+
+    def test_list_events_unknown_field(self):
+        """Unknown fields and expand paths are rejected"""
+        response = self.client.get('/events?fields=id,password&expand=game.secret')
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.assertIn('fields', response.data)
+        self.assertIn('expand', response.data)
@@ -0,0 +1,75 @@
+import datetime
+
+from django.contrib.auth.models import Group, Permission, User
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.authtoken.models import Token
+from levelupapi.models import Event, Game, Gamer
+from levelupapi.views.event import EventSerializer
+from levelupapi.views.fast import FastSerializer
+from levelupapi.views.game import GameSerializer
+
+
+@override_settings(LEVELUP_RESPONSE_CACHE={'ENABLED': False})
+class FastSerializerParityTests(APITestCase):
+    """The values() fast path must produce byte-identical JSON to the serializers"""
+
+    fixtures = ['users', 'tokens', 'gamers', 'game_types', 'games', 'events']
+
+    def setUp(self):
+        self.gamer = Gamer.objects.first()
+        token = Token.objects.get(user=self.gamer.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+        group = Group.objects.create(name='Organizers')
+        permission = Permission.objects.first()
+        game = Game.objects.first()
+        for i in range(3):
+            user = User.objects.create_user(username=f'fast{i}', password='pw', first_name='Fast')
+            user.groups.add(group)
+            user.user_permissions.add(permission)
+            gamer = Gamer.objects.create(user=user, bio=f'Bio {i}')
+            event = Event.objects.create(
+                game=game,
+                description=f'Fast {i}',
+                date=datetime.date(2022, 7, i + 1),
+                time=datetime.time(20, 30),
+                organizer=gamer
+            )
+            event.attendees.add(gamer, self.gamer)
+        self.gamer.user.last_login = datetime.datetime(2022, 5, 1, 12, 0, tzinfo=datetime.timezone.utc)
+        self.gamer.user.save()
+
+    def assert_same_response(self, url):
+        with override_settings(LEVELUP_FAST_SERIALIZERS=False):
+            expected = self.client.get(url)
+        with override_settings(LEVELUP_FAST_SERIALIZERS=True):
+            actual = self.client.get(url)
+
+        self.assertEqual(status.HTTP_200_OK, actual.status_code)
+        self.assertEqual(expected.content, actual.content)
+
+    def test_event_list_parity(self):
+        """Events, including nested users, groups and permissions"""
+        self.assert_same_response('/events')
+
+    def test_event_list_page_parity(self):
+        """A page of events and its next link"""
+        self.assert_same_response('/events?page_size=2&from=2022-01-01')
+
+    def test_game_list_parity(self):
+        """Games with their nested game type"""
+        self.assert_same_response('/games')
+        self.assert_same_response('/games?type=1&page_size=1')
+
+    def test_fast_serializer_matches_serializer_data(self):
+        """FastSerializer.render equals serializer.data for the same queryset"""
+        games = Game.objects.order_by('id')
+        fast = FastSerializer.for_serializer(GameSerializer)
+        self.assertEqual(GameSerializer(games, many=True).data, fast.render(fast.values(games)))
+
+        events = Event.objects.filter(description__startswith='Fast').order_by('id')
+        fast = FastSerializer.for_serializer(EventSerializer)
+        expected = EventSerializer(EventSerializer.setup_eager_loading(events), many=True).data
+        self.assertEqual(expected, fast.render(fast.values(events)))
@@ -3,6 +3,7 @@ from rest_framework.test import APITestCase
 from rest_framework.authtoken.models import Token
 from levelupapi.models import Game, Gamer
 from levelupapi.views.game import GameSerializer, CreateGameSerializer
+from levelupreports.models import UserGameReport
 
 class GameTests(APITestCase):
 
@@ -117,4 +118,135 @@ class GameTests(APITestCase):
         # Test that it was deleted by trying to _get_ the game
         # The response should return a 404
         response = self.client.get(url)
-        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
\ No newline at end of file
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+
+    def test_list_games_paginated(self):
+        """Test paging through games with a cursor"""
+        for i in range(3):
+            Game.objects.create(
+                title=f'Game {i}', maker='Maker', number_of_players=2,
+                skill_level='Novice', gamer=self.gamer, game_type_id=1
+            )
+
+        ids = []
+        url = '/games?type=1&page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+            self.assertLessEqual(len(response.data['results']), 2)
+            ids.extend(game['id'] for game in response.data['results'])
+            url = response.data['next']
+
+        expected = list(Game.objects.filter(game_type_id=1).order_by('id').values_list('id', flat=True))
+        self.assertEqual(expected, ids)
+
+    def test_create_games_in_bulk(self):
+        """Test creating a list of games"""
+        games = [
+            {"title": f"Game {i}", "maker": "Maker", "skill_level": "Novice", "number_of_players": 4, "game_type": 1}
+            for i in range(3)
+        ]
+
+        response = self.client.post('/games', games, format='json')
+
+        self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+        self.assertEqual(['Game 0', 'Game 1', 'Game 2'], [game['title'] for game in response.data])
+        self.assertEqual(3, Game.objects.filter(title__startswith='Game ', gamer=self.gamer).count())
+
+    def test_create_games_in_bulk_reports_item_errors(self):
+        """Test that one bad item rejects the whole list with per item errors"""
+        games = [
+            {"title": "Good", "maker": "Maker", "skill_level": "Novice", "number_of_players": 4, "game_type": 1},
+            {"title": "Bad", "maker": "Maker", "skill_level": "Novice", "number_of_players": 4, "game_type": 99},
+            {"title": "Worse", "maker": "Maker", "skill_level": "Novice", "game_type": 1},
+        ]
+
+        response = self.client.post('/games', games, format='json')
+
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.assertEqual({}, response.data[0])
+        self.assertIn('game_type', response.data[1])
+        self.assertIn('number_of_players', response.data[2])
+        self.assertFalse(Game.objects.filter(title='Good').exists())
+
+    def test_update_games_in_bulk(self):
+        """Test updating a list of games"""
+        games = [
+            {
+                "id": game.id,
+                "title": f'{game.title} updated',
+                "maker": game.maker,
+                "skill_level": game.skill_level,
+                "number_of_players": game.number_of_players,
+                "game_type": game.game_type_id
+            }
+            for game in Game.objects.all()
+        ]
+
+        response = self.client.put('/games', games, format='json')
+
+        self.assertEqual(status.HTTP_204_NO_CONTENT, response.status_code)
+        for game in games:
+            self.assertEqual(game['title'], Game.objects.get(pk=game['id']).title)
+            # Bulk writes skip post_save, the report table still has to follow
+            self.assertEqual(game['title'], UserGameReport.objects.get(game_id=game['id']).title)
+
+    def test_get_game_sparse_fields(self):
+        """Test picking fields and expanding the game type of one game"""
+        game = Game.objects.first()
+
+        response = self.client.get(f'/games/{game.id}?fields=id,title,game_type&expand=game_type')
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(
+            {'id': game.id, 'title': game.title, 'game_type': {'id': game.game_type.id, 'label': game.game_type.label}},
+            response.data
+        )
+
+    def test_search_games(self):
+        """Test ?q= search on title and maker, ranked with title matches first"""
+        def create(title, maker):
+            return Game.objects.create(
+                title=title, maker=maker, number_of_players=2, skill_level='Novice', gamer=self.gamer, game_type_id=1
+            )
+        title_match = create('Catan Junior', 'Kosmos')
+        maker_match = create('Settlers', 'Catan Studio')
+        create('Chess', 'Unknown')
+
+        response = self.client.get('/games?q=cata')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual([title_match.id, maker_match.id], [game['id'] for game in response.data])
+        response = self.client.get('/games?q=cata&fields=id,title')
+        self.assertEqual([{'id': title_match.id, 'title': 'Catan Junior'}, {'id': maker_match.id, 'title': 'Settlers'}], response.data)
+
+        # The index follows updates, bulk updates and deletes
+        title_match.title = 'Carcassonne'
+        title_match.save()
+        Game.objects.filter(pk=maker_match.pk).update(maker='Hans im Glück')
+        self.assertEqual([], self.client.get('/games?q=catan').data)
+        self.assertEqual([maker_match.id], [game['id'] for game in self.client.get('/games?q=gluck').data])
+        with self.captureOnCommitCallbacks(execute=True):
+            maker_match.delete()
+        self.assertEqual([], self.client.get('/games?q=gluck').data)
+
+        # Query syntax in the input is searched for, not interpreted
+        self.assertEqual(status.HTTP_200_OK, self.client.get('/games?q="AND(*').status_code)
+        self.assertEqual([], self.client.get('/games?q=--').data)
+
+    def test_search_games_paginated(self):
+        """Test paging through search results in relevance order"""
+        for i in range(5):
+            Game.objects.create(
+                title=f'Dominion {"Dominion " * i}', maker='Rio Grande', number_of_players=2,
+                skill_level='Novice', gamer=self.gamer, game_type_id=1
+            )
+        expected = [game['id'] for game in self.client.get('/games?q=dominion').data]
+
+        ids = []
+        url = '/games?q=dominion&page_size=2'
+        while url:
+            response = self.client.get(url)
+            ids.extend(game['id'] for game in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(5, len(expected))
+        self.assertEqual(expected, ids)
@@ -0,0 +1,66 @@
+import re
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.authtoken.models import Token
+from levelupapi import instrumentation
+from levelupapi.models import Gamer
+
+
+@override_settings(
+    LEVELUP_INSTRUMENTATION={'ENABLED': True, 'SAMPLES': 3},
+    LEVELUP_RESPONSE_CACHE={'ENABLED': False}
+)
+class InstrumentationTests(APITestCase):
+
+    fixtures = ['users', 'tokens', 'gamers', 'game_types', 'games', 'events']
+
+    def setUp(self):
+        instrumentation.stats.reset()
+        self.gamer = Gamer.objects.first()
+        token = Token.objects.get(user=self.gamer.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+    def test_server_timing_header(self):
+        """Every phase is reported and the query count matches what ran"""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/events')
+
+        header = response['Server-Timing']
+        self.assertEqual(['db', 'serialize', 'render', 'total'], re.findall(r'(\w+);dur=', header))
+        queries = int(re.search(r'db;dur=[\d.]+;desc="(\d+) queries"', header).group(1))
+        self.assertEqual(len(context.captured_queries), queries)
+
+    def test_route_percentiles(self):
+        """Samples are grouped by route and only the latest SAMPLES are kept"""
+        for _ in range(5):
+            self.client.get('/games')
+        self.client.get('/events/1')
+
+        routes = instrumentation.stats.snapshot()
+        games = routes['GET game-list']
+        self.assertEqual(5, games['requests'])
+        self.assertEqual(3, games['samples'])
+        self.assertEqual({'mean', 'p50', 'p95', 'p99', 'max'}, set(games['total_ms']))
+        self.assertLessEqual(games['total_ms']['p50'], games['total_ms']['p99'])
+        self.assertIn('GET event-detail', routes)
+
+    def test_stats_are_staff_only(self):
+        self.assertEqual(status.HTTP_403_FORBIDDEN, self.client.get('/stats/requests').status_code)
+
+        self.gamer.user.is_staff = True
+        self.gamer.user.save()
+        self.client.get('/games')
+        response = self.client.get('/stats/requests')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertIn('GET game-list', response.data['routes'])
+
+    @override_settings(LEVELUP_INSTRUMENTATION={'ENABLED': False})
+    def test_disabled(self):
+        """The middleware drops out and nothing is recorded"""
+        response = self.client.get('/games')
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertEqual({}, instrumentation.stats.snapshot())
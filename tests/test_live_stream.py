@@ -0,0 +1,102 @@
+import asyncio
+import json
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.authtoken.models import Token
+from levelupapi import live
+from levelupapi.models import Event, Gamer
+from levelupapi.views.event import join_event, leave_event
+
+
+def parse(chunk):
+    """The event name and data of one server-sent event"""
+    fields = dict(line.split(': ', 1) for line in chunk.decode().strip().split('\n'))
+    return fields['event'], json.loads(fields['data'])
+
+
+class LiveStreamTests(APITestCase):
+
+    fixtures = ['users', 'tokens', 'gamers', 'game_types', 'games', 'events']
+
+    def setUp(self):
+        self.gamer = Gamer.objects.first()
+        self.token = Token.objects.get(user=self.gamer.user).key
+        self.event = Event.objects.exclude(attendees=self.gamer).first()
+
+    def change_attendance(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            join_event(self.event, self.gamer)
+        with self.captureOnCommitCallbacks(execute=True):
+            leave_event(self.event, self.gamer)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.description = 'Moved indoors'
+            self.event.save()
+
+    async def test_stream_pushes_changes(self):
+        """Joins, leaves and updates arrive as deltas with the current attendee count"""
+        response = await self.async_client.get(f'/async/events/stream?token={self.token}')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual('text/event-stream', response['Content-Type'])
+        chunks = aiter(response.streaming_content)
+        try:
+            self.assertEqual(b'retry: 3000\n\n', await anext(chunks))
+            count = self.event.attendee_count
+            await sync_to_async(self.change_attendance)()
+
+            self.assertEqual(
+                ('joined', {'event': self.event.id, 'gamers': [self.gamer.id], 'attendee_count': count + 1}),
+                parse(await anext(chunks))
+            )
+            self.assertEqual(
+                ('left', {'event': self.event.id, 'gamers': [self.gamer.id], 'attendee_count': count}),
+                parse(await anext(chunks))
+            )
+            kind, data = parse(await anext(chunks))
+            self.assertEqual('updated', kind)
+            self.assertEqual('Moved indoors', data['description'])
+        finally:
+            await chunks.aclose()
+
+    @override_settings(LEVELUP_LIVE={'KEEPALIVE': 0.01})
+    async def test_keepalive(self):
+        """Quiet streams send comment lines"""
+        response = await self.async_client.get(
+            '/async/events/stream', headers={'Authorization': f'Token {self.token}'}
+        )
+        chunks = aiter(response.streaming_content)
+        try:
+            await anext(chunks)
+            self.assertEqual(b': keepalive\n\n', await anext(chunks))
+        finally:
+            await chunks.aclose()
+
+    def test_requires_token_and_asgi(self):
+        """No token gets a 401, and the stream is not served under WSGI"""
+        self.assertEqual(status.HTTP_401_UNAUTHORIZED, self.client.get('/async/events/stream').status_code)
+        response = self.client.get(f'/async/events/stream?token={self.token}')
+        self.assertEqual(status.HTTP_501_NOT_IMPLEMENTED, response.status_code)
+
+    def test_no_subscribers_publishes_nothing(self):
+        """Writes register no publishing commit callbacks while nobody listens"""
+        with mock.patch.object(live, 'broker', live.Broker()), self.captureOnCommitCallbacks() as callbacks:
+            join_event(self.event, self.gamer)
+        self.assertEqual([], [callback for callback in callbacks if callback.__module__ == live.__name__])
+
+    def test_slow_subscriber_resyncs(self):
+        """A full queue is replaced by a single resync message"""
+        async def overflow():
+            subscription = live.Subscription(asyncio.get_running_loop(), 2)
+            for i in range(5):
+                subscription.offer((i, 'joined', {}))
+            first = await subscription.get()
+            subscription.offer((6, 'left', {}))
+            return first, await subscription.get(), subscription.queue.empty()
+
+        first, after, empty = asyncio.run(overflow())
+        self.assertEqual(live.RESYNC, first[1])
+        self.assertEqual((6, 'left', {}), after)
+        self.assertTrue(empty)
@@ -0,0 +1,111 @@
+from django.core.cache import caches
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITransactionTestCase
+from rest_framework.authtoken.models import Token
+from levelupapi.models import Event, Gamer
+from levelupapi.replicas import ReplicaRoutingMiddleware, replica_alias
+
+REPLICA_ON = {'ENABLED': True, 'ALIAS': 'replica', 'STICKY_SECONDS': 5, 'PIN_ALIAS': 'shared'}
+
+
+class ReplicaRoutingMiddlewareTests(TestCase):
+    """Which requests are allowed to read from the replica"""
+
+    def setUp(self):
+        caches['shared'].clear()
+        self.factory = RequestFactory()
+        self.seen = []
+
+    def route(self, method, path='/games', status_code=status.HTTP_200_OK, **headers):
+        def view(request):
+            self.seen.append(replica_alias())
+            return HttpResponse(status=status_code)
+        ReplicaRoutingMiddleware(view)(self.factory.generic(method, path, **headers))
+        return self.seen[-1]
+
+    @override_settings(LEVELUP_REPLICA=REPLICA_ON)
+    def test_safe_requests_read_the_replica(self):
+        self.assertEqual('replica', self.route('GET'))
+        self.assertEqual('replica', self.route('HEAD'))
+        self.assertIsNone(self.route('POST', '/events'))
+        # Nothing leaks outside the request
+        self.assertIsNone(replica_alias())
+
+    @override_settings(LEVELUP_REPLICA=REPLICA_ON)
+    def test_reads_stick_to_default_after_a_write(self):
+        """A client that wrote reads its own writes, other clients keep using the replica"""
+        self.route('POST', '/events', HTTP_AUTHORIZATION='Token a')
+        self.assertIsNone(self.route('GET', HTTP_AUTHORIZATION='Token a'))
+        self.assertEqual('replica', self.route('GET', HTTP_AUTHORIZATION='Token b'))
+
+        # The pin is shared, a worker with nothing in its own memory sees it too
+        caches['default'].clear()
+        self.assertIsNone(self.route('GET', HTTP_AUTHORIZATION='Token a'))
+
+        # Failed writes do not pin
+        self.route('POST', '/events', status.HTTP_400_BAD_REQUEST, HTTP_AUTHORIZATION='Token c')
+        self.assertEqual('replica', self.route('GET', HTTP_AUTHORIZATION='Token c'))
+
+    @override_settings(LEVELUP_REPLICA={**REPLICA_ON, 'ENABLED': False})
+    def test_disabled(self):
+        self.assertIsNone(self.route('GET'))
+
+
+@override_settings(LEVELUP_REPLICA=REPLICA_ON, LEVELUP_RESPONSE_CACHE={'ENABLED': False})
+class ReplicaQueryTests(APITransactionTestCase):
+    """Queries of real requests land on the expected alias (a test mirror of default)"""
+
+    fixtures = ['users', 'tokens', 'gamers', 'game_types', 'games', 'events']
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        caches['shared'].clear()
+        self.gamer = Gamer.objects.first()
+        token = Token.objects.get(user=self.gamer.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+    def queries(self, alias, method, path):
+        with CaptureQueriesContext(connections[alias]) as context:
+            response = getattr(self.client, method)(path)
+        self.assertLess(response.status_code, 400)
+        return [query['sql'] for query in context.captured_queries]
+
+    def test_list_and_report_reads_use_the_replica(self):
+        self.assertTrue(self.queries('replica', 'get', '/events'))
+        self.assertTrue(self.queries('replica', 'get', '/reports/usergames'))
+
+    def test_signup_writes_to_default_and_pins(self):
+        event = Event.objects.exclude(attendees=self.gamer).first()
+        self.assertEqual([], self.queries('replica', 'post', f'/events/{event.id}/signup'))
+        # The next read of the same client goes to default
+        self.assertEqual([], self.queries('replica', 'get', '/events'))
+
+    def test_new_token_and_job_status_are_read_from_default(self):
+        """The token /register returns and report job status never come from the lagging replica"""
+        self.client.credentials()
+        response = self.client.post('/register', {
+            'username': 'fresh', 'password': 'pw', 'first_name': 'Fresh', 'last_name': 'Gamer', 'bio': 'New'
+        }, format='json')
+        caches['shared'].clear()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {response.data['token']}")
+        queries = self.queries('replica', 'get', '/gametypes')
+        self.assertTrue(queries)
+        self.assertFalse(any('authtoken_token' in sql for sql in queries))
+
+        job = self.client.post('/reports/usergames?format=csv').json()
+        caches['shared'].clear()
+        self.assertFalse(any('reportjob' in sql for sql in self.queries('replica', 'get', job['url'])))
+
+    @override_settings(LEVELUP_RESPONSE_CACHE={'ENABLED': True, 'ALIAS': 'default', 'TIMEOUT': 300})
+    def test_replica_reads_skip_etags_and_cache(self):
+        """Replica rows can be older than the markers, so they are neither tagged nor cached"""
+        for _ in range(2):
+            response = self.client.get('/games')
+            self.assertFalse(response.has_header('ETag'))
+            self.assertFalse(response.has_header('X-Cache'))
+        response = self.client.get(f'/gamers/{self.gamer.id}/events.ics?token={Token.objects.get(user=self.gamer.user).key}')
+        self.assertFalse(response.has_header('ETag'))
@@ -0,0 +1,93 @@
+import json
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from levelupapi.models import Event
+from levelupreports import jobs
+from levelupreports.models import ReportJob
+
+
+class ReportJobTests(TestCase):
+
+    fixtures = ['users', 'tokens', 'gamers', 'game_types', 'games', 'events']
+
+    def submit(self, url, expected_status=202):
+        response = self.client.post(url)
+        self.assertEqual(expected_status, response.status_code)
+        return response.json()
+
+    def run_jobs(self):
+        out = StringIO()
+        call_command('run_report_jobs', workers=0, once=True, stdout=out)
+        return out.getvalue()
+
+    def test_job_matches_synchronous_report(self):
+        """A submitted report is computed by the worker and served as the view would have streamed it"""
+        job = self.submit('/reports/userevents?format=ndjson')
+        self.assertEqual('pending', job['status'])
+        self.assertEqual(409, self.client.get(f'/reports/jobs/{job["id"]}/result').status_code)
+
+        self.assertIn(f'Job {job["id"]} done', self.run_jobs())
+        status = self.client.get(job['url']).json()
+        self.assertEqual('done', status['status'])
+
+        result = self.client.get(status['result'])
+        self.assertEqual(200, result.status_code)
+        self.assertEqual('application/x-ndjson', result['Content-Type'])
+        expected = b''.join(self.client.get('/reports/userevents?format=ndjson').streaming_content)
+        self.assertEqual(expected, result.content)
+
+    def test_grouped_json_for_one_gamer(self):
+        """format=json takes ?gamer_id= like the synchronous report"""
+        event = Event.objects.select_related('game').first()
+        url = f'/reports/userevents?format=json&gamer_id={event.game.gamer_id}'
+        job = self.submit(url)
+        self.assertEqual({'gamer_id': event.game.gamer_id}, job['params'])
+        self.run_jobs()
+        result = self.client.get(f'/reports/jobs/{job["id"]}/result')
+        self.assertEqual(self.client.get(url).json(), json.loads(result.content))
+
+    def test_identical_submissions_reuse_the_job(self):
+        """Pending and fresh jobs are handed out again, stale results are recomputed"""
+        first = self.submit('/reports/usergames?format=csv')
+        self.assertEqual(first['id'], self.submit('/reports/usergames?format=csv', 200)['id'])
+        self.assertNotEqual(first['id'], self.submit('/reports/usergames?format=ndjson')['id'])
+
+        self.run_jobs()
+        self.assertEqual(first['id'], self.submit('/reports/usergames?format=csv', 200)['id'])
+
+        ReportJob.objects.filter(pk=first['id']).update(finished_at=timezone.now() - timedelta(hours=1))
+        self.assertNotEqual(first['id'], self.submit('/reports/usergames?format=csv')['id'])
+
+    def test_failed_job(self):
+        """Errors are recorded on the job and the result is refused"""
+        job = self.submit('/reports/usergames?format=csv')
+        with mock.patch.object(jobs, 'compute', side_effect=ValueError('boom')):
+            self.run_jobs()
+        status = self.client.get(job['url']).json()
+        self.assertEqual('failed', status['status'])
+        self.assertEqual('ValueError: boom', status['error'])
+        self.assertEqual(409, self.client.get(f'/reports/jobs/{job["id"]}/result').status_code)
+
+    def test_bad_submissions(self):
+        """An export format is required and gamer_id has to be a number"""
+        self.submit('/reports/usergames', 400)
+        self.submit('/reports/usergames?format=html', 400)
+        self.submit('/reports/usergames?format=json&gamer_id=x', 400)
+        self.assertEqual(404, self.client.get('/reports/jobs/00000000-0000-0000-0000-000000000000').status_code)
+
+    def test_stale_and_old_jobs(self):
+        """Lost running jobs are queued again and old results are deleted"""
+        job = self.submit('/reports/usergames?format=csv')
+        self.assertEqual([job['id']], [str(pk) for pk in jobs.claim(5)])
+        self.assertEqual([], jobs.claim(5))
+        ReportJob.objects.filter(pk=job['id']).update(started_at=timezone.now() - timedelta(hours=1))
+
+        self.assertIn('Requeued 1 stale jobs', self.run_jobs())
+        ReportJob.objects.filter(pk=job['id']).update(finished_at=timezone.now() - timedelta(days=2))
+        self.run_jobs()
+        self.assertFalse(ReportJob.objects.exists())
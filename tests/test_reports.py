@@ -0,0 +1,128 @@
+import json
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.utils.html import escape
+from levelupapi.models import Event, Game, Gamer
+from levelupreports import materialize
+from levelupreports.models import UserEventReport, UserGameReport
+
+
+class ReportTests(TestCase):
+
+    fixtures = ['users', 'tokens', 'gamers', 'game_types', 'games', 'events']
+
+    def stream(self, url):
+        response = self.client.get(url)
+        self.assertEqual(200, response.status_code)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_user_games_page(self):
+        """The HTML report lists every game"""
+        response = self.client.get('/reports/usergames')
+        self.assertEqual(200, response.status_code)
+        for game in Game.objects.all():
+            self.assertContains(response, escape(game.title))
+
+    def test_user_games_csv(self):
+        """Games by user stream as CSV with a header row"""
+        lines = self.stream('/reports/usergames?format=csv').splitlines()
+        self.assertEqual('title,maker,skill_level,number_of_players,gamer_id,full_name', lines[0])
+        self.assertEqual(Game.objects.count(), len(lines) - 1)
+
+    def test_user_events_ndjson(self):
+        """Events by user stream one JSON object per line"""
+        rows = [json.loads(line) for line in self.stream('/reports/userevents?format=ndjson').splitlines()]
+        self.assertEqual(Event.objects.count(), len(rows))
+        self.assertEqual(
+            set(Event.objects.values_list('description', flat=True)),
+            {row['event_description'] for row in rows}
+        )
+
+    def test_report_tables_follow_changes(self):
+        """Saving and deleting source rows keeps the report tables in step"""
+        game = Game.objects.first()
+        game.title = 'Renamed'
+        game.save()
+        user = game.gamer.user
+        user.first_name = 'Molly'
+        user.save()
+
+        self.assertEqual({}, {name: pks for name, pks in materialize.differences().items() if pks})
+        self.assertTrue(UserEventReport.objects.filter(game_title='Renamed', full_name__startswith='Molly ').exists())
+
+        Event.objects.filter(game=game).delete()
+        game.delete()
+        self.assertFalse(UserGameReport.objects.filter(game_id=game.id).exists())
+
+    def test_rebuild_reports_command(self):
+        """The rebuild command restores emptied tables"""
+        UserGameReport.objects.all().delete()
+        with self.assertRaises(CommandError):
+            call_command('rebuild_reports', '--verify-only', stdout=StringIO())
+
+        call_command('rebuild_reports', stdout=StringIO())
+        self.assertEqual(Game.objects.count(), UserGameReport.objects.count())
+
+    def test_user_games_json(self):
+        """The JSON report matches the HTML grouping, one object per gamer"""
+        response = self.client.get('/reports/usergames?format=json')
+        self.assertEqual(200, response.status_code)
+        report = response.json()
+        self.assertEqual(sorted(set(Game.objects.values_list('gamer_id', flat=True))), [row['gamer_id'] for row in report])
+        game = Game.objects.order_by('id').first()
+        gamer = next(row for row in report if row['gamer_id'] == game.gamer_id)
+        self.assertEqual(f'{game.gamer.user.first_name} {game.gamer.user.last_name}', gamer['full_name'])
+        self.assertEqual({
+            'title': game.title,
+            'maker': game.maker,
+            'skill_level': game.skill_level,
+            'number_of_players': game.number_of_players
+        }, gamer['games'][0])
+        self.assertEqual(Game.objects.filter(gamer_id=game.gamer_id).count(), len(gamer['games']))
+
+    def test_user_events_json_for_one_gamer(self):
+        """?gamer_id= is answered with a single query"""
+        event = Event.objects.select_related('game').first()
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/reports/userevents?format=json&gamer_id={event.game.gamer_id}')
+        [gamer] = response.json()
+        self.assertIn(
+            {
+                'game_title': event.game.title,
+                'description': event.description,
+                'date': event.date.isoformat(),
+                'time': event.time.isoformat()
+            },
+            gamer['events']
+        )
+        self.assertEqual([], self.client.get('/reports/userevents?format=json&gamer_id=9999').json())
+        self.assertEqual(400, self.client.get('/reports/userevents?format=json&gamer_id=x').status_code)
+
+    def test_json_report_pages(self):
+        """Pages hold whole gamers and the next links walk through all of them"""
+        game = Game.objects.first()
+        for i in range(3):
+            user = User.objects.create_user(username=f'reporter{i}', password='pw', first_name='Report')
+            gamer = Gamer.objects.create(user=user, bio='Reports')
+            Game.objects.create(
+                title=f'Copy {i}', maker=game.maker, gamer=gamer, game_type=game.game_type,
+                number_of_players=2, skill_level='Novice'
+            )
+
+        url = '/reports/usergames?format=json&page_size=1'
+        seen = []
+        pages = 0
+        while url:
+            page = self.client.get(url).json()
+            self.assertLessEqual(len(page['results']), 1)
+            seen.extend(row['gamer_id'] for row in page['results'])
+            url = page['next']
+            pages += 1
+        self.assertEqual(sorted(set(Game.objects.values_list('gamer_id', flat=True))), seen)
+        self.assertEqual(len(seen), pages)
+        self.assertEqual(404, self.client.get('/reports/usergames?format=json&page_size=1&cursor=x').status_code)
@@ -0,0 +1,92 @@
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework.authtoken.models import Token
+from django.contrib.auth.models import User
+from levelupapi import caching
+from levelupapi.models import Event, Game, Gamer
+
+
+class ResponseCacheTests(APITestCase):
+
+    fixtures = ['users', 'tokens', 'gamers', 'game_types', 'games', 'events']
+
+    def setUp(self):
+        caching.stats.reset()
+        self.gamer = Gamer.objects.first()
+        token = Token.objects.get(user=self.gamer.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+    def test_repeated_list_is_served_from_cache(self):
+        """The second identical request is a cache hit"""
+        self.assertEqual('MISS', self.client.get('/games?type=1')['X-Cache'])
+        response = self.client.get('/games?type=1')
+
+        self.assertEqual('HIT', response['X-Cache'])
+        self.assertEqual('MISS', self.client.get('/games?type=2')['X-Cache'])
+        self.assertEqual({'hits': 1, 'misses': 2, 'hit_ratio': 0.333}, caching.stats.snapshot()['GameView.list'])
+
+    def test_write_invalidates_cached_list(self):
+        """Saving a game invalidates the cached game list"""
+        self.client.get('/games')
+        game = Game.objects.first()
+        game.title = 'Renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            game.save()
+
+        response = self.client.get('/games')
+        self.assertEqual('MISS', response['X-Cache'])
+        self.assertIn('Renamed', [game['title'] for game in response.data])
+
+    def test_renaming_a_user_invalidates_expanded_games(self):
+        """Games expanding their gamer follow user renames, in the cache and the ETag"""
+        url = '/games/1?fields=id,gamer&expand=gamer.user'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual('HIT', self.client.get(url)['X-Cache'])
+        user = Game.objects.get(pk=1).gamer.user
+        user.first_name = 'Renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual('MISS', response['X-Cache'])
+        self.assertEqual('Renamed', response.data['gamer']['user']['first_name'])
+
+    def test_events_are_cached_per_gamer(self):
+        """Each gamer gets their own cached event list"""
+        Event.objects.first().attendees.add(self.gamer)
+        self.client.get('/events')
+
+        user = User.objects.create_user(username='other', password='pw')
+        other = Gamer.objects.create(user=user, bio='Other')
+        token = Token.objects.create(user=other.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        response = self.client.get('/events')
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(0, sum(event['joined'] for event in response.data))
+
+    @override_settings(LEVELUP_RESPONSE_CACHE={'ENABLED': False})
+    def test_cache_can_be_disabled(self):
+        """Nothing is cached when the cache is disabled"""
+        self.client.get('/gametypes')
+        self.assertFalse(self.client.get('/gametypes').has_header('X-Cache'))
+
+    def test_stats_are_staff_only(self):
+        """Only staff may read the cache statistics"""
+        self.assertEqual(status.HTTP_403_FORBIDDEN, self.client.get('/stats/cache').status_code)
+
+        self.gamer.user.is_staff = True
+        self.gamer.user.save()
+        response = self.client.get('/stats/cache')
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertIn('response_cache', response.data)
+
+    def test_shared_bodies_need_shared_markers(self):
+        """A shared body cache keyed on per-process markers fails the system checks"""
+        self.assertEqual([], caching.check_shared_markers(None))
+        with override_settings(LEVELUP_RESPONSE_CACHE={'ALIAS': 'shared'}, LEVELUP_VERSIONS={'ALIAS': 'default'}):
+            self.assertEqual(['levelupapi.E001'], [error.id for error in caching.check_shared_markers(None)])
+        with override_settings(LEVELUP_RESPONSE_CACHE={'ALIAS': 'shared'}):
+            self.assertEqual([], caching.check_shared_markers(None))